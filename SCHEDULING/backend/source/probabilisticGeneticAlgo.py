@@ -1,3 +1,6 @@
+## Prototype on the 160-slot nurse format. The genetic algorithm used by generate_schedule
+## (tournament selection, per-employee/per-day crossover, island-swap mutation) lives in
+## scheduler/genetic.py and works on the Employee model's 7 x 96 format.
 import random
 
 ## Function will parse over an availability string
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
 
 class SchedulerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'scheduler'
+
+    def ready(self):
+        ## Picks up queued and orphaned jobs after a restart without a new submission. Hooked to the first
+        ## request rather than run here: no database access during app loading, and management commands
+        ## (migrate, test, ...) never serve a request, so they never start worker threads.
+        from .views import START_JOB_QUEUE_UID, start_job_queue
+        request_started.connect(start_job_queue, dispatch_uid=START_JOB_QUEUE_UID)
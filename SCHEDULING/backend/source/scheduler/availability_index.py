@@ -0,0 +1,141 @@
+# Inverted availability index: for every (day, slot), a bitmap of the employees who are free.
+## "Who is free Tuesday 14:00-16:00" is then the AND of eight bitmaps instead of a scan over every
+## employee's availability, and "how many are free per slot" is a popcount per bitmap. Bitmaps are
+## Python ints with bit p set for the employee at position p, the same convention the rest of the
+## package uses for day masks, so a 10,000 employee bitmap is a 1.25 KB int and an AND over a day is
+## microseconds. The process-wide index is built from the packed availability_bits column, patched
+## in place when this process writes availability, and rebuilt after max_age seconds to pick up
+## writes from other processes.
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .constants import BITS_PER_DAY, DAYS_OF_WEEK
+from .models import Employee
+from .scoring import masks_to_array
+
+
+class AvailabilityIndex:
+    def __init__(self, width: int = BITS_PER_DAY):
+        self.width = width
+        self.employee_ids = [] ## bit position -> employee_id (None once removed)
+        self.position = {} ## employee_id -> bit position
+        self.free_slots = [] ## bit position -> free slots in the week
+        self.bitmaps = [[0] * width for _ in DAYS_OF_WEEK] ## [day][slot] -> int
+        self.built = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, employee_ids, availability_masks, width: int = BITS_PER_DAY):
+        """
+        Build the index in one vectorized pass.
+
+        Args:
+            employee_ids (list): Employees, in the order of their bit positions.
+            availability_masks (list): Per employee, 7 free masks (see Employee.availability_bits).
+            width (int): Slots per day.
+        """
+        index = cls(width)
+        index.employee_ids = list(employee_ids)
+        index.position = {emp_id: p for p, emp_id in enumerate(index.employee_ids)}
+        if index.employee_ids:
+            free = masks_to_array([dict(zip(index.employee_ids, availability_masks))], index.employee_ids, width)[0]
+            ## (employees, 7, slots) -> (7, slots, employee bytes): each row of bytes is one slot's bitmap
+            packed = np.packbits(free.transpose(1, 2, 0), axis=-1, bitorder="little")
+            index.bitmaps = [[int.from_bytes(packed[d, s].tobytes(), "little") for s in range(width)] for d in range(len(DAYS_OF_WEEK))]
+            index.free_slots = free.sum(axis=(1, 2)).tolist()
+        return index
+
+    def __len__(self):
+        return len(self.position)
+
+    def age(self) -> float:
+        return time.monotonic() - self.built
+
+    def update(self, employee_id, availability_masks):
+        """Set (or add) one employee's free slots."""
+        with self._lock:
+            p = self.position.get(employee_id)
+            if p is None:
+                p = self.position[employee_id] = len(self.employee_ids)
+                self.employee_ids.append(employee_id)
+                self.free_slots.append(0)
+            self.free_slots[p] = sum(mask.bit_count() for mask in availability_masks)
+            bit = 1 << p
+            for day_bitmaps, mask in zip(self.bitmaps, availability_masks):
+                for s in range(self.width):
+                    if mask >> s & 1:
+                        day_bitmaps[s] |= bit
+                    else:
+                        day_bitmaps[s] &= ~bit
+
+    def remove(self, employee_id):
+        with self._lock:
+            p = self.position.pop(employee_id, None)
+            if p is None:
+                return
+            self.employee_ids[p] = None
+            self.free_slots[p] = 0
+            for day_bitmaps in self.bitmaps:
+                for s in range(self.width):
+                    day_bitmaps[s] &= ~(1 << p)
+
+    def free_throughout(self, d: int, start: int, end: int) -> int:
+        """Bitmap of the employees free for every slot of the inclusive range [start, end] on day d."""
+        with self._lock:
+            bits = -1 if start <= end else 0
+            for bitmap in self.bitmaps[d][start:end + 1]:
+                bits &= bitmap
+                if not bits:
+                    break
+            return bits & ((1 << len(self.employee_ids)) - 1)
+
+    def free_at_any(self, d: int, start: int, end: int) -> int:
+        """Bitmap of the employees free for at least one slot of [start, end] on day d."""
+        with self._lock:
+            bits = 0
+            for bitmap in self.bitmaps[d][start:end + 1]:
+                bits |= bitmap
+            return bits
+
+    def free_counts(self, d: int, start: int = 0, end: int = None) -> list:
+        """Number of free employees in each slot of [start, end] on day d."""
+        end = self.width - 1 if end is None else end
+        with self._lock:
+            return [bitmap.bit_count() for bitmap in self.bitmaps[d][start:end + 1]]
+
+    def employees(self, bits: int) -> list:
+        """Employee ids for the set bits of a bitmap, in bit order."""
+        if not bits:
+            return []
+        raw = np.frombuffer(bits.to_bytes((bits.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+        return [self.employee_ids[p] for p in np.flatnonzero(np.unpackbits(raw, bitorder="little"))]
+
+
+_availability_index = None
+_availability_index_lock = threading.Lock()
+
+
+def get_availability_index() -> AvailabilityIndex:
+    """
+    The process-wide index, built from the database on first use and again once it is older than
+    SCHEDULE_AVAILABILITY_INDEX["max_age"] seconds.
+    """
+    global _availability_index
+    max_age = getattr(settings, "SCHEDULE_AVAILABILITY_INDEX", {}).get("max_age", 300)
+    with _availability_index_lock:
+        if _availability_index is None or _availability_index.age() > max_age:
+            rows = list(Employee.objects.values_list("employee_id", "availability_bits"))
+            _availability_index = AvailabilityIndex.build([emp_id for emp_id, _ in rows], [masks for _, masks in rows])
+        return _availability_index
+
+
+def update_availability_index(employees):
+    """Patch the process-wide index after availability writes; a no-op until the index has been built."""
+    index = _availability_index
+    if index is None:
+        return
+    for employee in employees:
+        index.update(employee.employee_id, employee.availability_bits)
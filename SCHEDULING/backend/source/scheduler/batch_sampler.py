@@ -0,0 +1,126 @@
+# Vectorized version of ScheduleEngine.schedule() that draws many candidate schedules per call.
+## Every employee's shifts in ScheduleEngine only depend on their own islands and the roster-wide
+## zero density, never on what other employees were given, so the order in which employees are
+## visited does not matter and all (candidate, employee) pairs can be sampled side by side.
+## The only sequential part is the walk over the (at most 7) days, because the hour cap depends on
+## the shifts already given on earlier days - that walk is 7 array steps instead of a Python loop
+## per candidate.
+import numpy as np
+
+from .constants import DAYS_OF_WEEK
+from .density import ZeroDensityIndex
+from .problem import ProblemInstance
+
+
+class BatchScheduleSampler:
+    def __init__(self,
+                 employees,
+                 valid_work_days=DAYS_OF_WEEK,
+                 valid_work_hours: tuple = (28, 83),
+                 density_index: ZeroDensityIndex = None,
+                 seed=None,
+                 problem: ProblemInstance = None):
+        """
+        Precompute padded island tables for the roster.
+
+        Args:
+            employees (List[Employee]): Employee model instances.
+            valid_work_days (List[str]): Days that may be scheduled.
+            valid_work_hours (tuple): Inclusive (start_slot, end_slot) range that must be covered; used for scoring.
+            density_index (ZeroDensityIndex): Shared density tables; built from employees if omitted.
+            seed: Seed (or np.random.Generator) for the sampler's random stream.
+            problem (ProblemInstance): The compiled roster; replaces employees, valid_work_days, valid_work_hours
+                                       and density_index when given.
+        """
+        if problem is None:
+            problem = ProblemInstance.compile(employees, valid_work_days, valid_work_hours, density_index)
+        self.employee_ids = list(problem.employee_ids)
+        self.valid_work_hours = problem.valid_work_hours
+        self.width = problem.width
+        self.rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+        num_days = len(DAYS_OF_WEEK)
+        islands = problem.islands_by_id
+        density_index = problem.density_index
+
+        num_emps = len(problem)
+        max_islands = max([len(day) for week in islands.values() for day in week] + [1])
+        ## Islands padded to max_islands per (employee, day); island_count says how many entries are real
+        self.island_start = np.zeros((num_emps, num_days, max_islands), dtype=np.int16)
+        self.island_end = np.full((num_emps, num_days, max_islands), -1, dtype=np.int16)
+        self.island_count = np.zeros((num_emps, num_days), dtype=np.int16)
+        self.lowest_island = np.zeros((num_emps, num_days), dtype=np.int16)
+        self.day_weight = np.zeros((num_emps, num_days))  # 0 = day can never be picked
+        self.max_hours = problem.max_hours
+
+        for e, emp_id in enumerate(self.employee_ids):
+            for d, islands_e_d in enumerate(islands[emp_id]):
+                if not islands_e_d:
+                    continue
+                self.island_count[e, d] = len(islands_e_d)
+                for k, (start, end) in enumerate(islands_e_d):
+                    self.island_start[e, d, k] = start
+                    self.island_end[e, d, k] = end
+                self.lowest_island[e, d] = islands_e_d.index(density_index.lowest_density_island[emp_id][d])
+                if problem.is_valid_day(d):
+                    self.day_weight[e, d] = 1 / (density_index.min_island_density[emp_id][d] + 1e-6)
+
+    def sample(self, n: int) -> np.ndarray:
+        """
+        Draw n candidate schedules.
+
+        Returns:
+            np.ndarray: Boolean array of shape (n, employees, 7, width); True where the employee works.
+        """
+        num_emps, num_days = self.day_weight.shape
+        rng = self.rng
+        emp_idx = np.arange(num_emps)[None, :]
+
+        ## Weighted day order without replacement (same law as repeated random.choices over the remaining days):
+        ## sort by Exp(1) / weight, days with weight 0 sort last and are never visited
+        with np.errstate(divide='ignore'):
+            keys = rng.exponential(size=(n, num_emps, num_days)) / self.day_weight[None]
+        day_order = np.argsort(keys, axis=2)
+
+        ## All coin flips up front: skip-day flip, low-density-island flip and the random island pick
+        skip_flip = rng.integers(0, 2, size=(n, num_emps, num_days)) == 0
+        pick_low = rng.integers(0, 2, size=(n, num_emps, num_days)) == 0
+        random_pick = rng.random(size=(n, num_emps, num_days))
+
+        hours = np.zeros((n, num_emps))
+        shift_start = np.full((n, num_emps, num_days), -1, dtype=np.int16)
+        shift_end = np.full((n, num_emps, num_days), -2, dtype=np.int16)
+        for step in range(num_days):
+            d = day_order[:, :, step]
+            active = self.day_weight[emp_idx, d] > 0
+            ## randint(0,1) < (max - hours)/max in ScheduleEngine: a 0 skips the day while any hours remain
+            skip = skip_flip[:, :, step] & (hours < self.max_hours[None, :])
+            count = self.island_count[emp_idx, d]
+            island = np.where(pick_low[:, :, step],
+                              self.lowest_island[emp_idx, d],
+                              (random_pick[:, :, step] * count).astype(np.int16))
+            start = self.island_start[emp_idx, d, island]
+            end = self.island_end[emp_idx, d, island]
+            length = (end - start + 1) / 4
+            take = active & ~skip & (hours + length <= self.max_hours[None, :])
+            hours += np.where(take, length, 0)
+            n_idx, e_idx = np.nonzero(take)
+            shift_start[n_idx, e_idx, d[take]] = start[take]
+            shift_end[n_idx, e_idx, d[take]] = end[take]
+
+        slots = np.arange(self.width, dtype=np.int16)
+        return (slots >= shift_start[..., None]) & (slots <= shift_end[..., None])
+
+    def score(self, schedules: np.ndarray) -> np.ndarray:
+        """Unfilled slot count inside valid_work_hours for every candidate, in one reduction."""
+        first, last = self.valid_work_hours
+        covered = schedules[..., first:last + 1].any(axis=1)
+        return (~covered).sum(axis=(1, 2))
+
+    def to_masks(self, schedule: np.ndarray) -> dict:
+        """Convert one (employees, 7, width) candidate into ScheduleEngine.schedule_masks() format."""
+        packed = np.packbits(schedule, axis=-1, bitorder='little')
+        return {
+            emp_id: [int.from_bytes(packed[e, d].tobytes(), 'little') for d in range(packed.shape[1])]
+            for e, emp_id in enumerate(self.employee_ids)
+        }
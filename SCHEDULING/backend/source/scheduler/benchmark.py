@@ -0,0 +1,174 @@
+# Micro-benchmarks for the scheduling engine on seeded synthetic rosters.
+## Rosters are generated from a seed, so two runs (or two versions of the code) time exactly the same
+## inputs, and the results are plain dicts that the benchmark_engine command writes to JSON for
+## comparing versions. The engine class and the formatter are passed in rather than imported here,
+## so this module only depends on the scheduler package.
+import platform
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .batch_sampler import BatchScheduleSampler
+from .bitmask import availability_to_masks, masks_to_availability
+from .constants import BITS_PER_DAY, DAYS_OF_WEEK
+from .models import Employee
+from .problem import ProblemInstance
+from .scoring import masks_to_array, score_candidates
+
+DEFAULT_SIZES = (10, 100, 1000, 5000)
+DEFAULT_DENSITIES = (0.25, 0.5, 0.75)
+
+
+def synthetic_availability(rng: random.Random, density: float, valid_work_hours: tuple = (28, 83)) -> list:
+    """
+    One week of availability in the format the API takes (7 strings, '0' = free; see bitmask.availability_to_masks).
+
+    Like Employee.generate_block_availability, the working window is filled with free or busy blocks of
+    1 to 5 hours; a block is free with probability density. Slots outside valid_work_hours are busy.
+    """
+    first, last = valid_work_hours
+    week = []
+    for _ in DAYS_OF_WEEK:
+        window = []
+        while len(window) < last - first + 1:
+            bit = "0" if rng.random() < density else "1"
+            window.extend(bit * min(rng.randint(1, 5) * 4, last - first + 1 - len(window)))
+        week.append("1" * first + "".join(window) + "1" * (BITS_PER_DAY - last - 1))
+    return week
+
+
+def synthetic_roster(size: int, density: float = 0.5, seed: int = 0) -> list:
+    """
+    Unsaved Employee instances with seeded availability and max_hours between 5 and 20.
+
+    Args:
+        size (int): Number of employees.
+        density (float): Share of the working window each employee is free for, on average.
+        seed (int): Same seed, size and density -> same roster.
+    """
+    rng = random.Random(f"{seed}:{size}:{density}")
+    employees = []
+    for i in range(size):
+        emp = Employee(
+            employee_id=f"bench-{i}",
+            student_id=f"bench-{i}",
+            availability_bits=availability_to_masks(synthetic_availability(rng, density)),
+            params={"max_hours": rng.choice([5, 10, 15, 20]), "f1_status": False, "priority": 0},
+            email=f"bench-{i}@example.edu",
+        )
+        emp.refresh_availability_islands() ## As the write paths do, so compiling reads stored islands
+        employees.append(emp)
+    return employees
+
+
+def time_call(fn, repeat: int = 5, calls: int = 1) -> dict:
+    """
+    Time fn() repeat times (each timing covers `calls` back-to-back calls).
+
+    Returns:
+        dict: repeat, calls, and the best and median milliseconds per call.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        timings.append((time.perf_counter() - started) * 1000 / calls)
+    return {
+        "repeat": repeat,
+        "calls": calls,
+        "best_ms": round(min(timings), 4),
+        "median_ms": round(statistics.median(timings), 4),
+    }
+
+
+def benchmark_roster(engine_cls, format_all_schedules, employees, repeat: int = 5, seed: int = 0) -> dict:
+    """
+    Time the engine's building blocks and a full schedule() on one roster.
+
+    Args:
+        engine_cls: ScheduleEngine.
+        format_all_schedules: The view helper that formats schedules for the frontend.
+        employees (List[Employee]): Roster, e.g. from synthetic_roster().
+        repeat (int): Timings per benchmark; best and median are reported.
+        seed (int): Seed for the engine's random stream.
+
+    Returns:
+        dict: benchmark name -> time_call() result.
+    """
+    results = {}
+    results["compile_problem"] = time_call(lambda: ProblemInstance.compile(employees), repeat)
+    problem = ProblemInstance.compile(employees)
+    rng = random.Random(seed)
+    engine = engine_cls(employees=employees, problem=problem, rng=rng)
+    islands = engine.extract_employee_availability_islands()
+    days = [day_bits for emp in employees[:100] for day_bits in masks_to_availability(emp.availability_bits)]
+    sample_islands = [(d, island) for emp_id in problem.employee_ids[:100] for d, day in enumerate(islands[emp_id]) for island in day]
+
+    def islands_in_day():
+        for day_bits in days:
+            engine.islands_in_day(day_bits)
+    results["islands_in_day"] = time_call(islands_in_day, repeat)
+    results["islands_in_day"]["per"] = f"{len(days)} day strings"
+
+    def compute_zero_density():
+        for d, (x, y) in sample_islands:
+            engine.compute_zero_density(x, y, DAYS_OF_WEEK[d])
+    results["compute_zero_density"] = time_call(compute_zero_density, repeat)
+    results["compute_zero_density"]["per"] = f"{len(sample_islands)} islands"
+
+    def sample_day():
+        for emp_id in problem.employee_ids[:100]:
+            engine.sample_day_based_on_zero_density(emp_id, set(problem.valid_days), islands)
+    results["sample_day_based_on_zero_density"] = time_call(sample_day, repeat)
+    results["sample_day_based_on_zero_density"]["per"] = f"{min(len(problem), 100)} employees"
+
+    results["schedule"] = time_call(lambda: engine_cls(employees=employees, problem=problem, rng=rng).schedule(), repeat)
+    results["schedule_masks"] = time_call(lambda: engine_cls(employees=employees, problem=problem, rng=rng).schedule_masks(), repeat)
+
+    sampler = BatchScheduleSampler(employees, seed=seed, problem=problem)
+    batch = sampler.sample(max(1, min(100, 200000 // max(len(employees), 1))))
+    results["score_candidates"] = time_call(lambda: score_candidates(batch, problem.valid_work_hours, 120), repeat)
+    results["score_candidates"]["per"] = f"{len(batch)} candidates"
+    masks = [sampler.to_masks(batch[i]) for i in range(min(len(batch), 5))]
+    results["masks_to_array"] = time_call(lambda: masks_to_array(masks, problem.employee_ids, problem.width), repeat)
+
+    schedules = [(0, engine_cls(employees=employees, problem=problem, rng=rng).schedule()) for _ in range(5)]
+    employees_by_id = {emp.employee_id: emp for emp in employees}
+    results["format_all_schedules"] = time_call(lambda: format_all_schedules(schedules, employees_by_id), repeat)
+    results["format_all_schedules"]["per"] = "5 schedules"
+    return results
+
+
+def run_benchmarks(engine_cls, format_all_schedules, sizes=DEFAULT_SIZES, densities=DEFAULT_DENSITIES, repeat: int = 5, seed: int = 0, log=None) -> dict:
+    """
+    Benchmark every (size, density) roster.
+
+    Returns:
+        dict: {"meta": environment info, "results": [{"employees", "density", "benchmarks"}, ...]}, ready for json.dump.
+    """
+    results = []
+    for size in sizes:
+        for density in densities:
+            if log:
+                log(f"{size} employees, density {density}")
+            employees = synthetic_roster(size, density, seed)
+            results.append({
+                "employees": size,
+                "density": density,
+                "benchmarks": benchmark_roster(engine_cls, format_all_schedules, employees, repeat, seed),
+            })
+    return {
+        "meta": {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
@@ -0,0 +1,89 @@
+# Helpers for packing per-day bitstrings into Python ints.
+## Bit i of a day mask corresponds to character i of the 96 character day string,
+## so slot 0 (12:00 am) is the least significant bit.
+from .constants import BITS_PER_DAY, DAYS_OF_WEEK
+
+
+def free_mask(day_bits) -> int:
+    """
+    Pack a day of availability into an int whose set bits are the free slots.
+
+    Args:
+        day_bits (str | list): A BITS_PER_DAY long string of '0'/'1' characters, or a list
+                               of 0/1 ints. A '0' (or 0) marks a slot where the employee is free.
+
+    Returns:
+        int: Bitmask with bit i set iff slot i is free.
+    """
+    return int(''.join('1' if bit in ('0', 0) else '0' for bit in reversed(day_bits)) or '0', 2)
+
+
+def availability_to_masks(availability) -> list:
+    """A week of availability as the API takes it (7 days of '0' = free, see free_mask) -> 7 free masks."""
+    return [free_mask(day_bits) for day_bits in availability]
+
+
+def masks_to_availability(masks, width: int = BITS_PER_DAY) -> list:
+    """Inverse of availability_to_masks: 7 free masks -> 7 strings with a '0' wherever the employee is free."""
+    full = (1 << width) - 1
+    return [mask_to_bitstring(full & ~mask, width) for mask in masks]
+
+
+def mask_to_bitstring(mask: int, width: int = BITS_PER_DAY) -> str:
+    """Unpack a day mask into a string with a '1' wherever a bit is set."""
+    return format(mask, f'0{width}b')[::-1]
+
+
+def bitstring_to_mask(bitstring: str) -> int:
+    """Inverse of mask_to_bitstring: set bit i wherever character i is '1'."""
+    return int(''.join('1' if bit in ('1', 1) else '0' for bit in reversed(bitstring)) or '0', 2)
+
+
+def interval_mask(start: int, end: int) -> int:
+    """Mask with every bit in the inclusive range [start, end] set."""
+    return ((1 << (end - start + 1)) - 1) << start
+
+
+def count_in_range(mask: int, start: int, end: int) -> int:
+    """Number of set bits of mask inside the inclusive range [start, end]."""
+    return ((mask >> start) & ((1 << (end - start + 1)) - 1)).bit_count()
+
+
+def mask_islands(mask: int, min_length: int = 4) -> list:
+    """
+    Collect the runs of set bits in a mask.
+
+    Args:
+        mask (int): Day mask, e.g. the output of free_mask.
+        min_length (int): Runs shorter than this many slots are dropped (4 slots = 1 hour).
+
+    Returns:
+        list[tuple]: Inclusive (start_idx, end_idx) pairs in ascending order.
+    """
+    islands = []
+    while mask:
+        start = (mask & -mask).bit_length() - 1
+        shifted = mask >> start
+        length = (~shifted & (shifted + 1)).bit_length() - 1 ## Index of the first 0 above the run = run length
+        if length >= min_length:
+            islands.append((start, start + length - 1))
+        mask &= ~(((1 << length) - 1) << start)
+    return islands
+
+
+def count_unfilled(schedule_masks: dict, first: int, last: int) -> int:
+    """
+    Count the slots in [first, last] that nobody works, summed over every day.
+
+    Args:
+        schedule_masks (dict): employee_id -> list of per-day schedule masks (see ScheduleEngine.schedule_masks).
+        first (int), last (int): Inclusive slot range that has to be covered each day.
+    """
+    window = interval_mask(first, last)
+    unfilled = 0
+    for day in range(len(DAYS_OF_WEEK)):
+        covered = 0
+        for week in schedule_masks.values():
+            covered |= week[day]
+        unfilled += (window & ~covered).bit_count()
+    return unfilled
@@ -0,0 +1,74 @@
+# Stopping rules for the schedule search.
+## A search stops at whichever comes first: the iteration cap, the wall-clock deadline, or a
+## stall window in which the best unfilled count did not improve. Setting on_improvement lets a caller
+## (e.g. the streaming endpoint) see each new best schedule as the search finds it.
+import time
+
+
+class SearchBudget:
+    ## True for budgets whose should_stop() also reports progress or fires on a cancel, which a search
+    ## running in worker processes cannot see for itself (see parallel.sample_top_schedules)
+    interruptible = False
+
+    def __init__(self, max_iterations: int = 100000, time_budget: float = None, stall_iterations: int = None):
+        """
+        Args:
+            max_iterations (int): Hard cap on candidates sampled.
+            time_budget (float): Seconds the search may run for, or None for no deadline.
+            stall_iterations (int): Stop once this many iterations pass without a better best score, or None.
+        """
+        self.max_iterations = max_iterations
+        self.time_budget = time_budget
+        self.stall_iterations = stall_iterations
+        self.started = time.monotonic()
+        self.iterations = 0
+        self.best_score = None
+        self.last_improvement = 0
+        self.stop_reason = None
+        self.on_improvement = None ## Called as on_improvement(best_score, schedule_masks) when the best score improves
+        self.problem = None ## The full-resolution ProblemInstance, once the caller has compiled it; lets listeners score what they are sent
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def deadline(self) -> float:
+        """Absolute time.time() at which the search has to stop (comparable across processes), or None."""
+        if self.time_budget is None:
+            return None
+        return time.time() + self.time_budget - self.elapsed()
+
+    def remaining_iterations(self) -> int:
+        return max(self.max_iterations - self.iterations, 0)
+
+    def record(self, iterations: int, best_score=None, best=None):
+        """
+        Account for a block of `iterations` samples whose best score was best_score.
+
+        best is an optional callable returning that sample's schedule masks. It is only called when the
+        block improves the best score and on_improvement is set, so engines can pass it for free.
+        """
+        self.iterations += iterations
+        if best_score is not None and (self.best_score is None or best_score < self.best_score):
+            self.best_score = best_score
+            self.last_improvement = self.iterations
+            if self.on_improvement is not None and best is not None:
+                self.on_improvement(best_score, best())
+
+    def should_stop(self) -> bool:
+        """True once any stopping rule fires; the rule is kept in stop_reason."""
+        if self.stop_reason is None:
+            if self.iterations >= self.max_iterations:
+                self.stop_reason = "max_iterations"
+            elif self.time_budget is not None and self.elapsed() >= self.time_budget:
+                self.stop_reason = "time_budget"
+            elif self.stall_iterations is not None and self.iterations - self.last_improvement >= self.stall_iterations:
+                self.stop_reason = "stalled"
+        return self.stop_reason is not None
+
+    def summary(self) -> dict:
+        return {
+            "iterations": self.iterations,
+            "elapsed_seconds": round(self.elapsed(), 3),
+            "stop_reason": self.stop_reason,
+            "best_unfilled": self.best_score,
+        }
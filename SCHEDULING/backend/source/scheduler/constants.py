@@ -17,4 +17,7 @@ DAYS_OF_WORKING_WEEK = [
     "Wednesday",
     "Thursday",
     "Friday",
-]
\ No newline at end of file
+]
+
+# A slot with this many or more people working it counts as overstaffed
+OVERSTAFFED_HEADCOUNT = 3
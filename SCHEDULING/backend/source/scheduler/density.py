@@ -0,0 +1,77 @@
+# Precomputed zero-density lookups for a fixed roster.
+## The zero density of a range [x, y] on day d is the fraction of (employee, slot) pairs
+## in that range where the employee is free. It only depends on availability, so it can
+## be built once per roster and shared by every schedule generated from that roster.
+from .constants import BITS_PER_DAY, DAYS_OF_WEEK
+
+
+class ZeroDensityIndex:
+    calls = 0 ## density() lookups; only CountingDensityIndex counts them
+
+    def __init__(self, availability_masks: dict, islands: dict = None, width: int = BITS_PER_DAY):
+        """
+        Build per-day cumulative free counts over all employees.
+
+        Args:
+            availability_masks (dict): employee_id -> list of 7 free masks (see bitmask.free_mask).
+            islands (dict): Optional employee_id -> list of 7 island lists. When given, the
+                            per-employee minimum island density tables are filled in as well.
+            width (int): Number of slots in a day.
+        """
+        self.num_employees = len(availability_masks)
+        self.width = width
+        ## prefix[d][i] = number of free (employee, slot) pairs on day d among slots [0, i)
+        self.prefix = []
+        for d in range(len(DAYS_OF_WEEK)):
+            counts = [0] * width
+            for masks in availability_masks.values():
+                mask = masks[d]
+                while mask:
+                    low = mask & -mask
+                    counts[low.bit_length() - 1] += 1
+                    mask ^= low
+            running = [0] * (width + 1)
+            for i in range(width):
+                running[i + 1] = running[i] + counts[i]
+            self.prefix.append(running)
+
+        ## employee_id -> list of 7 entries (None when the employee has no island that day)
+        self.min_island_density = {}
+        self.lowest_density_island = {}
+        for emp_id, emp_islands in (islands or {}).items():
+            min_densities = [None] * len(DAYS_OF_WEEK)
+            lowest_islands = [None] * len(DAYS_OF_WEEK)
+            for d, islands_e_d in enumerate(emp_islands):
+                if not islands_e_d:
+                    continue
+                lowest = min(islands_e_d, key=lambda interval: self.density(interval[0], interval[1], d))
+                lowest_islands[d] = lowest
+                min_densities[d] = self.density(lowest[0], lowest[1], d)
+            self.min_island_density[emp_id] = min_densities
+            self.lowest_density_island[emp_id] = lowest_islands
+
+    @classmethod
+    def from_employees(cls, employees, width: int = BITS_PER_DAY):
+        """Build the index (including island tables) straight from Employee instances."""
+        availability_masks = {emp.employee_id: emp.get_availability_masks() for emp in employees}
+        islands = {emp.employee_id: emp.get_availability_islands() for emp in employees}
+        return cls(availability_masks, islands, width)
+
+    def density(self, x: int, y: int, d: int) -> float:
+        """Zero density of the inclusive slot range [x, y] on day index d, in O(1)."""
+        total_slots = (y - x + 1) * self.num_employees
+        if total_slots <= 0:
+            return 0.0
+        running = self.prefix[d]
+        return (running[y + 1] - running[x]) / total_slots
+
+
+class CountingDensityIndex(ZeroDensityIndex):
+    """ZeroDensityIndex that counts density() lookups made in this process. Built only for profiled requests."""
+    def __init__(self, *args, **kwargs):
+        self.calls = 0
+        super().__init__(*args, **kwargs)
+
+    def density(self, x: int, y: int, d: int) -> float:
+        self.calls += 1
+        return super().density(x, y, d)
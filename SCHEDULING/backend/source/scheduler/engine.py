@@ -0,0 +1,326 @@
+from typing import List
+from .models import Employee
+from .constants import BITS_PER_DAY
+from .constants import DAYS_OF_WEEK
+from .constants import OVERSTAFFED_HEADCOUNT
+from .bitmask import free_mask, mask_to_bitstring, interval_mask, mask_islands
+from .density import ZeroDensityIndex
+from .problem import ProblemInstance
+import heapq
+import random
+
+class ScheduleEngine:
+    def __init__(self,
+                 employees: List[Employee],
+                 max_man_hours: int = 200,
+                 valid_work_days: List[str] = DAYS_OF_WEEK,
+                 valid_work_hours: tuple = (28, 83), # 0 = 12 am 96 = 11:59 pm, thus 28-83 represents a 14 hour window of 7-9
+                 density_index: ZeroDensityIndex = None,
+                 rng: random.Random = None,
+                 problem: ProblemInstance = None):
+        """
+        Initialize the scheduling engine.
+
+        Args:
+            employees (List[Employee]): List of employee model instances.
+            max_man_hours (int): Global cap on man-hours across all employees.
+            valid_work_days (List[str]): Subset of ["Monday", ..., "Sunday"] - bc could be one day off in a given week for a holiday
+            valid_work_hours (tuple): (start_hour, end_hour) in 24-hour format.
+            density_index (ZeroDensityIndex): Precomputed density lookups for this roster. Pass the same
+                                              index to every engine built for a roster to avoid rebuilding it.
+            rng (random.Random): Random stream to draw from (defaults to the global random module).
+                                 A seeded instance makes schedule() reproducible.
+            problem (ProblemInstance): The roster compiled once per request. When given, employees, valid_work_days,
+                                       valid_work_hours and density_index are taken from it and employees may be None.
+        """
+        if problem is None:
+            problem = ProblemInstance.compile(employees, valid_work_days, valid_work_hours, density_index)
+        self.problem = problem
+        self.employees = employees
+        self.max_man_hours = max_man_hours
+        self.valid_work_days = [DAYS_OF_WEEK[d] for d in problem.valid_days]
+        self.valid_work_hours = problem.valid_work_hours
+        self.total_emp_hour_limit_violations = 0
+        self.scheduledHoursPerEmployee = {}
+        self.rng = rng or random
+        self.density_index = problem.density_index
+        ## Coverage of the schedule being built, updated shift by shift (see add_shift_coverage)
+        self.coverage = []
+        self.unfilled = 0
+        self.overstaffed = 0
+
+
+        """
+        Generate a schedule based on employee availability and global constraints.
+
+        Returns:
+            dict: A mapping of employee_id to their weekly schedule.
+                  The format of each schedule is defined as a list of 
+                  7 bitstrings representing daily assignments.
+        """
+    def schedule(self) -> dict:
+        return {
+            emp_id: [mask_to_bitstring(day_mask) for day_mask in week]
+            for emp_id, week in self.schedule_masks().items()
+        }
+
+    """
+    Same as schedule(), but leaves each day packed as an int (bit i set iff the employee works slot i).
+    Callers that score many candidates should use this and only unpack the schedules they keep.
+    """
+    def schedule_masks(self) -> dict:
+        empToSchedule = {}
+        ## Dictionary of employee_id -> listof_availability_islands where
+        ## each index of the list contains a set of availability islands
+        ## for the day corresponding to that index
+        ## E.x. list[1] = {(a,b) | (a,b) is an interval where this person is free on Tuesday}
+        employeeToAvailabilityIslands = self.extract_employee_availability_islands()
+        self.reset_coverage()
+
+        problem = self.problem
+        employee_order = list(range(len(problem))) ## Roster positions; a list, not a set, so that a seeded rng always sees the same order
+        ## print(valid_days_set)
+
+        while len(employee_order) > 0:
+            e = employee_order.pop(self.rng.randrange(len(employee_order)))
+            curr_emp_id = problem.employee_ids[e]
+            emp_max_hours = float(problem.max_hours[e])  # max_hours compiled from the employee's params (0 if param missing)
+           # print("max hours " + str(emp_max_hours))
+            if emp_max_hours <= 0: ## No hours to give (e.g. ingested without max_hours yet): never scheduled, as in BatchScheduleSampler
+                self.scheduledHoursPerEmployee[curr_emp_id] = 0
+                empToSchedule[curr_emp_id] = [0] * len(DAYS_OF_WEEK)
+                continue
+            
+            valid_days_set = set(problem.valid_days) ## Copied per employee, since days are removed as they are visited
+
+
+            ## Produce a list of size 7, namely schedule, which will be the schedule of e (one packed int per day)
+            schedule = [0] * len(DAYS_OF_WEEK)
+            ## Generate a set of valid work days
+            ## For set of all work days - valid work days, produce the corresponding index in schedule
+            ## and fill it with BITS_PER_DAY 0s (as this is a day they cannot work)
+            ## Note that this is implicitly true because of the previous line
+            
+            
+            ## A variable which will track the hours alloted thus far, allows us to probabalistically 
+            ## ensure that as the hoursThusFar gets closer to max hours alloted for the student
+            ## the probability of the student getting a shift gets smaller
+            hoursThusFarForEmp = 0 
+            
+            while(len(valid_days_set) > 0):
+                # d = random.sample(list(valid_days_set), 1)[0]
+                d = self.sample_day_based_on_zero_density(curr_emp_id, valid_days_set, employeeToAvailabilityIslands)
+                if(d == None): ## Case: no days with islands left for this individual
+                    break
+                valid_days_set.remove(d) ## Remove the one you picked so it reduces
+                islands_e_d = employeeToAvailabilityIslands[curr_emp_id][d]
+
+
+
+                
+                if not islands_e_d: ## If no islands on this day, we can't assign them work here (no availability). 
+                    continue
+                ## Here the current scheme is a 'coin flip' (coin flip is weighed in order to prevent exceeding of max_hour_limit of emp) to decide whether or not emp works on a day
+                ## Then, if they are working a 75% chance they work a shift that is 'low density'
+                ## and a 25% chance they just work a random shift
+                numerator = (emp_max_hours - hoursThusFarForEmp) if (emp_max_hours - hoursThusFarForEmp) > 0 else 0 ## if hoursThusFar is close in magnitude to emp_max_hours, it could still pass coin flip, but on next iteration hoursThusFar will be greater than emp_max_hours, this protects this case as result will be numerator is neg
+                employeeHoursFactor = numerator/emp_max_hours
+                if self.rng.randint(0,1) < employeeHoursFactor: #0.5: ## 50% of the time you might not work that day
+                    continue
+                
+                
+
+                probPickLowDensity = self.rng.randint(0,1) < 0.75 # some factor to say 20% of the time when available, they will not be scheduled
+                lowest_density_island = self.density_index.lowest_density_island[curr_emp_id][d]
+
+                # Case where emp has some availability on this day
+                chosen_island = self.rng.sample(islands_e_d, 1)[0]
+                if(probPickLowDensity):
+                    chosen_island = lowest_density_island
+                    
+                start, end = chosen_island ## Destructure the starting and ending indices of availability island
+
+                ## Ensure that adding in the hours from the chosen island will not tip over the employee past their max possible availability
+                if(hoursThusFarForEmp + ((end - start + 1)/4)) > emp_max_hours:
+                    continue
+                
+                
+                hoursThusFarForEmp = hoursThusFarForEmp + ((end - start + 1)/4) ## Since we are giving this emp this shift, add it in
+                schedule[d] = interval_mask(start, end)
+                self.add_shift_coverage(d, start, end)
+            
+           # This should never happen, its really just a flag which triggers a print in the algo-run to warn that it has happened
+            if(hoursThusFarForEmp > emp_max_hours): ## Checking if the LIMIT for a student's # of hours (currently 20 * 60 mins) has been exceeded
+                self.total_emp_hour_limit_violations =  self.total_emp_hour_limit_violations + (hoursThusFarForEmp - emp_max_hours)
+            self.scheduledHoursPerEmployee[curr_emp_id] = hoursThusFarForEmp
+            empToSchedule[curr_emp_id] = schedule
+
+            ## While the set of work days is not empty pick a random day d
+                ## For the (e,d) pair use a probabilistic methodology to pick the island/subset of island necessary - the shift assigned
+                ## Let us name the selected interval of indices (a,b). Set ONLY the bits between a and b
+                ## to the index in list meant by d
+            ## Now, produce a key value pair <employee_id, schedule> and add to empToSchedule
+        
+        return empToSchedule
+
+    """
+    Clear the running coverage counters: every slot in valid_work_hours starts out unfilled.
+    """
+    def reset_coverage(self):
+        first, last = self.valid_work_hours
+        self.coverage = [[0] * BITS_PER_DAY for _ in range(len(DAYS_OF_WEEK))]
+        self.unfilled = (last - first + 1) * len(DAYS_OF_WEEK)
+        self.overstaffed = 0
+
+    """
+    Count one more person on slots [start, end] of day d. Costs O(shift length), so the
+    unfilled/overstaffed totals are always current without rescanning the roster.
+    """
+    def add_shift_coverage(self, d: int, start: int, end: int):
+        first, last = self.valid_work_hours
+        day_coverage = self.coverage[d]
+        for i in range(start, end + 1):
+            day_coverage[i] += 1
+            if first <= i <= last:
+                if day_coverage[i] == 1:
+                    self.unfilled -= 1
+                elif day_coverage[i] == OVERSTAFFED_HEADCOUNT:
+                    self.overstaffed += 1
+
+    """
+    Coverage statistics of the last generated schedule.
+
+    Returns:
+        dict: unfilled and overstaffed slot counts inside valid_work_hours, plus the
+              7 x BITS_PER_DAY per-slot headcount.
+    """
+    def coverage_stats(self) -> dict:
+        return {
+            "unfilled": self.unfilled,
+            "overstaffed": self.overstaffed,
+            "coverage": self.coverage,
+        }
+
+    import random
+
+    def sample_day_based_on_zero_density(self, curr_emp_id, valid_days_set, employeeToAvailabilityIslands):
+        day_scores = {}  # day -> best (min) zero density from islands
+        
+        for d in valid_days_set:
+            islands_e_d = employeeToAvailabilityIslands[curr_emp_id][d]
+            if not islands_e_d:
+                continue  # No availability, skip
+            
+            day_scores[d] = self.density_index.min_island_density[curr_emp_id][d]
+        if not day_scores:
+            return None  # no valid day with islands
+
+        # Convert min_densities to weights (lower density = higher weight)
+        epsilon = 1e-6
+        days = list(day_scores.keys())
+        weights = [1 / (day_scores[day] + epsilon) for day in days]
+
+        # Sample based on weights
+        return self.rng.choices(days, weights=weights, k=1)[0]
+
+    
+    """
+    Given a bitstring representing availability for a single day,
+    return a set of (start_idx, end_idx) tuples indicating all
+    contiguous '0' blocks (islands of availability).
+
+    Args:
+        day_bits (str): A string of '0's and '1's representing availability.
+
+    Returns:
+        set[tuple]: A set of tuples (start_idx, end_idx), where each tuple
+                    represents an inclusive range of available time blocks.
+    """
+    def islands_in_day(self, day_bits: str) -> set[tuple]:
+        return mask_islands(free_mask(day_bits))
+    
+    def compute_zero_density(self, x: int, y: int, day: str) -> float:
+        # Convert day name to index, then answer from the prefix sums in O(1)
+        return self.density_index.density(x, y, DAYS_OF_WEEK.index(day))
+
+    
+
+
+    """
+    Extracts all availability islands for every employee in the database.
+
+    An "island" is a contiguous sequence of '0's in a day's availability string,
+    representing a block of available time. Islands are stored on Employee whenever availability is written
+    (Employee.refresh_availability_islands) and loaded when the ProblemInstance is compiled, so this only reads them back.
+
+    Returns:
+        dict: Mapping of employee_id -> list of sets availability islands
+        Each index in list refers to a day, and at each index we will find a set of availability
+        islands, where each availability island is an interval (a,b) which is a run of 0s, an interval
+        of time that the employee is free on that day
+    """
+    def extract_employee_availability_islands(self) -> dict:
+        empToSetAvailability = self.problem.islands_by_id ## Compiled once per request, shared read-only
+          #  print(emp_island_list)
+           # sys.exit()
+
+
+
+        return empToSetAvailability
+
+
+
+class GreedyScheduleEngine(ScheduleEngine):
+    """
+    Deterministic alternative to ScheduleEngine's sampling.
+
+    Covering the valid work hours is a max-coverage problem with a per-employee hour budget. Every
+    availability island on a valid day is a candidate shift; the engine repeatedly assigns the candidate
+    that covers the most still-unfilled slots, as long as the employee has no shift that day yet and the
+    shift fits their params['max_hours']. Coverage gains only ever shrink as shifts are added, so gains
+    are re-evaluated lazily: a popped candidate whose stored gain is out of date is pushed back with its
+    real gain instead of rescoring every candidate after each assignment.
+    """
+    def schedule_masks(self) -> dict:
+        employeeToAvailabilityIslands = self.extract_employee_availability_islands()
+        self.reset_coverage()
+        first, last = self.valid_work_hours
+        window = interval_mask(first, last)
+        employee_ids = self.problem.employee_ids
+
+        empToSchedule = {emp_id: [0] * len(DAYS_OF_WEEK) for emp_id in employee_ids}
+        max_hours = dict(zip(employee_ids, self.problem.max_hours.tolist()))
+        hours = {emp_id: 0 for emp_id in employee_ids}
+        covered = [0] * len(DAYS_OF_WEEK)
+
+        ## Max-heap on gain; ties go to the shorter shift, then the lower-density island, then roster order
+        heap = []
+        for order, emp_id in enumerate(employee_ids):
+            for d in self.problem.valid_days:
+                for start, end in employeeToAvailabilityIslands[emp_id][d]:
+                    length = end - start + 1
+                    gain = (window & interval_mask(start, end)).bit_count()
+                    if gain and length / 4 <= max_hours[emp_id]:
+                        heap.append((-gain, length, self.density_index.density(start, end, d), order, d, start, end))
+        heapq.heapify(heap)
+
+        while heap:
+            neg_gain, length, density, order, d, start, end = heapq.heappop(heap)
+            emp_id = employee_ids[order]
+            ## Once a day is taken or the hours no longer fit, the candidate can never become feasible again
+            if empToSchedule[emp_id][d] or hours[emp_id] + length / 4 > max_hours[emp_id]:
+                continue
+            gain = (window & ~covered[d] & interval_mask(start, end)).bit_count()
+            if gain == 0:
+                continue
+            if gain < -neg_gain: ## Stale gain: re-queue with the real value
+                heapq.heappush(heap, (-gain, length, density, order, d, start, end))
+                continue
+
+            empToSchedule[emp_id][d] = interval_mask(start, end)
+            covered[d] |= empToSchedule[emp_id][d]
+            hours[emp_id] += length / 4
+            self.add_shift_coverage(d, start, end)
+
+        self.scheduledHoursPerEmployee = hours
+        return empToSchedule
@@ -0,0 +1,79 @@
+# Vectorized conversion of calendar events into weekly busy grids.
+## Timestamps are parsed once per event into epoch seconds. They are shifted to America/New_York
+## local time with one UTC offset per distinct hour (DST changes on the hour), and then days and
+## 15 minute blocks come out of array arithmetic. The busy cells are painted with a +1/-1 difference
+## array and a cumulative sum, rather than a Python loop over every cell. Any number of students
+## are converted in one pass.
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+from .constants import BITS_PER_DAY
+
+TIMEZONE = pytz.timezone("America/New_York")
+BLOCK_SECONDS = 86400 // BITS_PER_DAY
+
+
+def _epoch(timestamp):
+    ## Naive timestamps are taken as server-local time, like datetime.astimezone() does
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_local(epoch: np.ndarray) -> np.ndarray:
+    """Epoch seconds -> seconds since 1970-01-01 00:00 New York wall-clock time."""
+    hours = np.floor_divide(epoch, 3600).astype(np.int64)
+    unique_hours, inverse = np.unique(hours, return_inverse=True)
+    offsets = np.array([datetime.fromtimestamp(int(hour) * 3600, TIMEZONE).utcoffset().total_seconds() for hour in unique_hours])
+    return epoch + offsets[inverse.reshape(-1)] if len(epoch) else epoch
+
+
+def events_to_busy_matrices(event_lists) -> np.ndarray:
+    """
+    Busy grids for many students at once.
+
+    Each event is painted from its start block to its end block on the day it starts (both in New York
+    time); an event without a valid end lasts one block. Events without a valid start are skipped.
+
+    Args:
+        event_lists (list): One list of {"start": iso, "end": iso} events per student.
+
+    Returns:
+        np.ndarray: Boolean (students, 7, BITS_PER_DAY) array, True where the student is busy.
+    """
+    owners, starts, ends = [], [], []
+    for owner, events in enumerate(event_lists):
+        for event in events:
+            start = _epoch(event.get("start"))
+            if start is None:
+                continue
+            owners.append(owner)
+            starts.append(start)
+            ends.append(_epoch(event.get("end")) if event.get("end") else None)
+
+    busy = np.zeros((len(event_lists), 7, BITS_PER_DAY + 1), dtype=np.int32)
+    if not owners:
+        return busy[..., :BITS_PER_DAY].astype(bool)
+    owners = np.array(owners)
+    start_local = _to_local(np.array(starts, dtype=float))
+    has_end = np.array([end is not None for end in ends])
+    end_local = start_local + BLOCK_SECONDS ## Default: one block of wall-clock time
+    if has_end.any():
+        end_local[has_end] = _to_local(np.array([end for end in ends if end is not None], dtype=float))
+
+    days = (np.floor_divide(start_local, 86400).astype(np.int64) + 3) % 7 ## 1970-01-01 was a Thursday
+    start_blocks = np.clip(np.floor_divide(np.mod(start_local, 86400), BLOCK_SECONDS).astype(np.int64), 0, BITS_PER_DAY - 1)
+    end_blocks = np.clip(np.floor_divide(np.mod(end_local, 86400), BLOCK_SECONDS).astype(np.int64), 0, BITS_PER_DAY)
+    painted = end_blocks > start_blocks
+    np.add.at(busy, (owners[painted], days[painted], start_blocks[painted]), 1)
+    np.add.at(busy, (owners[painted], days[painted], end_blocks[painted]), -1)
+    return np.cumsum(busy, axis=-1)[..., :BITS_PER_DAY] > 0
+
+
+def grids_to_masks(grids: np.ndarray) -> list:
+    """(students, 7, BITS_PER_DAY) boolean grids -> per student, 7 day masks with bit i set where slot i is True."""
+    packed = np.packbits(grids, axis=-1, bitorder="little")
+    return [[int.from_bytes(day.tobytes(), "little") for day in week] for week in packed]
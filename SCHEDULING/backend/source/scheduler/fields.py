@@ -0,0 +1,89 @@
+# Compact binary storage for a week of day masks.
+## A week of 96-slot days as JSON is a 700-2,000 byte string that every roster load has to parse. As
+## packed bits it is 7 x 12 bytes. PackedWeekField stores exactly that in a BinaryField and hands
+## back the engine's own representation, a list of 7 int masks (bit i = slot i, see bitmask.py), so
+## loading a roster does no per-row parsing beyond int.from_bytes. PackedIslandsField does the same
+## for the availability islands derived from those masks: a count byte per day, then one
+## (start, end) byte pair per island.
+import base64
+
+from django.db import models
+
+from .constants import BITS_PER_DAY
+
+
+def pack_week(masks, width: int = BITS_PER_DAY) -> bytes:
+    """7 day masks -> 7 * ceil(width / 8) little-endian bytes."""
+    num_bytes = (width + 7) // 8
+    return b"".join(mask.to_bytes(num_bytes, "little") for mask in masks)
+
+
+def unpack_week(raw: bytes, width: int = BITS_PER_DAY) -> list:
+    """Inverse of pack_week."""
+    num_bytes = (width + 7) // 8
+    return [int.from_bytes(raw[i:i + num_bytes], "little") for i in range(0, len(raw), num_bytes)]
+
+
+class PackedWeekField(models.BinaryField):
+    """A week of day masks (list of 7 ints) stored as pack_week() bytes."""
+    def __init__(self, *args, width: int = BITS_PER_DAY, **kwargs):
+        self.width = width
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.width != BITS_PER_DAY:
+            kwargs["width"] = self.width
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else unpack_week(bytes(value), self.width)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, list):
+            return value
+        return unpack_week(bytes(super().to_python(value)), self.width) ## bytes, memoryview or base64 text
+
+    def get_prep_value(self, value):
+        if isinstance(value, (list, tuple)):
+            value = pack_week(value, self.width)
+        return super().get_prep_value(value)
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        return None if value is None else base64.b64encode(pack_week(value, self.width)).decode("ascii")
+
+
+def pack_islands(week) -> bytes:
+    """7 lists of inclusive (start, end) islands -> per day, a count byte followed by start/end byte pairs."""
+    return b"".join(bytes([len(day), *(slot for island in day for slot in island)]) for day in week)
+
+
+def unpack_islands(raw: bytes) -> list:
+    """Inverse of pack_islands; islands come back as tuples, like bitmask.mask_islands returns them."""
+    week, i = [], 0
+    while i < len(raw):
+        count = raw[i]
+        week.append([(raw[j], raw[j + 1]) for j in range(i + 1, i + 1 + 2 * count, 2)])
+        i += 1 + 2 * count
+    return week
+
+
+class PackedIslandsField(models.BinaryField):
+    """A week of availability islands (7 lists of (start, end) tuples) stored as pack_islands() bytes."""
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else unpack_islands(bytes(value))
+
+    def to_python(self, value):
+        if value is None or isinstance(value, list):
+            return value
+        return unpack_islands(bytes(super().to_python(value)))
+
+    def get_prep_value(self, value):
+        if isinstance(value, (list, tuple)):
+            value = pack_islands(value)
+        return super().get_prep_value(value)
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        return None if value is None else base64.b64encode(pack_islands(value)).decode("ascii")
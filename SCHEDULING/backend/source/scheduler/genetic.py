@@ -0,0 +1,165 @@
+# Genetic algorithm over whole rosters, vectorized with NumPy.
+## An individual is a full week for every employee. The population is kept packed: one byte per
+## 8 slots, so shape (population, employees, 7, width / 8). Every (employee, day) row is either
+## empty or exactly one of that employee's availability islands, and crossover / mutation only ever
+## copy or swap whole rows, so availability can never be violated. Rows mixed from two parents can go
+## over an employee's max_hours, which a vectorized repair step fixes by dropping days.
+import time
+
+import numpy as np
+
+from .batch_sampler import BatchScheduleSampler
+from .budget import SearchBudget
+from .constants import DAYS_OF_WEEK, OVERSTAFFED_HEADCOUNT
+from .density import ZeroDensityIndex
+from .problem import ProblemInstance
+from .scoring import ParetoFront, score_candidates
+from .topk import TopK
+
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class GeneticScheduleEngine:
+    def __init__(self,
+                 employees,
+                 population_size: int = 200,
+                 tournament_size: int = 3,
+                 mutation_rate: float = 0.02,
+                 elite: int = 5,
+                 valid_work_days=DAYS_OF_WEEK,
+                 valid_work_hours: tuple = (28, 83),
+                 density_index: ZeroDensityIndex = None,
+                 seed=None,
+                 problem: ProblemInstance = None):
+        """
+        Args:
+            employees (List[Employee]): Employee model instances.
+            population_size (int): Individuals per generation.
+            tournament_size (int): Contestants per tournament when picking a parent.
+            mutation_rate (float): Chance that any one (employee, day) row is swapped for another island (or emptied).
+            elite (int): Best individuals copied unchanged into the next generation.
+            valid_work_days (List[str]): Days that may be scheduled.
+            valid_work_hours (tuple): Inclusive slot range that has to be covered each day.
+            density_index (ZeroDensityIndex): Shared density tables, used by the initial sampler.
+            seed: Seed (or np.random.Generator) for the whole run.
+            problem (ProblemInstance): The compiled roster; replaces employees and the day / hour / density arguments.
+        """
+        self.rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+        self.population_size = population_size
+        self.tournament_size = tournament_size
+        self.mutation_rate = mutation_rate
+        self.elite = min(elite, population_size)
+        self.generations = 0
+        self.generations_per_second = 0.0
+
+        ## The first generation is drawn with ScheduleEngine's own sampling rules
+        self.sampler = BatchScheduleSampler(employees, valid_work_days, valid_work_hours, density_index, seed=self.rng, problem=problem)
+        self.valid_work_hours = self.sampler.valid_work_hours
+        self.employee_ids = self.sampler.employee_ids
+        self.max_hours = self.sampler.max_hours
+        self.allowed = self.sampler.day_weight > 0 ## (employees, 7): rows that may hold a shift
+
+        ## Packed row for every island, plus a trailing all-zero row used for "no shift"
+        num_emps, num_days, max_islands = self.sampler.island_start.shape
+        self.width = self.sampler.width
+        slots = np.arange(self.width)
+        island_bits = (slots >= self.sampler.island_start[..., None]) & (slots <= self.sampler.island_end[..., None])
+        island_bits = np.concatenate([island_bits, np.zeros((num_emps, num_days, 1, self.width), dtype=bool)], axis=2)
+        self.island_rows = np.packbits(island_bits, axis=-1, bitorder="little")
+
+    def fitness(self, population: np.ndarray) -> tuple:
+        """Unfilled and overstaffed slot counts inside valid_work_hours for every individual."""
+        first, last = self.valid_work_hours
+        bits = np.unpackbits(population, axis=-1, count=self.width, bitorder="little")[..., first:last + 1]
+        coverage = bits.sum(axis=1, dtype=np.int32)
+        return (coverage == 0).sum(axis=(1, 2)), (coverage >= OVERSTAFFED_HEADCOUNT).sum(axis=(1, 2))
+
+    def _rank_key(self, unfilled, overstaffed):
+        ## Lexicographic (unfilled, overstaffed) as one integer; overstaffed can never reach the multiplier
+        first, last = self.valid_work_hours
+        return unfilled.astype(np.int64) * ((last - first + 2) * len(DAYS_OF_WEEK)) + overstaffed
+
+    def _tournament(self, keys: np.ndarray, n: int) -> np.ndarray:
+        contestants = self.rng.integers(0, len(keys), size=(n, self.tournament_size))
+        return contestants[np.arange(n), np.argmin(keys[contestants], axis=1)]
+
+    def _mutate(self, children: np.ndarray):
+        hit = (self.rng.random(children.shape[:3]) < self.mutation_rate) & self.allowed[None]
+        n_idx, e_idx, d_idx = np.nonzero(hit)
+        ## Uniform over the row's islands plus one extra value meaning "no shift"
+        counts = self.sampler.island_count[e_idx, d_idx].astype(np.int64)
+        choice = (self.rng.random(len(e_idx)) * (counts + 1)).astype(np.int64)
+        choice = np.where(choice == counts, self.island_rows.shape[2] - 1, choice)
+        children[n_idx, e_idx, d_idx] = self.island_rows[e_idx, d_idx, choice]
+
+    def _repair(self, children: np.ndarray):
+        """Drop days in random order from every (individual, employee) that is over max_hours."""
+        day_hours = POPCOUNT[children].sum(axis=-1) / 4
+        hours = day_hours.sum(axis=-1)
+        order = np.argsort(self.rng.random(day_hours.shape), axis=-1)
+        for step in range(day_hours.shape[-1]):
+            over = hours > self.max_hours[None, :]
+            if not over.any():
+                break
+            d = order[..., step]
+            n_idx, e_idx = np.nonzero(over)
+            d_idx = d[over]
+            hours[over] -= day_hours[n_idx, e_idx, d_idx]
+            children[n_idx, e_idx, d_idx] = 0
+
+    def to_masks(self, individual: np.ndarray) -> dict:
+        """Convert one packed individual into ScheduleEngine.schedule_masks() format."""
+        return {
+            emp_id: [int.from_bytes(individual[e, d].tobytes(), "little") for d in range(individual.shape[1])]
+            for e, emp_id in enumerate(self.employee_ids)
+        }
+
+    def run(self, budget: SearchBudget, k: int = 5, front: ParetoFront = None, max_man_hours: float = 0, slots_per_hour: float = 4) -> list:
+        """
+        Evolve until the budget runs out. Every individual evaluated counts as one iteration.
+
+        Args:
+            budget (SearchBudget): Iteration cap, deadline and stall window.
+            k (int): Number of schedules to return.
+            front (ParetoFront): If given, every generation is also scored on all objectives and offered to it.
+            max_man_hours (float), slots_per_hour (float): Passed to scoring.score_candidates for the front.
+
+        Returns:
+            list[tuple]: Up to k distinct (unfilled, schedule_masks) pairs, best first.
+        """
+        started = time.monotonic()
+        population = np.packbits(self.sampler.sample(self.population_size), axis=-1, bitorder="little")
+        best = TopK(k)
+        seen = set()
+
+        while True:
+            unfilled, overstaffed = self.fitness(population)
+            keys = self._rank_key(unfilled, overstaffed)
+            ranked = np.argsort(keys, kind="stable")
+            for i in ranked[:k]:
+                fingerprint = population[i].tobytes()
+                if fingerprint not in seen and best.would_accept(int(keys[i])):
+                    seen.add(fingerprint)
+                    best.offer(int(keys[i]), (int(unfilled[i]), self.to_masks(population[i])))
+            if front is not None:
+                bits = np.unpackbits(population, axis=-1, count=self.width, bitorder="little").astype(bool)
+                scores = score_candidates(bits, self.valid_work_hours, max_man_hours, slots_per_hour)
+                front.offer_batch(scores, lambda i: self.to_masks(population[i]))
+            budget.record(len(population), int(unfilled[ranked[0]]), best=lambda: self.to_masks(population[ranked[0]]))
+            if budget.should_stop():
+                break
+
+            num_children = self.population_size - self.elite
+            parents_a = self._tournament(keys, num_children)
+            parents_b = self._tournament(keys, num_children)
+            ## Uniform crossover per (employee, day) row
+            take_b = self.rng.random((num_children,) + population.shape[1:3]) < 0.5
+            children = np.where(take_b[..., None], population[parents_b], population[parents_a])
+            self._mutate(children)
+            self._repair(children)
+            population = np.concatenate([population[ranked[:self.elite]], children])
+            self.generations += 1
+
+        elapsed = time.monotonic() - started
+        self.generations_per_second = self.generations / elapsed if elapsed > 0 else 0.0
+        return [payload for _, payload in best.results()]
@@ -0,0 +1,216 @@
+# Bulk roster ingestion.
+## Onboarding a semester means thousands of students at once. Creating them one
+## Employee.objects.create() at a time costs an INSERT and a commit per row, and it fails on a
+## re-submission because employee_id is the primary key. Here the whole payload is parsed and
+## validated first. Every valid row is then upserted in one transaction, with bulk_create for new
+## employees and bulk_update for existing ones. Invalid rows are reported with their row number and
+## skipped; they do not abort the rest of the batch.
+import codecs
+import csv
+import json
+
+from django.db import transaction
+
+from .bitmask import availability_to_masks
+from .constants import BITS_PER_DAY
+from .availability_index import update_availability_index
+from .models import Employee
+from .result_cache import get_result_cache
+
+## New employees start with no free time and no hours until they submit availability and an admin sets max_hours
+DEFAULT_AVAILABILITY = [0] * 7 ## Free masks: no free slot on any day
+DEFAULT_PARAMS = {"max_hours": 0, "f1_status": False, "priority": 0}
+
+
+def iter_roster_rows(stream, content_type: str):
+    """
+    Parse an upload into (row number, dict) pairs, reading JSON Lines and CSV line by line.
+
+    Args:
+        stream: A binary file-like object (the request itself works).
+        content_type (str): application/json ({"listofstudents": [...]} or a bare list),
+                            application/x-ndjson or application/jsonl (one object per line), or text/csv
+                            (header row; columns as in validate_roster_row, availability not supported).
+
+    Yields:
+        tuple: (row number starting at 1, row dict, or None if the row could not be parsed).
+
+    Raises:
+        ValueError: The body is not valid UTF-8, or a JSON body is malformed.
+    """
+    content_type = content_type.split(";")[0].strip().lower()
+    if content_type == "text/csv":
+        for number, row in enumerate(csv.DictReader(codecs.iterdecode(stream, "utf-8-sig")), start=1):
+            yield number, {key.strip(): value.strip() for key, value in row.items() if key and value is not None and value.strip() != ""}
+    elif content_type in ("application/x-ndjson", "application/jsonl", "application/json-lines"):
+        number = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+    else:
+        body = json.loads(stream.read())
+        rows = body.get("listofstudents", []) if isinstance(body, dict) else body
+        if not isinstance(rows, list):
+            raise ValueError("expected a list of students")
+        for number, row in enumerate(rows, start=1):
+            yield number, row
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("true", "1", "yes"):
+        return True
+    if isinstance(value, str) and value.lower() in ("false", "0", "no"):
+        return False
+    raise ValueError
+
+
+def validate_roster_row(row) -> tuple:
+    """
+    Check one row and normalize it.
+
+    Accepted keys: student_id (required), employee_id (defaults to student_id), student_email or email, first_name, last_name,
+    max_hours (>= 0), f1_status (bool), priority (int), availability (7 strings of BITS_PER_DAY '0'/'1', '0' = free; returned as
+    availability_bits, the free masks Employee stores).
+
+    Returns:
+        tuple: (fields dict, list of error messages). fields only holds the keys the row provided.
+    """
+    if not isinstance(row, dict):
+        return {}, ["row must be an object"]
+    fields, errors = {}, []
+
+    student_id = row.get("student_id")
+    if isinstance(student_id, int) and not isinstance(student_id, bool):
+        student_id = str(student_id)
+    if not isinstance(student_id, str) or not student_id.strip() or len(student_id) > 100:
+        errors.append("student_id must be a non-empty string of at most 100 characters")
+    else:
+        fields["student_id"] = student_id.strip()
+    employee_id = row.get("employee_id", fields.get("student_id"))
+    if employee_id is not None:
+        employee_id = str(employee_id).strip()
+        if not employee_id or len(employee_id) > 100:
+            errors.append("employee_id must be a non-empty string of at most 100 characters")
+        else:
+            fields["employee_id"] = employee_id
+
+    email = row.get("student_email", row.get("email"))
+    if email is not None:
+        if not isinstance(email, str) or len(email) > 100:
+            errors.append("email must be a string of at most 100 characters")
+        else:
+            fields["email"] = email.strip()
+    for key in ("first_name", "last_name"):
+        if row.get(key) is not None:
+            if not isinstance(row[key], str) or len(row[key]) > 100:
+                errors.append(f"{key} must be a string of at most 100 characters")
+            else:
+                fields[key] = row[key].strip()
+
+    params = {}
+    try:
+        if "max_hours" in row:
+            params["max_hours"] = float(row["max_hours"])
+            if params["max_hours"] < 0:
+                raise ValueError
+            if params["max_hours"].is_integer():
+                params["max_hours"] = int(params["max_hours"])
+    except (TypeError, ValueError):
+        errors.append("max_hours must be a non-negative number")
+    try:
+        if "f1_status" in row:
+            params["f1_status"] = _parse_bool(row["f1_status"])
+    except ValueError:
+        errors.append("f1_status must be true or false")
+    try:
+        if "priority" in row:
+            if isinstance(row["priority"], (bool, float)):
+                raise ValueError
+            params["priority"] = int(row["priority"])
+    except (TypeError, ValueError):
+        errors.append("priority must be an integer")
+    if params:
+        fields["params"] = params
+
+    availability = row.get("availability")
+    if availability is not None:
+        if (not isinstance(availability, list) or len(availability) != 7 or not all(
+                isinstance(day, str) and len(day) == BITS_PER_DAY and set(day) <= {"0", "1"} for day in availability)):
+            errors.append(f"availability must be 7 strings of {BITS_PER_DAY} '0'/'1' characters")
+        else:
+            fields["availability_bits"] = availability_to_masks(availability)
+    return fields, errors
+
+
+def ingest_roster(rows, batch_size: int = 500) -> dict:
+    """
+    Validate every row, then upsert the valid ones in a single transaction.
+
+    A later row for the same employee_id is reported as a duplicate and skipped. Existing employees
+    keep whatever a row does not mention; params are merged key by key.
+
+    Args:
+        rows: (row number, row dict) pairs, e.g. from iter_roster_rows.
+        batch_size (int): Rows per INSERT / UPDATE statement.
+
+    Returns:
+        dict: {"created": n, "updated": n, "errors": [{"row", "employee_id", "errors"}, ...]}
+    """
+    valid, errors = {}, []
+    for number, row in rows:
+        fields, row_errors = validate_roster_row(row) if row is not None else ({}, ["row is not valid JSON"])
+        employee_id = fields.get("employee_id")
+        if not row_errors and employee_id in valid:
+            row_errors = [f"duplicate employee_id (first seen in row {valid[employee_id][0]})"]
+        if row_errors:
+            errors.append({"row": number, "employee_id": employee_id, "errors": row_errors})
+        else:
+            valid[employee_id] = (number, fields)
+
+    with transaction.atomic():
+        existing = Employee.objects.in_bulk(list(valid))
+        created, updated = [], []
+        availability_changed = False
+        for employee_id, (_, fields) in valid.items():
+            employee = existing.get(employee_id)
+            if employee is None:
+                employee = Employee(
+                    employee_id=employee_id,
+                    student_id=fields["student_id"],
+                    email=fields.get("email", ""),
+                    first_name=fields.get("first_name", ""),
+                    last_name=fields.get("last_name", ""),
+                    availability_bits=fields.get("availability_bits", list(DEFAULT_AVAILABILITY)),
+                    params=dict(DEFAULT_PARAMS, **fields.get("params", {})),
+                )
+                employee.refresh_availability_islands()
+                created.append(employee)
+                continue
+            employee.student_id = fields["student_id"]
+            employee.email = fields.get("email", employee.email)
+            employee.first_name = fields.get("first_name", employee.first_name)
+            employee.last_name = fields.get("last_name", employee.last_name)
+            employee.params = dict(employee.params or {}, **fields.get("params", {}))
+            if fields.get("availability_bits", employee.availability_bits) != employee.availability_bits:
+                employee.availability_bits = fields["availability_bits"]
+                employee.refresh_availability_islands() ## Only rows whose availability changed pay for new islands
+                availability_changed = True
+            updated.append(employee)
+        update_fields = ["student_id", "email", "first_name", "last_name", "params"]
+        if availability_changed:
+            update_fields += ["availability_bits", "availability_islands"]
+        Employee.objects.bulk_create(created, batch_size=batch_size)
+        Employee.objects.bulk_update(updated, update_fields, batch_size=batch_size)
+
+    cache = get_result_cache()
+    for employee in updated:
+        cache.invalidate_employee(employee.employee_id)
+    update_availability_index(created + updated)
+    return {"created": len(created), "updated": len(updated), "errors": errors}
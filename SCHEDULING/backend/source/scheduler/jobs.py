@@ -0,0 +1,200 @@
+# Background queue for schedule generation.
+## A long search should not hold a web request open, so a job API stores the request as a
+## ScheduleJob row and a small thread pool in the server process runs it. No broker is needed:
+## the database is the queue. Workers claim a job with a conditional UPDATE, so only one worker
+## (in any process) runs each job. While it runs, the job's budget writes progress back every
+## poll_interval seconds and checks whether a cancel was requested, and a heartbeat thread owned by the
+## worker bumps updated_at, also while the search is outside the budget's reach (greedy, polish,
+## formatting). Jobs left "running" by a process that died stop sending heartbeats; they are put back
+## in the queue when the queue starts (on the first request a server process handles, see apps.py) and
+## whenever a new job is submitted. Every write a worker makes
+## is conditional on its claim (the started_at it set), so a run whose job was requeued and claimed
+## again cannot overwrite the new run's result.
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.http import HttpResponse
+from django.utils import timezone
+
+from .budget import SearchBudget
+from .models import ScheduleJob
+
+
+def claimed_job(job_id, claimed_at):
+    """The job's row, as long as the run that claimed it at claimed_at still owns it."""
+    return ScheduleJob.objects.filter(pk=job_id, status=ScheduleJob.RUNNING, started_at=claimed_at)
+
+
+class JobBudget(SearchBudget):
+    """SearchBudget that reports progress to its ScheduleJob row and stops when the job is cancelled."""
+    interruptible = True
+
+    def __init__(self, job_id, claimed_at, *args, poll_interval: float = 1.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.job_id = job_id
+        self.claimed_at = claimed_at
+        self.poll_interval = poll_interval
+        self._last_poll = time.monotonic()
+
+    def progress(self) -> dict:
+        return dict(self.summary(), max_iterations=self.max_iterations)
+
+    def should_stop(self) -> bool:
+        if self.stop_reason is None and time.monotonic() - self._last_poll >= self.poll_interval:
+            self._last_poll = time.monotonic()
+            jobs = claimed_job(self.job_id, self.claimed_at)
+            jobs.update(progress=self.progress())
+            if jobs.filter(cancel_requested=True).exists():
+                self.stop_reason = "cancelled"
+        return super().should_stop()
+
+
+def job_status(job: ScheduleJob) -> dict:
+    """The JSON shape the job endpoints return. result is only filled in once the job has finished."""
+    return {
+        "job_id": job.pk,
+        "status": job.status,
+        "progress": job.progress,
+        "cancel_requested": job.cancel_requested,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "error": job.error or None,
+        "result": job.result,
+    }
+
+
+class JobQueue:
+    def __init__(self, run, workers: int = 1, poll_interval: float = 1.0, stale_after: float = 60, heartbeat_interval: float = None):
+        """
+        Args:
+            run (callable): run(params, budget_cls) does the work; returns the result dict or an error HttpResponse.
+            workers (int): Jobs run at the same time in this process.
+            poll_interval (float): Seconds between progress writes and cancel checks of a running job.
+            stale_after (float): A running job without a heartbeat for this long is considered orphaned.
+            heartbeat_interval (float): Seconds between heartbeats of a running job (default stale_after / 4).
+        """
+        self.run = run
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.heartbeat_interval = stale_after / 4 if heartbeat_interval is None else heartbeat_interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="schedule-job")
+        self._lock = threading.Lock()
+        self._pending = set() ## Job ids handed to the pool and not started yet
+
+    def submit(self, params: dict) -> ScheduleJob:
+        """Store a new job and hand it to the pool."""
+        self.recover()
+        job = ScheduleJob.objects.create(params=params)
+        self._enqueue(job.pk)
+        return job
+
+    def cancel(self, job_id) -> bool:
+        """
+        Cancel a job. A queued job is cancelled right away; a running one stops at its next progress poll
+        and keeps the best schedules found so far as its result.
+
+        Returns:
+            bool: False if the job had already finished.
+        """
+        if ScheduleJob.objects.filter(pk=job_id, status=ScheduleJob.QUEUED).update(status=ScheduleJob.CANCELLED, cancel_requested=True, finished_at=timezone.now()):
+            return True
+        return bool(ScheduleJob.objects.filter(pk=job_id, status=ScheduleJob.RUNNING).update(cancel_requested=True))
+
+    def recover(self) -> int:
+        """Requeue running jobs whose heartbeat is older than stale_after and submit every queued job. Returns how many were requeued."""
+        stale = timezone.now() - timedelta(seconds=self.stale_after)
+        requeued = ScheduleJob.objects.filter(status=ScheduleJob.RUNNING, updated_at__lt=stale).update(status=ScheduleJob.QUEUED, started_at=None)
+        for job_id in ScheduleJob.objects.filter(status=ScheduleJob.QUEUED).order_by("created_at").values_list("pk", flat=True):
+            self._enqueue(job_id)
+        return requeued
+
+    def _enqueue(self, job_id):
+        with self._lock:
+            if job_id in self._pending:
+                return
+            self._pending.add(job_id)
+        self._executor.submit(self.run_job, job_id)
+
+    def run_job(self, job_id):
+        """Claim and run one job (a no-op if it is no longer queued). Runs on a pool thread."""
+        with self._lock:
+            self._pending.discard(job_id)
+        try:
+            claimed_at = timezone.now()
+            if not ScheduleJob.objects.filter(pk=job_id, status=ScheduleJob.QUEUED).update(status=ScheduleJob.RUNNING, started_at=claimed_at, updated_at=claimed_at):
+                return ## Cancelled, or claimed by another worker
+            job = ScheduleJob.objects.get(pk=job_id)
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, claimed_at, stop), name=f"schedule-job-{job_id}-heartbeat", daemon=True)
+            heartbeat.start()
+            try:
+                result = self.run(job.params, partial(JobBudget, job_id, claimed_at, poll_interval=self.poll_interval))
+            except Exception as e:
+                result = e
+            finally:
+                stop.set()
+                heartbeat.join()
+
+            fields = {"finished_at": timezone.now(), "updated_at": timezone.now()}
+            if isinstance(result, HttpResponse):
+                fields.update(status=ScheduleJob.FAILED, error=response_error(result))
+            elif isinstance(result, Exception):
+                fields.update(status=ScheduleJob.FAILED, error=str(result))
+            else:
+                stopped = result["search"].get("stop_reason")
+                fields.update(
+                    status=ScheduleJob.CANCELLED if stopped == "cancelled" else ScheduleJob.SUCCEEDED,
+                    result=result,
+                    progress=dict(job.progress, **{key: result["search"].get(key) for key in ("iterations", "best_unfilled", "elapsed_seconds", "stop_reason")}),
+                )
+            claimed_job(job_id, claimed_at).update(**fields) ## A no-op if the job was requeued and claimed again meanwhile
+        finally:
+            close_old_connections() ## Pool threads are not request threads; nothing else closes their connection
+
+    def _heartbeat(self, job_id, claimed_at, stop: threading.Event):
+        """Bump updated_at every heartbeat_interval seconds until stop is set. Runs on its own thread."""
+        try:
+            while not stop.wait(self.heartbeat_interval):
+                try:
+                    claimed_job(job_id, claimed_at).update(updated_at=timezone.now())
+                except DatabaseError:
+                    pass ## Try again at the next beat; a job only goes stale after several missed beats
+        finally:
+            close_old_connections()
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+def response_error(response: HttpResponse) -> str:
+    """The message of an error response from generate_schedule (JSON {"error": ...} or plain text)."""
+    content = response.content.decode(errors="replace")
+    try:
+        return json.loads(content).get("error", content)
+    except (ValueError, AttributeError):
+        return content
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue(run) -> JobQueue:
+    """
+    The process-wide queue, configured by the SCHEDULE_JOB_QUEUE setting (a dict of JobQueue arguments:
+    workers, poll_interval, stale_after). Started on first use, which also picks up jobs left over from
+    before a restart; views.start_job_queue makes that the first request a server process handles.
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(run, **getattr(settings, "SCHEDULE_JOB_QUEUE", {}))
+            _job_queue.recover()
+    return _job_queue
@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from scheduler.engine import ScheduleEngine
+from scheduler.benchmark import DEFAULT_DENSITIES, DEFAULT_SIZES, run_benchmarks
+from scheduler.views import format_all_schedules
+
+
+class Command(BaseCommand):
+    help = "Time the scheduling engine on seeded synthetic rosters and write the results to JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Roster sizes (employees).")
+        parser.add_argument("--densities", type=float, nargs="+", default=list(DEFAULT_DENSITIES), help="Share of the working window employees are free for.")
+        parser.add_argument("--repeat", type=int, default=5, help="Timings per benchmark.")
+        parser.add_argument("--seed", type=int, default=0, help="Roster and engine seed.")
+        parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write.")
+
+    def handle(self, *args, **options):
+        report = run_benchmarks(
+            ScheduleEngine,
+            format_all_schedules,
+            sizes=options["sizes"],
+            densities=options["densities"],
+            repeat=options["repeat"],
+            seed=options["seed"],
+            log=self.stdout.write,
+        )
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2)
+        for row in report["results"]:
+            self.stdout.write(f"{row['employees']:>5} employees, density {row['density']}: schedule() {row['benchmarks']['schedule']['median_ms']} ms")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0004_schedulejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='first_name',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='last_name',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
@@ -0,0 +1,90 @@
+from django.db import migrations, models
+
+import scheduler.fields
+
+
+def fill_packed_storage(apps, schema_editor):
+    ## The old submit_availability stored the submitted busy grid (7 days x 96 slots, 1 = busy) in
+    ## `schedule`, so that column holds availability, not a work schedule: its complement becomes
+    ## availability_bits and schedule_bits starts out empty. Rows that never submitted fall back to
+    ## `availability` ('0' = free, as the old engine read it), and otherwise have no free time.
+    from scheduler.bitmask import free_mask, mask_islands
+
+    Employee = apps.get_model('scheduler', 'Employee')
+    employees = list(Employee.objects.all())
+    for employee in employees:
+        if isinstance(employee.schedule, list) and len(employee.schedule) == 7:
+            free = [free_mask(day) for day in employee.schedule]
+        elif isinstance(employee.availability, list) and len(employee.availability) == 7:
+            free = [free_mask(day) for day in employee.availability]
+        else:
+            free = [0] * 7
+        employee.availability_bits = free
+        employee.schedule_bits = []
+        employee.availability_islands = [mask_islands(mask) for mask in free]
+    Employee.objects.bulk_update(employees, ['availability_bits', 'schedule_bits', 'availability_islands'], batch_size=500)
+
+
+def restore_json_columns(apps, schema_editor):
+    from scheduler.bitmask import masks_to_availability
+    from scheduler.constants import BITS_PER_DAY
+
+    Employee = apps.get_model('scheduler', 'Employee')
+    employees = list(Employee.objects.all())
+    for employee in employees:
+        free = employee.availability_bits or [0] * 7
+        employee.availability = masks_to_availability(free)
+        employee.schedule = [[0 if mask >> i & 1 else 1 for i in range(BITS_PER_DAY)] for mask in free] ## The busy grid, as submit_availability wrote it
+    Employee.objects.bulk_update(employees, ['availability', 'schedule'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    ## Availability moves to packed day masks (see fields.py), with its islands stored next to it, and
+    ## the JSON columns are dropped. They are made nullable first, so that a reverse migration can add
+    ## them back empty and refill them from the masks.
+
+    dependencies = [
+        ('scheduler', '0005_employee_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='availability_bits',
+            field=scheduler.fields.PackedWeekField(null=True),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='schedule_bits',
+            field=scheduler.fields.PackedWeekField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='availability_islands',
+            field=scheduler.fields.PackedIslandsField(blank=True, default=list),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='availability',
+            field=models.JSONField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='schedule',
+            field=models.JSONField(null=True),
+        ),
+        migrations.RunPython(fill_packed_storage, restore_json_columns),
+        migrations.RemoveField(
+            model_name='employee',
+            name='availability',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='schedule',
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='availability_bits',
+            field=scheduler.fields.PackedWeekField(),
+        ),
+    ]
@@ -1,4 +1,8 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from .bitmask import mask_islands
+from .constants import BITS_PER_DAY
+from .fields import PackedIslandsField, PackedWeekField
 
 class AdminSubmission(models.Model):
     data = models.JSONField()
@@ -9,18 +13,25 @@ class SavedSchedules(models.Model):
 
 class Employee(models.Model):
     employee_id = models.CharField(max_length=100, primary_key=True)
-    availability = models.JSONField()  # List of 7 strings, each BITS_PER_DAY length
+    ## Availability and schedule are stored packed, 7 day masks per week (see fields.py): availability_bits
+    ## has bit i set where the employee is free in slot i (a '0' in the availability strings the API takes),
+    ## schedule_bits where they work. The engines read the masks as they are; strings only exist at the API
+    ## edge (bitmask.availability_to_masks / masks_to_availability).
+    availability_bits = PackedWeekField()
     params = models.JSONField()  
     '''# params Will contain the following mappings: 
     {'max_hours': int, 
     'f1_status': bool, 
     'priority': int}'''
     student_id = models.CharField(max_length=100)
-    schedule = models.JSONField()
+    schedule_bits = PackedWeekField(default=list, blank=True) ## Empty until a schedule is assigned
+    ## mask_islands() of each availability_bits day, stored so that compiling a problem does not re-extract
+    ## them. Bulk writes skip save(), so whatever sets availability_bits calls refresh_availability_islands().
+    availability_islands = PackedIslandsField(default=list, blank=True)
     submitted_at = models.DateTimeField(auto_now_add=True)
     email= models.CharField(max_length=100)
-    
-    
+    first_name = models.CharField(max_length=100, blank=True, default="") ## From the admin form; shown on formatted schedules
+    last_name = models.CharField(max_length=100, blank=True, default="")
 
     def generate_block_availability(self):
         availability = []
@@ -39,13 +50,50 @@ class Employee(models.Model):
     def __str__(self):
         return f"Employee {self.employee_id}"
 
+    def get_availability_masks(self) -> list:
+        """Per-day free masks."""
+        return list(self.availability_bits)
+
+    def refresh_availability_islands(self):
+        """Recompute availability_islands from availability_bits; call after changing availability_bits."""
+        self.availability_islands = [mask_islands(mask) for mask in self.availability_bits]
+
+    def get_availability_islands(self) -> list:
+        """Per-day lists of (start, end) availability islands, as stored at write time."""
+        if len(self.availability_islands or ()) != len(self.availability_bits):
+            return [mask_islands(mask) for mask in self.availability_bits] ## Never written (an unsaved instance)
+        return self.availability_islands
+
     def clean(self):
-        """Validate availability: 7 days, each with a BITS_PER_DAY-length bitstring of only '0' or '1'."""
-        if not isinstance(self.availability, list) or len(self.availability) != 7:
-            raise ValidationError("Availability must be a list of 7 bitstrings (Mon–Sun).")
-
-        for bitstring in self.availability:
-            if len(bitstring) != BITS_PER_DAY or not set(bitstring).issubset({"0", "1"}):
-                raise ValidationError(
-                    f"Each day's availability must be a {BITS_PER_DAY}-character binary string."
-                )
\ No newline at end of file
+        """Validate availability: 7 day masks of at most BITS_PER_DAY bits."""
+        if not isinstance(self.availability_bits, list) or len(self.availability_bits) != 7:
+            raise ValidationError("Availability must be a list of 7 day masks (Mon–Sun).")
+        for mask in self.availability_bits:
+            if not isinstance(mask, int) or not 0 <= mask < 1 << BITS_PER_DAY:
+                raise ValidationError(f"Each day's availability must be a {BITS_PER_DAY}-bit mask.")
+
+class ScheduleJob(models.Model):
+    """A generate_schedule request run in the background by the job queue (see jobs.py)."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    STATUS_CHOICES = [(status, status) for status in (QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED)]
+    FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+    params = models.JSONField() # The generate_schedule request body
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    ## Last reported search progress: iterations, max_iterations, best_unfilled, elapsed_seconds
+    progress = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True) # generate_schedule's response once the job is done
+    error = models.TextField(blank=True, default="")
+    cancel_requested = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    ## Heartbeat: bumped with every progress report, so a job whose worker died can be told from a slow one
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"ScheduleJob {self.pk} ({self.status})"
@@ -0,0 +1,120 @@
+# Coarse-to-fine search over the day grid.
+## The engines only see a ProblemInstance, so a coarse search is just a search on a coarsened
+## problem: every `factor` consecutive slots become one cell, and a cell counts as free only if the
+## employee is free for the whole cell (AND), so any coarse shift is still feasible at full
+## resolution. Once the coarse search has picked its shifts, they are expanded back to 15 minute
+## slots and only their start and end are adjusted against the full-resolution availability.
+from .bitmask import interval_mask, mask_islands, count_unfilled
+from .constants import BITS_PER_DAY, DAYS_OF_WEEK, OVERSTAFFED_HEADCOUNT
+from .problem import ProblemInstance
+
+
+def coarsen_mask(mask: int, factor: int, width: int = BITS_PER_DAY) -> int:
+    """Bit b of the result is set iff bits [b * factor, (b + 1) * factor) of mask are all set."""
+    block = (1 << factor) - 1
+    coarse = 0
+    for b in range(width // factor):
+        if (mask >> (b * factor)) & block == block:
+            coarse |= 1 << b
+    return coarse
+
+
+def expand_mask(mask: int, factor: int) -> int:
+    """Inverse of coarsen_mask for a schedule: every set cell becomes factor set slots."""
+    block = (1 << factor) - 1
+    fine = 0
+    while mask:
+        b = (mask & -mask).bit_length() - 1
+        fine |= block << (b * factor)
+        mask &= mask - 1
+    return fine
+
+
+def coarsen_problem(problem: ProblemInstance, factor: int) -> ProblemInstance:
+    """
+    Build the same problem on a grid of factor-slot cells.
+
+    The engines count a shift's hours as slots / 4, so max_hours is divided by factor: a coarse shift of
+    n cells then costs n / 4 hours against a cap of max_hours / factor, which is the same test as
+    n * factor / 4 against max_hours.
+
+    Args:
+        problem (ProblemInstance): The full-resolution problem.
+        factor (int): Slots per coarse cell; has to divide the problem's width.
+
+    Returns:
+        ProblemInstance: The coarse problem (width = problem.width // factor).
+    """
+    if factor < 1 or problem.width % factor:
+        raise ValueError(f"factor must divide {problem.width}")
+    width = problem.width // factor
+    min_cells = max(1, -(-4 // factor)) ## Islands still have to be at least an hour long
+    availability_masks = [[coarsen_mask(mask, factor, problem.width) for mask in week] for week in problem.availability_masks]
+    islands = [[mask_islands(mask, min_cells) for mask in week] for week in availability_masks]
+    first, last = problem.valid_work_hours
+    ## Same index class as the fine problem, so a profiled request counts the coarse lookups too
+    density_index = type(problem.density_index)(dict(zip(problem.employee_ids, availability_masks)), dict(zip(problem.employee_ids, islands)), width)
+    return ProblemInstance(
+        problem.employee_ids,
+        problem.max_hours / factor,
+        problem.valid_days,
+        (first // factor, last // factor),
+        availability_masks,
+        islands,
+        density_index,
+    )
+
+
+def refine_boundaries(problem: ProblemInstance, schedule_masks: dict) -> tuple:
+    """
+    Adjust the start and end of every shift at full resolution, in place.
+
+    A shift grows one slot at a time into the availability island it sits in while that covers a slot
+    nobody works (and max_hours allows), and gives up edge slots that are outside valid_work_hours or
+    overstaffed, as long as it stays at least an hour long.
+
+    Args:
+        problem (ProblemInstance): The full-resolution problem.
+        schedule_masks (dict): employee_id -> 7 day masks, one contiguous shift per day.
+
+    Returns:
+        tuple: (unfilled, schedule_masks) after refinement.
+    """
+    first, last = problem.valid_work_hours
+    coverage = [[0] * problem.width for _ in range(len(DAYS_OF_WEEK))]
+    for week in schedule_masks.values():
+        for d, mask in enumerate(week):
+            while mask:
+                coverage[d][(mask & -mask).bit_length() - 1] += 1
+                mask &= mask - 1
+
+    for emp_id, week in schedule_masks.items():
+        e = problem.index[emp_id]
+        hours = sum(mask.bit_count() for mask in week) / 4
+        for d, mask in enumerate(week):
+            if not mask:
+                continue
+            start, end = (mask & -mask).bit_length() - 1, mask.bit_length() - 1
+            island = next((i for i in problem.islands[e][d] if i[0] <= start and end <= i[1]), (start, end))
+            day_coverage = coverage[d]
+
+            ## Trim edges nobody needs first, so the hours they free up can be used to grow
+            while end - start >= 4 and (not first <= start <= last or day_coverage[start] >= OVERSTAFFED_HEADCOUNT):
+                day_coverage[start] -= 1
+                start += 1
+                hours -= 0.25
+            while end - start >= 4 and (not first <= end <= last or day_coverage[end] >= OVERSTAFFED_HEADCOUNT):
+                day_coverage[end] -= 1
+                end -= 1
+                hours -= 0.25
+            while start > island[0] and first <= start - 1 <= last and day_coverage[start - 1] == 0 and hours + 0.25 <= problem.max_hours[e]:
+                start -= 1
+                day_coverage[start] += 1
+                hours += 0.25
+            while end < island[1] and first <= end + 1 <= last and day_coverage[end + 1] == 0 and hours + 0.25 <= problem.max_hours[e]:
+                end += 1
+                day_coverage[end] += 1
+                hours += 0.25
+            week[d] = interval_mask(start, end)
+
+    return count_unfilled(schedule_masks, first, last), schedule_masks
@@ -0,0 +1,212 @@
+# Splits the sampling search in generate_schedule across a process pool.
+## The iteration budget is cut into fixed-size chunks and every chunk gets its own random stream,
+## spawned from one master seed. Chunks (not workers) own the streams, so the merged result only
+## depends on the master seed and chunk_size - never on how many workers ran the chunks.
+## (A wall-clock time_budget is one exception: where it cuts the run depends on machine speed. A stall
+## window is the other: a chunk checks it against the best of the chunks merged before it started, which
+## with several workers can be older than the best a single worker would have seen.)
+## Chunks can be long, so the budget is not only asked between them: in-process chunks record what they
+## found into it every CHECK_EVERY iterations, and while pool workers run, the budget is polled every
+## POLL_SECONDS and a stop is passed on to them through a shared event.
+import logging
+import multiprocessing
+import random
+import time
+from collections import deque
+from contextlib import nullcontext
+from functools import partial
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+from .budget import SearchBudget
+from .problem import ProblemInstance
+from .topk import TopK
+
+logger = logging.getLogger(__name__)
+
+CHECK_EVERY = 100 ## Iterations between a chunk's checkpoint calls
+POLL_SECONDS = 0.25 ## How often the budget is polled while pool workers run
+
+
+def _stop_requested(stop_event, *progress) -> bool:
+    """Checkpoint of a chunk in a worker process: the parent sets stop_event once its budget says stop."""
+    return stop_event.is_set()
+
+
+def _run_chunk(engine_cls, problem, engine_kwargs, chunk_seed, iterations, k, deadline, stall_iterations, best_before=None, stalled_for=0,
+               checkpoint=None, check_every: int = CHECK_EVERY):
+    """
+    Run one chunk of the search and keep only its k best schedules.
+
+    The chunk ends early at the deadline, or once the overall best has not improved for stall_iterations,
+    but never before it has a candidate when best_before is None (nothing found yet), so an expired budget
+    still returns a schedule. best_before is the best unfilled count of the chunks merged so far and
+    stalled_for the iterations since it last improved; an older (higher) best_before with stalled_for=0
+    only makes the chunk stop later.
+
+    checkpoint, if given, is called as checkpoint(start, end, improvements, best_masks) every check_every
+    iterations and once more when the chunk ends, with the iterations start..end run since the previous call,
+    the improvements among them and the schedule masks of the latest improvement (None if there was none yet).
+    The chunk stops early when it returns True.
+
+    Returns:
+        tuple: (iterations run,
+                list of (iteration, unfilled) at which the chunk beat the best it knew of,
+                list of (unfilled, schedule_masks) for the chunk's best candidates, best first)
+    """
+    rng = random.Random(chunk_seed)
+    best = TopK(k)
+    best_unfilled = best_before
+    since_improvement = stalled_for
+    improvements = []
+    latest_masks = None
+    reported = reported_at = 0 ## Improvements and iterations already passed to checkpoint
+
+    iteration = 0
+    while iteration < iterations:
+        if checkpoint is not None and iteration - reported_at >= check_every:
+            stop = checkpoint(reported_at, iteration, improvements[reported:], latest_masks)
+            reported, reported_at = len(improvements), iteration
+            if stop and best_unfilled is not None:
+                break
+        if best_unfilled is not None and deadline is not None and time.time() >= deadline:
+            break
+        if best_unfilled is not None and stall_iterations is not None and since_improvement >= stall_iterations:
+            break
+        iteration += 1
+        since_improvement += 1
+
+        sE = engine_cls(employees=None, problem=problem, rng=rng, **engine_kwargs)
+        empIdToSched = sE.schedule_masks()
+        if sE.total_emp_hour_limit_violations > 0:
+            ## Should never happen, see generate_schedule
+            logger.warning("Employee hour limit violated; candidate skipped")
+            continue
+
+        best.offer(sE.unfilled, empIdToSched) ## Tracked by the engine while it assigned shifts; sE itself is dropped right away
+        if best_unfilled is None or sE.unfilled < best_unfilled:
+            best_unfilled = sE.unfilled
+            since_improvement = 0
+            improvements.append((iteration, sE.unfilled))
+            latest_masks = empIdToSched
+
+    if checkpoint is not None and iteration > reported_at:
+        checkpoint(reported_at, iteration, improvements[reported:], latest_masks)
+    return iteration, improvements, best.results()
+
+
+def sample_top_schedules(engine_cls,
+                         employees,
+                         budget: SearchBudget,
+                         k: int = 5,
+                         workers: int = 1,
+                         chunk_size: int = 5000,
+                         seed: int = None,
+                         engine_kwargs: dict = None,
+                         valid_work_hours: tuple = (28, 83),
+                         problem: ProblemInstance = None) -> list:
+    """
+    Sample engine.schedule_masks() until the budget runs out and return the k with the fewest unfilled slots.
+
+    Args:
+        engine_cls: ScheduleEngine (or a class with the same constructor and schedule_masks()).
+        employees (List[Employee]): Roster shared by every worker.
+        budget (SearchBudget): Iteration cap, deadline and stall window. Updated in place with the run's
+                               iteration count and stop reason, every CHECK_EVERY iterations when workers=1,
+                               and as chunks finish otherwise.
+        k (int): Number of schedules to return.
+        workers (int): Number of worker processes. 1 runs every chunk in this process.
+        chunk_size (int): Iterations per chunk. Each chunk has its own RNG stream.
+        seed (int): Master seed. The same seed and chunk_size give the same result for any worker count
+                    (unless the budget has a time_budget or stall_iterations, see above).
+        engine_kwargs (dict): Extra constructor arguments for engine_cls (e.g. max_man_hours).
+        valid_work_hours (tuple): Inclusive slot range scored for unfilled slots.
+        problem (ProblemInstance): The compiled roster. Compiled from employees if omitted.
+
+    Returns:
+        list[tuple]: Up to k (unfilled, schedule_masks) pairs, best first. Ties keep sampling order.
+    """
+    engine_kwargs = dict(engine_kwargs or {})
+    if problem is None:
+        problem = ProblemInstance.compile(employees, valid_work_hours=valid_work_hours, density_index=engine_kwargs.get("density_index"))
+    ## Compiled once here and pickled to the workers (plain tuples and arrays, no model instances) rather than rebuilt per engine
+    engine_kwargs.pop("density_index", None)
+
+    iterations = budget.remaining_iterations()
+    master_seed = np.random.SeedSequence(seed)
+    deadline = budget.deadline()
+
+    def jobs():
+        ## Built as chunks start, so setup does not grow with max_iterations / chunk_size. Spawning the
+        ## children one at a time gives the same streams as spawning them all at once.
+        for offset in range(0, iterations, chunk_size):
+            chunk_seed = int(master_seed.spawn(1)[0].generate_state(1)[0])
+            yield engine_cls, problem, engine_kwargs, chunk_seed, min(chunk_size, iterations - offset), k, deadline, budget.stall_iterations
+
+    def stall_state(follows_merged: bool) -> tuple:
+        ## A chunk started right after the merged ones continues their stall count; one started behind
+        ## chunks still in flight cannot know what those found, so it only counts its own iterations
+        return budget.best_score, budget.iterations - budget.last_improvement if follows_merged else 0
+
+    def record(start, end, improvements, best_masks) -> bool:
+        ## Replays iterations start..end of a chunk at the iteration each improvement happened, so the budget's
+        ## stall window runs on the overall best; best_masks belong to the last improvement
+        recorded = start
+        for position, (iteration, unfilled) in enumerate(improvements):
+            last = position == len(improvements) - 1
+            budget.record(iteration - recorded, unfilled, best=(lambda: best_masks) if last else None)
+            recorded = iteration
+        budget.record(end - recorded)
+        return budget.should_stop()
+
+    def chunk_results():
+        ## Yields chunk results in chunk order, each recorded in the budget before the next one is started
+        if workers <= 1:
+            for job in jobs():
+                if budget.best_score is not None and budget.should_stop(): ## The first chunk always runs, see _run_chunk
+                    return
+                yield _run_chunk(*job, *stall_state(True), checkpoint=record) ## Records itself as it goes
+            return
+        ## Only a budget that can stop for reasons the chunks cannot see (a cancel) needs a way to reach them
+        with (multiprocessing.Manager() if budget.interruptible else nullcontext()) as manager:
+            stop_event = manager.Event() if manager is not None else None
+            checkpoint = partial(_stop_requested, stop_event) if stop_event is not None else None
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                remaining = jobs()
+                pending = deque()
+                for job in islice(remaining, workers):
+                    pending.append(pool.submit(_run_chunk, *job, *stall_state(not pending), checkpoint=checkpoint))
+                while pending:
+                    future = pending.popleft()
+                    while stop_event is not None:
+                        try:
+                            future.result(timeout=POLL_SECONDS)
+                            break
+                        except FutureTimeoutError:
+                            if budget.should_stop(): ## Reports progress, and notices a cancel while the chunks run
+                                stop_event.set()
+                    chunk_iterations, improvements, chunk = future.result()
+                    record(0, chunk_iterations, improvements, chunk[0][1] if chunk else None)
+                    yield chunk_iterations, improvements, chunk
+                    if budget.should_stop():
+                        if stop_event is not None:
+                            stop_event.set()
+                        break
+                    job = next(remaining, None)
+                    if job is not None:
+                        pending.append(pool.submit(_run_chunk, *job, *stall_state(not pending), checkpoint=checkpoint))
+                for future in pending:
+                    future.cancel()
+
+    ## Offering chunk by chunk, each best first, ties resolve by (chunk, iteration) just like a single sequential run.
+    ## Chunk results are merged as they arrive, so at most k schedules are held besides the chunks in flight.
+    merged = TopK(k)
+    for _, _, chunk in chunk_results():
+        for unfilled, masks in chunk:
+            merged.offer(unfilled, masks)
+    if not budget.should_stop():
+        ## No chunk stalls without the overall best stalling too, so a chunk that ended early hit the deadline
+        budget.stop_reason = "time_budget"
+    return merged.results()
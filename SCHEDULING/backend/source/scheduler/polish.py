@@ -0,0 +1,160 @@
+# Local search that improves already-sampled schedules.
+## ScheduleEngine only samples; this stage takes a finished schedule and tries small moves on
+## single (employee, day) shifts: give the day a shift, drop it, swap to another island, or move to
+## a lower-density island. A per-slot headcount is kept up to date, so a move is scored by touching
+## only the slots of the old and new shift instead of rescoring the roster. A day's shift is kept as
+## its runs of set bits: the samplers give one run per day, but warm-started and refined schedules
+## can have several, and a move replaces the day's runs as a whole.
+import math
+import random
+
+from .bitmask import interval_mask, mask_islands
+from .constants import BITS_PER_DAY, DAYS_OF_WEEK, OVERSTAFFED_HEADCOUNT
+from .density import ZeroDensityIndex
+from .problem import ProblemInstance
+
+
+class LocalSearchPolisher:
+    def __init__(self, employees, density_index: ZeroDensityIndex = None, valid_work_hours: tuple = (28, 83), rng=None,
+                 problem: ProblemInstance = None):
+        """
+        Args:
+            employees (List[Employee]): Roster the schedules were generated for.
+            density_index (ZeroDensityIndex): Shared density tables; built from employees if omitted.
+            valid_work_hours (tuple): Inclusive slot range that has to be covered each day.
+            rng (random.Random): Random stream for move selection (defaults to the global random module).
+            problem (ProblemInstance): The compiled roster; replaces employees, density_index and valid_work_hours.
+        """
+        if problem is None:
+            problem = ProblemInstance.compile(employees, valid_work_hours=valid_work_hours, density_index=density_index)
+        self.valid_work_hours = problem.valid_work_hours
+        self.rng = rng or random
+        self.density_index = problem.density_index
+        self.max_hours = dict(zip(problem.employee_ids, problem.max_hours.tolist()))
+        self.islands = problem.islands_by_id
+        ## Every (employee, day) that a move can touch; days excluded from scheduling are never given a shift
+        self.movable = [
+            (emp_id, d) for emp_id, week in self.islands.items() for d, islands_e_d in enumerate(week)
+            if islands_e_d and problem.is_valid_day(d)
+        ]
+
+    def _paint(self, d, shift, step):
+        """Add (step=1) or remove (step=-1) one person on the runs of shift on day d, keeping unfilled/overstaffed current."""
+        if shift is None:
+            return
+        first, last = self.valid_work_hours
+        day_coverage = self.coverage[d]
+        for i in (i for start, end in shift for i in range(start, end + 1)):
+            if step > 0:
+                day_coverage[i] += 1
+                count = day_coverage[i]
+                if first <= i <= last:
+                    if count == 1:
+                        self.unfilled -= 1
+                    elif count == OVERSTAFFED_HEADCOUNT:
+                        self.overstaffed += 1
+            else:
+                count = day_coverage[i]
+                day_coverage[i] -= 1
+                if first <= i <= last:
+                    if count == 1:
+                        self.unfilled += 1
+                    elif count == OVERSTAFFED_HEADCOUNT:
+                        self.overstaffed -= 1
+
+    def _load(self, schedule_masks: dict):
+        first, last = self.valid_work_hours
+        self.coverage = [[0] * BITS_PER_DAY for _ in range(len(DAYS_OF_WEEK))]
+        self.unfilled = (last - first + 1) * len(DAYS_OF_WEEK)
+        self.overstaffed = 0
+        self.shifts = {}
+        self.hours = {}
+        for emp_id, week in schedule_masks.items():
+            shifts = [None] * len(DAYS_OF_WEEK)
+            for d, mask in enumerate(week):
+                if mask:
+                    shifts[d] = tuple(mask_islands(mask, min_length=1))
+                    self._paint(d, shifts[d], 1)
+            self.shifts[emp_id] = shifts
+            self.hours[emp_id] = sum(shift_hours(shift) for shift in shifts)
+
+    def _propose(self, emp_id, d):
+        """Pick a replacement shift (one island) for (emp_id, d); None means drop the day. Returns False if there is no move."""
+        current = self.shifts[emp_id][d]
+        islands_e_d = self.islands[emp_id][d]
+        if current is None:
+            return (self.rng.choice(islands_e_d),)
+        move = self.rng.randrange(3)
+        if move == 0:
+            return None
+        if move == 1:
+            others = [island for island in islands_e_d if (island,) != current]
+            return (self.rng.choice(others),) if others else False
+        current_density = min(self.density_index.density(start, end, d) for start, end in current)
+        lower = [island for island in islands_e_d if self.density_index.density(island[0], island[1], d) < current_density]
+        return (self.rng.choice(lower),) if lower else False
+
+    def polish(self, schedule_masks: dict, iterations: int = 2000, temperature: float = 0.0, focus=None) -> tuple:
+        """
+        Improve one schedule with hill climbing (temperature=0) or simulated annealing.
+
+        Moves never break availability (a moved shift is always one whole island) or an employee's max_hours.
+        A day whose mask has several runs keeps them as they are until a move replaces the day.
+        Unfilled slots are minimized first and overstaffed slots break ties; the best schedule seen is returned,
+        so the result is never worse than the input.
+
+        Args:
+            schedule_masks (dict): employee_id -> 7 day masks, as produced by ScheduleEngine.schedule_masks().
+            iterations (int): Number of moves to evaluate.
+            temperature (float): Starting annealing temperature (in unfilled slots), cooled linearly to 0.
+            focus (set): Optional (employee_id, day index) pairs; when given, only those shifts are moved.
+
+        Returns:
+            tuple: (unfilled, overstaffed, schedule_masks) of the best schedule found.
+        """
+        self._load(schedule_masks)
+        movable = self.movable if focus is None else [pair for pair in self.movable if pair in focus]
+        best = (self.unfilled, self.overstaffed)
+        best_shifts = {emp_id: list(shifts) for emp_id, shifts in self.shifts.items()}
+
+        for step in range(iterations):
+            if not movable:
+                break
+            emp_id, d = self.rng.choice(movable)
+            if emp_id not in self.shifts:
+                continue
+            current = self.shifts[emp_id][d]
+            proposal = self._propose(emp_id, d)
+            if proposal is False or proposal == current:
+                continue
+
+            delta_hours = shift_hours(proposal) - shift_hours(current)
+            if self.hours[emp_id] + delta_hours > self.max_hours[emp_id]:
+                continue
+
+            before = (self.unfilled, self.overstaffed)
+            self._paint(d, current, -1)
+            self._paint(d, proposal, 1)
+            delta = (self.unfilled - before[0]) + (self.overstaffed - before[1]) * 1e-3
+
+            heat = temperature * (1 - step / iterations)
+            if delta <= 0 or (heat > 0 and self.rng.random() < math.exp(-delta / heat)):
+                self.shifts[emp_id][d] = proposal
+                self.hours[emp_id] += delta_hours
+                if (self.unfilled, self.overstaffed) < best:
+                    best = (self.unfilled, self.overstaffed)
+                    best_shifts = {e: list(shifts) for e, shifts in self.shifts.items()}
+            else:
+                self._paint(d, proposal, -1)
+                self._paint(d, current, 1)
+
+        polished = {
+            emp_id: [0 if shift is None else sum(interval_mask(start, end) for start, end in shift) for shift in shifts]
+            for emp_id, shifts in best_shifts.items()
+        }
+        return best[0], best[1], polished
+
+
+def shift_hours(shift) -> float:
+    """Hours in a day's shift (a tuple of inclusive runs, or None)."""
+    return 0 if shift is None else sum(end - start + 1 for start, end in shift) / 4
@@ -0,0 +1,132 @@
+# Compiled, read-only view of one scheduling request.
+## Everything the engines look up per employee (position in the roster, max hours, islands,
+## density tables) only depends on the roster and the request parameters, so it is compiled once
+## per request and shared by every iteration, engine and worker instead of being re-derived from
+## Employee instances inside the sampling loop.
+import numpy as np
+
+from .constants import BITS_PER_DAY, DAYS_OF_WEEK
+from .density import CountingDensityIndex, ZeroDensityIndex
+from .profiling import NULL_PROFILER
+
+
+class ProblemInstance:
+    __slots__ = (
+        "employee_ids",
+        "index",
+        "max_hours",
+        "valid_days",
+        "valid_day_mask",
+        "valid_work_hours",
+        "availability_masks",
+        "islands",
+        "islands_by_id",
+        "density_index",
+    )
+
+    def __init__(self,
+                 employee_ids: tuple,
+                 max_hours,
+                 valid_days: tuple,
+                 valid_work_hours: tuple,
+                 availability_masks: tuple,
+                 islands: tuple,
+                 density_index: ZeroDensityIndex):
+        """
+        Use ProblemInstance.compile() to build one from Employee instances.
+
+        Args:
+            employee_ids (tuple): Roster order; employee e is employee_ids[e] everywhere below.
+            max_hours: Per-employee params['max_hours'], indexed like employee_ids.
+            valid_days (tuple): Sorted day indices that may be scheduled.
+            valid_work_hours (tuple): Inclusive slot range that has to be covered each day.
+            availability_masks (tuple): Per employee, 7 free masks (see bitmask.free_mask).
+            islands (tuple): Per employee, 7 tuples of (start, end) availability islands.
+            density_index (ZeroDensityIndex): Density tables for this roster, including the island tables.
+        """
+        max_hours = np.array(max_hours, dtype=float)
+        max_hours.flags.writeable = False
+        set_slot = object.__setattr__
+        set_slot(self, "employee_ids", tuple(employee_ids))
+        set_slot(self, "index", {emp_id: e for e, emp_id in enumerate(self.employee_ids)})
+        set_slot(self, "max_hours", max_hours)
+        set_slot(self, "valid_days", tuple(sorted(valid_days)))
+        set_slot(self, "valid_day_mask", sum(1 << d for d in self.valid_days))
+        set_slot(self, "valid_work_hours", tuple(valid_work_hours))
+        set_slot(self, "availability_masks", tuple(tuple(week) for week in availability_masks))
+        set_slot(self, "islands", tuple(tuple(tuple(tuple(island) for island in day) for day in week) for week in islands))
+        ## Same islands keyed by employee_id, the shape ScheduleEngine.extract_employee_availability_islands() returns
+        set_slot(self, "islands_by_id", dict(zip(self.employee_ids, self.islands)))
+        set_slot(self, "density_index", density_index)
+
+    @classmethod
+    def compile(cls,
+                employees,
+                valid_work_days=DAYS_OF_WEEK,
+                valid_work_hours: tuple = (28, 83),
+                density_index: ZeroDensityIndex = None,
+                width: int = BITS_PER_DAY,
+                profiler=NULL_PROFILER):
+        """
+        Compile a roster into a ProblemInstance.
+
+        Args:
+            employees (List[Employee]): Employee model instances, in the order the engines should visit them.
+            valid_work_days (List[str]): Days that may be scheduled.
+            valid_work_hours (tuple): Inclusive slot range that has to be covered each day.
+            density_index (ZeroDensityIndex): Reused if it already has island tables; built otherwise.
+            width (int): Number of slots in a day.
+            profiler (PhaseProfiler): Times the islands and density phases when profiling is on, and then
+                                      builds a CountingDensityIndex so density lookups are counted too.
+
+        Returns:
+            ProblemInstance: The compiled problem.
+        """
+        employee_ids = [emp.employee_id for emp in employees]
+        availability_masks = [emp.get_availability_masks() for emp in employees]
+        with profiler.phase("islands"):
+            islands = [emp.get_availability_islands() for emp in employees]
+        if density_index is None or not density_index.lowest_density_island:
+            index_cls = CountingDensityIndex if profiler.enabled else ZeroDensityIndex
+            with profiler.phase("density"):
+                density_index = index_cls(dict(zip(employee_ids, availability_masks)), dict(zip(employee_ids, islands)), width)
+        return cls(
+            employee_ids,
+            [emp.params.get("max_hours", 0) for emp in employees],
+            [i for i, day in enumerate(DAYS_OF_WEEK) if day in valid_work_days],
+            valid_work_hours,
+            availability_masks,
+            islands,
+            density_index,
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ProblemInstance is immutable; compile a new one instead.")
+
+    def __delattr__(self, name):
+        raise AttributeError("ProblemInstance is immutable; compile a new one instead.")
+
+    def __reduce__(self):
+        ## Only the plain tuples, the max-hours array and the density tables cross to worker processes;
+        ## the id -> index maps are rebuilt on the other side
+        return (ProblemInstance, (
+            self.employee_ids,
+            self.max_hours,
+            self.valid_days,
+            self.valid_work_hours,
+            self.availability_masks,
+            self.islands,
+            self.density_index,
+        ))
+
+    def __len__(self) -> int:
+        return len(self.employee_ids)
+
+    @property
+    def width(self) -> int:
+        """Slots per day on this problem's grid (BITS_PER_DAY unless it was coarsened, see multires)."""
+        return self.density_index.width
+
+    def is_valid_day(self, d: int) -> bool:
+        """True if day index d may be scheduled."""
+        return bool(self.valid_day_mask >> d & 1)
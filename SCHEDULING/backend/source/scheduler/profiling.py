@@ -0,0 +1,103 @@
+# Low-overhead instrumentation for the schedule generation pipeline.
+## A PhaseProfiler splits a request's wall time into named phases and keeps plain integer counters.
+## Phases are timed with lap(): each call closes the phase that ran since the previous call, so the
+## view only needs one line between steps and the laps always add up to the total. phase() times a
+## block nested inside the current lap (islands and density inside compile_problem, say) and is not
+## part of that sum. When profiling is off the view uses NULL_PROFILER, whose methods do nothing.
+## For one-off deep dives, debug_dump() wraps a request in cProfile and tracemalloc and writes both to disk.
+import cProfile
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class PhaseProfiler:
+    enabled = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = {} ## name -> [seconds, laps]
+        self.counters = {}
+
+    def lap(self, name: str):
+        """Charge the time since the previous lap (or since creation) to phase name."""
+        now = time.perf_counter()
+        entry = self.phases.setdefault(name, [0.0, 0])
+        entry[0] += now - self._last
+        entry[1] += 1
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a nested block under name without closing the current lap."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.phases.setdefault(name, [0.0, 0])
+            entry[0] += time.perf_counter() - started
+            entry[1] += 1
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self) -> dict:
+        """Phase times in milliseconds (in the order they first ran), counters, and the total so far."""
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "phases": {name: {"ms": round(seconds * 1000, 3), "calls": calls} for name, (seconds, calls) in self.phases.items()},
+            "counters": dict(self.counters),
+        }
+
+
+class _NullProfiler:
+    """Drop-in PhaseProfiler that records nothing."""
+    enabled = False
+
+    def lap(self, name: str):
+        pass
+
+    @contextmanager
+    def phase(self, name: str):
+        yield
+
+    def count(self, name: str, n: int = 1):
+        pass
+
+    def summary(self) -> dict:
+        return {}
+
+
+NULL_PROFILER = _NullProfiler()
+
+
+@contextmanager
+def debug_dump(directory, label: str, top: int = 50):
+    """
+    Run the block under cProfile and tracemalloc and write both to directory.
+
+    Yields a dict that is filled in on exit with the paths written:
+    <label>.prof (load with pstats or snakeviz) and <label>.tracemalloc.txt (top allocation sites).
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    profile = cProfile.Profile()
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    profile.enable()
+    try:
+        yield paths
+    finally:
+        profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        if not already_tracing:
+            tracemalloc.stop()
+        paths["cprofile"] = os.path.join(directory, f"{label}.prof")
+        profile.dump_stats(paths["cprofile"])
+        paths["tracemalloc"] = os.path.join(directory, f"{label}.tracemalloc.txt")
+        with open(paths["tracemalloc"], "w") as f:
+            for stat in snapshot.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
@@ -0,0 +1,159 @@
+# Cache of generate_schedule results, keyed by a fingerprint of the problem.
+## The fingerprint covers everything the result depends on (employee ids, availability, params and
+## the request's search settings), so a repeat request for the same roster can be answered without
+## searching again. Entries live in an in-process LRU and, if a path is configured, in a SQLite file
+## that survives restarts and is shared between server processes. Entries expire by age, the oldest
+## go first once max_entries is reached, and a write to an employee drops every entry they are part of.
+## Invalidation mostly frees space: a changed availability or params already changes the fingerprint,
+## so an entry another process still holds in memory can never be served for the new roster.
+import copy
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+def problem_fingerprint(employees, search_settings: dict) -> str:
+    """
+    Stable hash of a scheduling problem.
+
+    Args:
+        employees (List[Employee]): The roster; order does not matter. Availability is read as packed masks.
+        search_settings (dict): JSON-serializable request settings that change the result.
+
+    Returns:
+        str: Hex sha256 digest.
+    """
+    roster = sorted(
+        ([emp.employee_id, emp.get_availability_masks(), emp.params] for emp in employees),
+        key=lambda row: row[0],
+    )
+    payload = json.dumps({"roster": roster, "settings": search_settings}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 64, max_age: float = 3600, path=None):
+        """
+        Args:
+            max_entries (int): Entries kept per backend; the least recently used (memory) or oldest (SQLite) go first.
+            max_age (float): Seconds an entry stays valid.
+            path: Optional SQLite file for a persistent second level.
+        """
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.path = path
+        self._lock = threading.Lock()
+        ## key -> (created, employee_ids, value)
+        self._entries = OrderedDict()
+        if path is not None:
+            with self._connect() as conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS result_cache (key TEXT PRIMARY KEY, created REAL, value TEXT)")
+                conn.execute("CREATE TABLE IF NOT EXISTS result_cache_member (key TEXT, employee_id TEXT)")
+                conn.execute("CREATE INDEX IF NOT EXISTS result_cache_member_employee ON result_cache_member (employee_id)")
+
+    @contextmanager
+    def _connect(self):
+        ## One short-lived connection per call: commits on success, always closed, safe across threads
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str):
+        """The cached value for key (a copy), or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.max_age:
+                    self._entries.move_to_end(key)
+                    return copy.deepcopy(entry[2])
+                del self._entries[key]
+        if self.path is None:
+            return None
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT created, value FROM result_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[0] > self.max_age:
+                self._delete_stored(conn, [key])
+                return None
+            employee_ids = [emp_id for (emp_id,) in conn.execute("SELECT employee_id FROM result_cache_member WHERE key = ?", (key,))]
+        value = json.loads(row[1])
+        self._remember(key, row[0], employee_ids, value)
+        return copy.deepcopy(value)
+
+    def put(self, key: str, employee_ids, value):
+        """Store a JSON-serializable value for key, tagged with the employees it was computed for."""
+        created = time.time()
+        employee_ids = list(employee_ids)
+        self._remember(key, created, employee_ids, copy.deepcopy(value))
+        if self.path is None:
+            return
+        with self._connect() as conn:
+            self._delete_stored(conn, [key])
+            conn.execute("INSERT INTO result_cache (key, created, value) VALUES (?, ?, ?)", (key, created, json.dumps(value)))
+            conn.executemany("INSERT INTO result_cache_member (key, employee_id) VALUES (?, ?)", [(key, emp_id) for emp_id in employee_ids])
+            ## Age first, then size: drop expired rows and everything past the newest max_entries
+            stale = [k for (k,) in conn.execute(
+                "SELECT key FROM result_cache WHERE created < ? OR key NOT IN (SELECT key FROM result_cache ORDER BY created DESC LIMIT ?)",
+                (created - self.max_age, self.max_entries),
+            )]
+            self._delete_stored(conn, stale)
+
+    def invalidate_employee(self, employee_id) -> int:
+        """Drop every entry computed for a roster that includes employee_id. Returns how many were dropped."""
+        with self._lock:
+            keys = [key for key, (_, employee_ids, _) in self._entries.items() if employee_id in employee_ids]
+            for key in keys:
+                del self._entries[key]
+        if self.path is None:
+            return len(keys)
+        with self._connect() as conn:
+            stored = [k for (k,) in conn.execute("SELECT DISTINCT key FROM result_cache_member WHERE employee_id = ?", (employee_id,))]
+            self._delete_stored(conn, stored)
+        return len(set(keys) | set(stored))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.path is not None:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM result_cache")
+                conn.execute("DELETE FROM result_cache_member")
+
+    def _remember(self, key, created, employee_ids, value):
+        with self._lock:
+            self._entries[key] = (created, frozenset(employee_ids), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _delete_stored(conn, keys):
+        for key in keys:
+            conn.execute("DELETE FROM result_cache WHERE key = ?", (key,))
+            conn.execute("DELETE FROM result_cache_member WHERE key = ?", (key,))
+
+
+_result_cache = None
+
+
+def get_result_cache() -> ResultCache:
+    """
+    The process-wide cache, configured by the SCHEDULE_RESULT_CACHE setting
+    (a dict of ResultCache arguments: max_entries, max_age, path).
+    """
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(**getattr(settings, "SCHEDULE_RESULT_CACHE", {}))
+    return _result_cache
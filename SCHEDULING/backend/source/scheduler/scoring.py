@@ -0,0 +1,139 @@
+# Multi-objective scoring for batches of candidate schedules.
+## Ranking by unfilled slots alone hides real trade-offs: two schedules with the same gaps can differ
+## in overstaffed slots, in how far they run over the man-hour budget, and in how evenly the hours are
+## shared. All objectives are computed for a whole batch in one pass over a boolean
+## (candidates, employees, 7, slots) array, and the search keeps a bounded Pareto front of them
+## instead of a single sorted list. Every objective is minimized.
+import numpy as np
+
+from .constants import OVERSTAFFED_HEADCOUNT
+
+OBJECTIVES = ("unfilled", "overstaffed", "man_hours_over", "hours_spread")
+
+
+def masks_to_array(schedules: list, employee_ids, width: int) -> np.ndarray:
+    """
+    Unpack schedule_masks() dicts into the boolean layout BatchScheduleSampler.sample() returns.
+
+    Args:
+        schedules (list): employee_id -> 7 day masks dicts. Employees missing from a dict work no shifts.
+        employee_ids: Roster order for the employee axis.
+        width (int): Slots per day.
+
+    Returns:
+        np.ndarray: Boolean array of shape (len(schedules), employees, 7, width).
+    """
+    num_bytes = (width + 7) // 8
+    empty = [0] * 7
+    raw = b"".join(
+        day_mask.to_bytes(num_bytes, "little")
+        for schedule in schedules for emp_id in employee_ids for day_mask in schedule.get(emp_id, empty)
+    )
+    packed = np.frombuffer(raw, dtype=np.uint8).reshape(len(schedules), len(employee_ids), 7, num_bytes)
+    return np.unpackbits(packed, axis=-1, count=width, bitorder="little").astype(bool)
+
+
+def score_candidates(schedules: np.ndarray, valid_work_hours: tuple, max_man_hours: float, slots_per_hour: float = 4) -> np.ndarray:
+    """
+    Score every candidate on every objective in OBJECTIVES.
+
+    Args:
+        schedules (np.ndarray): Boolean (candidates, employees, 7, slots) array; True where the employee works.
+        valid_work_hours (tuple): Inclusive slot range that has to be covered each day.
+        max_man_hours (float): Budget for the hours of all employees together.
+        slots_per_hour (float): Slots per hour on the schedules' grid.
+
+    Returns:
+        np.ndarray: Float array of shape (candidates, len(OBJECTIVES)), columns in OBJECTIVES order.
+    """
+    first, last = valid_work_hours
+    headcount = schedules[..., first:last + 1].sum(axis=1, dtype=np.int32)
+    hours = schedules.sum(axis=(2, 3), dtype=np.int32) / slots_per_hour
+    return np.stack([
+        (headcount == 0).sum(axis=(1, 2)),
+        (headcount >= OVERSTAFFED_HEADCOUNT).sum(axis=(1, 2)),
+        np.maximum(hours.sum(axis=1) - max_man_hours, 0),
+        hours.std(axis=1) if hours.shape[1] else np.zeros(len(hours)),
+    ], axis=1).astype(float)
+
+
+def pareto_mask(points: np.ndarray, block: int = 256) -> np.ndarray:
+    """Boolean mask of the rows of points that no other row dominates (<= everywhere, < somewhere)."""
+    keep = np.ones(len(points), dtype=bool)
+    ## Compared block by block so memory stays at block x candidates, not candidates squared
+    for offset in range(0, len(points), block):
+        rows = points[offset:offset + block, None, :]
+        at_most = (points[None, :, :] <= rows).all(axis=-1)
+        below = (points[None, :, :] < rows).any(axis=-1)
+        keep[offset:offset + block] = ~(at_most & below).any(axis=1)
+    return keep
+
+
+class ParetoFront:
+    def __init__(self, capacity: int):
+        """
+        Args:
+            capacity (int): Most points kept. When a new non-dominated point would overflow the front, the
+                            point in the most crowded region is dropped (the ends of the front go last).
+        """
+        self.capacity = capacity
+        self.points = []
+        self.payloads = []
+
+    def __len__(self):
+        return len(self.points)
+
+    def would_accept(self, point) -> bool:
+        """False if a kept point dominates or equals point (the earlier candidate wins ties)."""
+        return self.capacity > 0 and not any(all(k <= p for k, p in zip(kept, point)) for kept in self.points)
+
+    def offer(self, point, payload) -> bool:
+        """Offer one candidate; returns True if it is on the front afterwards."""
+        point = tuple(float(value) for value in point)
+        if not self.would_accept(point):
+            return False
+        survivors = [
+            i for i, kept in enumerate(self.points)
+            if not all(p <= k for p, k in zip(point, kept))
+        ]
+        self.points = [self.points[i] for i in survivors] + [point]
+        self.payloads = [self.payloads[i] for i in survivors] + [payload]
+        if len(self.points) > self.capacity:
+            crowded = int(np.argmin(self._crowding()))
+            del self.points[crowded]
+            del self.payloads[crowded]
+        return point in self.points
+
+    def offer_batch(self, points: np.ndarray, payload) -> int:
+        """
+        Offer a scored batch. Rows dominated inside the batch are skipped without being offered.
+
+        Args:
+            points (np.ndarray): (candidates, objectives) scores.
+            payload (callable): payload(i) builds candidate i's payload; only called for candidates offered.
+
+        Returns:
+            int: Number of candidates kept.
+        """
+        kept = 0
+        for i in np.flatnonzero(pareto_mask(points)):
+            if self.would_accept(points[i]) and self.offer(points[i], payload(i)):
+                kept += 1
+        return kept
+
+    def _crowding(self) -> np.ndarray:
+        ## NSGA-II crowding distance: per objective, the normalized gap between each point's neighbours
+        points = np.array(self.points)
+        distance = np.zeros(len(points))
+        for column in points.T:
+            order = np.argsort(column, kind="stable")
+            span = column[order[-1]] - column[order[0]]
+            distance[order[0]] = distance[order[-1]] = np.inf
+            if span > 0:
+                distance[order[1:-1]] += (column[order[2:]] - column[order[:-2]]) / span
+        return distance
+
+    def results(self) -> list:
+        """Front as (objectives dict, payload) pairs, ordered by unfilled, then overstaffed, and so on."""
+        order = sorted(range(len(self.points)), key=lambda i: self.points[i])
+        return [(dict(zip(OBJECTIVES, self.points[i])), self.payloads[i]) for i in order]
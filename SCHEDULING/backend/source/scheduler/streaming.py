@@ -0,0 +1,105 @@
+# Server-sent events for a running schedule search.
+## The search runs on its own thread with a StreamBudget, which queues a "progress" event every
+## `interval` seconds and a "best" event whenever the best unfilled count improves. The response
+## generator turns the queue into SSE messages, and ends with a "result" event (the full
+## generate_schedule response) or an "error" event. If the client disconnects, the server closes the
+## generator, which cancels the search at its next budget check. The sampler engine checks its budget
+## inside chunks too (see parallel.py), so events keep coming and a cancel lands while a chunk runs.
+import json
+import queue
+import threading
+import time
+from functools import partial
+
+from django.db import close_old_connections
+from django.http import HttpResponse
+
+from .budget import SearchBudget
+from .jobs import response_error
+
+
+class StreamBudget(SearchBudget):
+    """SearchBudget that reports to an event queue and stops once `cancelled` is set."""
+    interruptible = True
+
+    def __init__(self, events: queue.Queue, cancelled: threading.Event, *args, interval: float = 0.5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.events = events
+        self.cancelled = cancelled
+        self.interval = interval
+        self._last_progress = time.monotonic()
+        self.on_improvement = lambda best_score, schedule_masks: events.put(("best", (schedule_masks, self.problem)))
+
+    def should_stop(self) -> bool:
+        if self.stop_reason is None:
+            if self.cancelled.is_set():
+                self.stop_reason = "cancelled"
+            elif time.monotonic() - self._last_progress >= self.interval:
+                self._last_progress = time.monotonic()
+                self.events.put(("progress", dict(self.summary(), max_iterations=self.max_iterations)))
+        return super().should_stop()
+
+
+def sse(event: str, data) -> str:
+    """One server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_search(run, body: dict, describe_best, interval: float = 0.5, keepalive: float = 15):
+    """
+    Run a search on a background thread and yield its events as SSE messages.
+
+    Args:
+        run (callable): run(body, budget_cls) does the search; returns the result dict or an error HttpResponse.
+        body (dict): The generate_schedule request body.
+        describe_best (callable): describe_best(schedule_masks, problem) builds the payload of a "best" event;
+                                  problem is the budget's compiled ProblemInstance.
+                                  Its "objectives" (unfilled, overstaffed) are repeated in later progress events.
+        interval (float): Seconds between progress events.
+        keepalive (float): Seconds of silence after which a comment line is sent to keep proxies from timing out.
+
+    Yields:
+        str: SSE messages.
+    """
+    events = queue.Queue()
+    cancelled = threading.Event()
+
+    def search():
+        try:
+            result = run(body, partial(StreamBudget, events, cancelled, interval=interval))
+        except Exception as e:
+            result = e
+        finally:
+            close_old_connections()
+        events.put(("done", result))
+
+    threading.Thread(target=search, name="schedule-stream", daemon=True).start()
+    best_objectives = None
+    try:
+        while True:
+            try:
+                event, data = events.get(timeout=keepalive)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if event == "best":
+                best = describe_best(*data)
+                best_objectives = best.get("objectives")
+                yield sse("best", best)
+            elif event == "progress":
+                if best_objectives is not None:
+                    ## At 15 minute resolution, like the final result (the budget counts coarse cells on a coarse grid)
+                    data["best_unfilled"] = best_objectives["unfilled"]
+                    data["best_overstaffed"] = best_objectives["overstaffed"]
+                yield sse("progress", data)
+            elif isinstance(data, HttpResponse):
+                yield sse("error", {"error": response_error(data), "status": data.status_code})
+                return
+            elif isinstance(data, Exception):
+                yield sse("error", {"error": str(data), "status": 500})
+                return
+            else:
+                yield sse("result", data)
+                return
+    finally:
+        cancelled.set() ## Finished, or the client went away: either way the search can stop
@@ -0,0 +1,131 @@
+# Substitute finder for a dropped shift in a saved schedule.
+## Answered from two indexes instead of a scan over every employee's availability strings. The
+## availability index (availability_index.py) gives the employees free for the whole shift as one
+## bitmap. AssignedHoursIndex is built once per saved schedule. It holds, in the same bit positions,
+## a bitmap per (day, slot) of who is already scheduled, plus everyone's assigned slot count. The
+## candidates are `free & ~scheduled`. Only their max_hours are loaded from the database. They are
+## ranked by the hours they would have left after taking the shift; ties go to the employee with less
+## free time in the week, so the flexible people stay available for the next gap.
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from .constants import BITS_PER_DAY, DAYS_OF_WEEK
+from .models import Employee
+
+SLOTS_PER_HOUR = BITS_PER_DAY // 24
+
+
+class AssignedHoursIndex:
+    def __init__(self, schedule_masks: dict, availability):
+        """
+        Args:
+            schedule_masks (dict): employee_id -> 7 day masks of scheduled slots (see views.parse_formatted_schedule).
+            availability (AvailabilityIndex): Index whose bit positions the scheduled bitmaps use.
+        """
+        self.availability = availability
+        self.slots = {emp_id: sum(mask.bit_count() for mask in week) for emp_id, week in schedule_masks.items()}
+        self.scheduled = [[0] * availability.width for _ in DAYS_OF_WEEK] ## [day][slot] -> int
+        for emp_id, week in schedule_masks.items():
+            p = availability.position.get(emp_id)
+            if p is None:
+                continue ## Not in the availability index, so never a candidate anyway
+            bit = 1 << p
+            for day_bitmaps, mask in zip(self.scheduled, week):
+                while mask:
+                    low = mask & -mask
+                    day_bitmaps[low.bit_length() - 1] |= bit
+                    mask ^= low
+
+    def hours(self, employee_id) -> float:
+        return self.slots.get(employee_id, 0) / SLOTS_PER_HOUR
+
+    def scheduled_during(self, d: int, start: int, end: int) -> int:
+        """Bitmap of the employees scheduled for at least one slot of the inclusive range [start, end] on day d."""
+        bits = 0
+        for bitmap in self.scheduled[d][start:end + 1]:
+            bits |= bitmap
+        return bits
+
+
+def load_max_hours(employee_ids) -> dict:
+    """employee_id -> params["max_hours"], loading only the params column."""
+    employees = Employee.objects.only("params").in_bulk(list(employee_ids))
+    return {emp_id: (emp.params or {}).get("max_hours", 0) for emp_id, emp in employees.items()}
+
+
+def find_substitutes(assigned: AssignedHoursIndex, d: int, start: int, end: int, max_hours=load_max_hours, exclude=()) -> list:
+    """
+    Rank the employees who could take a shift.
+
+    Eligible: free for every slot of the shift, not scheduled during any of it, not in exclude, and
+    at most at their max_hours once the shift is added.
+
+    Args:
+        assigned (AssignedHoursIndex): The saved schedule.
+        d (int): Day of the shift (Monday = 0).
+        start (int), end (int): Inclusive slot range of the shift.
+        max_hours (callable): max_hours(employee_ids) -> employee_id -> max hours.
+        exclude (iterable): Employee ids to leave out, e.g. whoever dropped the shift.
+
+    Returns:
+        list: Dicts (employee_id, assigned_hours, max_hours, remaining_hours, free_hours), best first.
+    """
+    availability = assigned.availability
+    bits = availability.free_throughout(d, start, end) & ~assigned.scheduled_during(d, start, end)
+    for emp_id in exclude:
+        p = availability.position.get(emp_id)
+        if p is not None:
+            bits &= ~(1 << p)
+    candidates = availability.employees(bits)
+    if not candidates:
+        return []
+
+    shift_hours = (end - start + 1) / SLOTS_PER_HOUR
+    limits = max_hours(candidates)
+    ranked = []
+    for emp_id in candidates:
+        assigned_hours = assigned.hours(emp_id)
+        remaining = limits.get(emp_id, 0) - assigned_hours - shift_hours
+        if remaining < 0:
+            continue
+        ranked.append({
+            "employee_id": emp_id,
+            "assigned_hours": assigned_hours,
+            "max_hours": limits[emp_id],
+            "remaining_hours": remaining,
+            "free_hours": availability.free_slots[availability.position[emp_id]] / SLOTS_PER_HOUR,
+        })
+    ranked.sort(key=lambda candidate: (-candidate["remaining_hours"], candidate["free_hours"])) ## Stable: ties stay in index order
+    return ranked
+
+
+_assigned_hours_indexes = OrderedDict()
+_assigned_hours_lock = threading.Lock()
+
+
+def get_assigned_hours_index(schedule: dict, parse, availability, max_entries: int = 16) -> AssignedHoursIndex:
+    """
+    The AssignedHoursIndex for a saved schedule, cached by the schedule's content.
+
+    Args:
+        schedule (dict): A saved schedule ({"entries": [...]}).
+        parse (callable): parse(schedule) -> employee_id -> 7 day masks.
+        availability (AvailabilityIndex): The current availability index; a cached index built
+                                          against an older one is rebuilt, since bit positions differ.
+        max_entries (int): Schedules kept, least recently used first out.
+    """
+    key = hashlib.sha256(json.dumps(schedule, sort_keys=True).encode()).hexdigest()
+    with _assigned_hours_lock:
+        assigned = _assigned_hours_indexes.get(key)
+        if assigned is not None and assigned.availability is availability:
+            _assigned_hours_indexes.move_to_end(key)
+            return assigned
+    assigned = AssignedHoursIndex(parse(schedule), availability)
+    with _assigned_hours_lock:
+        _assigned_hours_indexes[key] = assigned
+        _assigned_hours_indexes.move_to_end(key)
+        while len(_assigned_hours_indexes) > max_entries:
+            _assigned_hours_indexes.popitem(last=False)
+    return assigned
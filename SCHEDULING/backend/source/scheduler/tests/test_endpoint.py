@@ -1,7 +1,16 @@
-from django.test import TestCase
+from django.core.signals import request_started
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
-from scheduler.models import Employee
+from scheduler.benchmark import synthetic_roster
+from scheduler.bitmask import mask_islands
+from scheduler import jobs
+from scheduler.models import Employee, ScheduleJob
+from scheduler.result_cache import get_result_cache
+from scheduler.views import START_JOB_QUEUE_UID, start_job_queue
+from scheduler.warm_start import DEFAULT_POLISH_ITERATIONS, WarmStartRepair
+from unittest import mock
 import json
+import time
 
 class TestCreateEmployee(TestCase):
     def test_post_to_create_view_creates_object(self):
@@ -33,10 +42,207 @@ class TestCreateEmployee(TestCase):
             content_type="application/json"
         )
 
-        # Assert that the object was created
+        # Assert that the objects were created
         self.assertEqual(Employee.objects.count(), 3)
-        self.assertEqual(Employee.objects.first().name, "Test Entry")
+        self.assertEqual(Employee.objects.get(pk="11111111").email, "student1@umb.edu")
+        self.assertEqual(Employee.objects.get(pk="22222222").first_name, "Beta")
 
-        # Assert that the response redirects to the 'success' URL
-        self.assertEqual(response.status_code, 302)
-        self.assertRedirects(response, reverse("success"))
+        # Assert that the response reports them (the view answers with JSON, not a redirect)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 3)
+
+
+class TestRosterToSchedule(TestCase):
+    def test_ingested_student_without_max_hours_can_be_scheduled_around(self):
+        students = [{"student_id": "1", "first_name": "No", "last_name": "Hours"},
+                    {"student_id": "2", "first_name": "Has", "last_name": "Hours", "max_hours": 20}]
+        response = self.client.post(reverse("admin_form"), data=json.dumps({"listofstudents": students}), content_type="application/json")
+        self.assertEqual(response.json()["created"], 2)
+        self.assertEqual(Employee.objects.get(pk="1").params["max_hours"], 0)
+        events = [{"start": "2025-09-08T12:00:00-04:00", "end": "2025-09-08T13:00:00-04:00"}]
+        for student_id in ("1", "2"):
+            response = self.client.put(reverse("submit_schedule"), data=json.dumps({"student": {"studentId": student_id}, "events": events}),
+                                       content_type="application/json")
+            self.assertEqual(response.status_code, 200)
+
+        for engine in ("sampler", "batch", "greedy", "genetic"):
+            response = self.client.post(reverse("generate_schedule"), data=json.dumps({
+                "employee_ids": ["1", "2"], "engine": engine, "seed": 1, "max_iterations": 50, "population_size": 20, "use_cache": False,
+            }), content_type="application/json")
+            self.assertEqual(response.status_code, 200, (engine, response.content))
+            entries = response.json()[0]["entries"]
+            self.assertTrue(all(entry["employee"]["employeeId"] != "1" or not entry["events"] for entry in entries), engine)
+
+
+class TestSubmitAvailabilityBatch(TestCase):
+    def test_every_error_carries_its_index(self):
+        for emp in synthetic_roster(2, seed=5):
+            emp.save()
+        events = [{"start": "2025-09-08T09:00:00-04:00", "end": "2025-09-08T10:00:00-04:00"}]
+        response = self.client.put(
+            reverse("submit_schedule_batch"),
+            data=json.dumps({"submissions": [
+                {"student": {"studentId": "nobody"}, "events": events},
+                {"student": {"studentId": "bench-0"}, "events": events},
+                {"student": {"studentId": "bench-1"}},
+                "not a submission",
+                {"student": "bench-1", "events": events},
+                {"student": {"studentId": ["bench-1"]}, "events": events},
+                {"student": {"studentId": "bench-0"}, "events": []},
+                {"student": {"studentId": "bench-0"}, "events": events},
+            ]}),
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["updated"], 1)
+        self.assertEqual(response.json()["errors"], [
+            {"index": 0, "studentId": "nobody", "error": "Student not found in database"},
+            {"index": 2, "studentId": "bench-1", "error": "Missing studentId or events"},
+            {"index": 3, "studentId": None, "error": "Missing studentId or events"},
+            {"index": 4, "studentId": None, "error": "Missing studentId or events"},
+            {"index": 5, "studentId": None, "error": "Missing studentId or events"},
+            {"index": 6, "studentId": "bench-0", "error": "Missing studentId or events"},
+            {"index": 7, "studentId": "bench-0", "error": "Duplicate studentId; already submitted at index 1"},
+        ])
+        employee = Employee.objects.get(student_id="bench-0")
+        self.assertEqual(employee.availability_islands, [mask_islands(mask) for mask in employee.availability_bits])
+
+
+class TestGenerateSchedule(TestCase):
+    def setUp(self):
+        for i, emp in enumerate(synthetic_roster(12, 0.6, seed=2)):
+            emp.first_name, emp.last_name = "Student", str(i)
+            emp.save()
+        self.employee_ids = list(Employee.objects.values_list("employee_id", flat=True))
+
+    def test_every_engine_returns_formatted_schedules(self):
+        for engine in ("sampler", "batch", "greedy", "genetic"):
+            response = self.client.post(
+                reverse("generate_schedule"),
+                data=json.dumps({"employee_ids": self.employee_ids, "engine": engine, "seed": 1, "max_iterations": 200,
+                                 "batch_size": 50, "population_size": 20, "use_cache": False}),
+                content_type="application/json"
+            )
+            self.assertEqual(response.status_code, 200, engine)
+            schedules = response.json()
+            self.assertEqual(schedules[0]["scheduleRank"], 1)
+            employee = schedules[0]["entries"][0]["employee"]
+            self.assertEqual(employee["firstName"], "Student")
+            self.assertIn(employee["employeeId"], self.employee_ids)
+
+    def test_metadata_is_opt_in(self):
+        body = {"employee_ids": self.employee_ids, "seed": 1, "max_iterations": 50, "use_cache": False}
+        plain = self.client.post(reverse("generate_schedule"), data=json.dumps(body), content_type="application/json").json()
+        detailed = self.client.post(reverse("generate_schedule"), data=json.dumps(dict(body, include_metadata=True)), content_type="application/json").json()
+        self.assertIsInstance(plain, list)
+        self.assertEqual(set(detailed), {"schedules", "pareto", "search"})
+        self.assertEqual(detailed["schedules"], plain)
+
+    def test_expired_time_budget_still_returns_schedules(self):
+        for engine in ("sampler", "batch", "genetic"):
+            body = {"employee_ids": self.employee_ids, "engine": engine, "seed": 1, "max_iterations": 10 ** 9, "time_budget": 0.001,
+                    "batch_size": 50, "population_size": 20, "include_metadata": True}
+            started = time.monotonic()
+            result = self.client.post(reverse("generate_schedule"), data=json.dumps(body), content_type="application/json").json()
+            self.assertLess(time.monotonic() - started, 5, engine)
+            self.assertTrue(result["schedules"], engine)
+            self.assertGreaterEqual(result["search"]["iterations"], 1)
+
+    def test_cache_hit_does_not_change_the_stored_result(self):
+        body = {"employee_ids": self.employee_ids, "seed": 4, "max_iterations": 50, "include_metadata": True}
+        get_result_cache().clear()
+        miss = self.client.post(reverse("generate_schedule"), data=json.dumps(dict(body, profile=True)), content_type="application/json").json()
+        hits = [self.client.post(reverse("generate_schedule"), data=json.dumps(body), content_type="application/json").json() for _ in range(2)]
+        self.assertEqual(miss["search"]["cache"], "miss")
+        self.assertTrue(all(hit["search"]["cache"] == "hit" for hit in hits))
+        self.assertNotIn("profile", hits[0]) ## The first request's profile is not served from the cache
+        self.assertEqual(hits[0]["schedules"], miss["schedules"])
+        self.assertEqual(hits[0], hits[1])
+
+    def test_warm_start_polishes_by_default_but_honours_zero(self):
+        body = {"employee_ids": self.employee_ids, "seed": 3, "max_iterations": 50, "use_cache": False}
+        base = self.client.post(reverse("generate_schedule"), data=json.dumps(body), content_type="application/json").json()[0]
+        for extra, expected in (({}, DEFAULT_POLISH_ITERATIONS), ({"polish_iterations": 0}, 0)):
+            with mock.patch.object(WarmStartRepair, "repair", autospec=True, side_effect=WarmStartRepair.repair) as repair:
+                response = self.client.post(reverse("generate_schedule"), data=json.dumps(dict(body, base_schedule=base, **extra)), content_type="application/json")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(repair.call_args.kwargs["polish_iterations"], expected)
+
+    def test_malformed_base_schedule_is_a_bad_request(self):
+        employee = {"employeeId": self.employee_ids[0]}
+        for event in ({"start": "not a time", "end": "2025-04-28T10:00:00-04:00"},
+                      {"start": "2025-04-28T09:00:00-04:00"},
+                      {"start": "2025-04-28T09:00:00", "end": "2025-04-28T10:00:00"}, ## No UTC offset
+                      "09:00-10:00"):
+            base = {"entries": [{"employee": employee, "events": [event]}]}
+            response = self.client.post(reverse("generate_schedule"), data=json.dumps({"employee_ids": self.employee_ids, "base_schedule": base}),
+                                        content_type="application/json")
+            self.assertEqual(response.status_code, 400, event)
+
+
+class TestGenerateScheduleStream(TransactionTestCase):
+    ## The search runs on its own thread (and database connection), so the roster has to be committed
+    def setUp(self):
+        for i, emp in enumerate(synthetic_roster(12, 0.6, seed=3)):
+            emp.first_name, emp.last_name = "Student", str(i)
+            emp.save()
+        self.employee_ids = list(Employee.objects.values_list("employee_id", flat=True))
+
+    def stream(self, body):
+        response = self.client.post(reverse("generate_schedule_stream"), data=json.dumps(body), content_type="application/json")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = []
+        for message in b"".join(response.streaming_content).decode().split("\n\n"):
+            lines = dict(line.split(": ", 1) for line in message.splitlines() if not line.startswith(":"))
+            if lines:
+                events.append((lines["event"], json.loads(lines["data"])))
+        return events
+
+    def test_streams_a_real_roster_to_the_result(self):
+        for engine in ("sampler", "batch", "genetic"):
+            events = self.stream({"employee_ids": self.employee_ids, "engine": engine, "seed": 1, "max_iterations": 300,
+                                  "batch_size": 50, "population_size": 20, "use_cache": False})
+            names = [event for event, _ in events]
+            self.assertEqual(names[-1], "result", (engine, events[-1]))
+            self.assertIn("best", names)
+            best = [data for event, data in events if event == "best"][-1]
+            self.assertEqual(best["entries"][0]["employee"]["firstName"], "Student")
+            self.assertIn("unfilled", best["objectives"])
+            self.assertEqual(best["objectives"]["unfilled"], events[-1][1]["search"]["best_unfilled"], engine) ## Scored like the result
+            self.assertEqual(events[-1][1]["schedules"][0]["scheduleRank"], 1)
+
+
+class TestScheduleJobs(TransactionTestCase):
+    ## Jobs run on the queue's worker thread, which needs the roster committed
+    def test_job_runs_a_real_roster_to_a_result(self):
+        for i, emp in enumerate(synthetic_roster(12, 0.6, seed=4)):
+            emp.first_name, emp.last_name = "Student", str(i)
+            emp.save()
+        body = {"employee_ids": list(Employee.objects.values_list("employee_id", flat=True)), "seed": 1, "max_iterations": 200, "use_cache": False}
+        response = self.client.post(reverse("schedule_jobs"), data=json.dumps(body), content_type="application/json")
+        self.assertEqual(response.status_code, 202)
+        url = reverse("schedule_job", args=[response.json()["job_id"]])
+        deadline = time.monotonic() + 30
+        while (job := self.client.get(url).json())["status"] in ("queued", "running") and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(job["status"], "succeeded", job["error"])
+        self.assertEqual(job["result"]["schedules"][0]["entries"][0]["employee"]["firstName"], "Student")
+
+    def test_first_request_after_a_restart_runs_left_over_jobs(self):
+        for emp in synthetic_roster(8, 0.6, seed=5):
+            emp.save()
+        body = {"employee_ids": list(Employee.objects.values_list("employee_id", flat=True)), "seed": 1, "max_iterations": 50, "use_cache": False}
+        job = ScheduleJob.objects.create(params=body) ## Queued by the previous server process
+        ## A fresh process: no queue yet, and start_job_queue waiting for the first request
+        if jobs._job_queue is not None:
+            jobs._job_queue.shutdown()
+        jobs._job_queue = None
+        request_started.connect(start_job_queue, dispatch_uid=START_JOB_QUEUE_UID)
+        self.addCleanup(request_started.disconnect, dispatch_uid=START_JOB_QUEUE_UID)
+
+        url = reverse("schedule_job", args=[job.pk])
+        deadline = time.monotonic() + 30
+        while (status := self.client.get(url).json())["status"] in ("queued", "running") and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(status["status"], "succeeded", status["error"])
+        self.assertIsNotNone(jobs._job_queue)
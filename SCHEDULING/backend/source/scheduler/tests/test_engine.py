@@ -0,0 +1,774 @@
+import os
+import pickle
+import queue
+import random
+import tempfile
+import threading
+import time
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from scheduler.availability_index import AvailabilityIndex
+from scheduler.benchmark import synthetic_roster, time_call
+from scheduler.bitmask import availability_to_masks, count_unfilled, free_mask, mask_to_bitstring, masks_to_availability, interval_mask, count_in_range, mask_islands
+from scheduler.budget import SearchBudget
+from scheduler.constants import OVERSTAFFED_HEADCOUNT
+from scheduler.density import ZeroDensityIndex
+from scheduler.engine import GreedyScheduleEngine, ScheduleEngine
+from scheduler.events import events_to_busy_matrices
+from scheduler.fields import pack_islands, pack_week, unpack_islands, unpack_week
+from scheduler.genetic import GeneticScheduleEngine
+from scheduler.ingest import ingest_roster, iter_roster_rows, validate_roster_row
+from scheduler.jobs import JobQueue
+from scheduler.batch_sampler import BatchScheduleSampler
+from scheduler.models import Employee, ScheduleJob
+from scheduler.multires import coarsen_mask, coarsen_problem, expand_mask, refine_boundaries
+from scheduler.parallel import sample_top_schedules
+from scheduler.polish import LocalSearchPolisher
+from scheduler.problem import ProblemInstance
+from scheduler.profiling import NULL_PROFILER, PhaseProfiler
+from scheduler.result_cache import ResultCache, problem_fingerprint
+from scheduler.scoring import ParetoFront, masks_to_array, pareto_mask, score_candidates
+from scheduler.substitutes import AssignedHoursIndex, find_substitutes
+from scheduler.streaming import StreamBudget, sse, stream_search
+from scheduler.topk import TopK
+from scheduler.warm_start import WarmStartRepair
+
+
+class TestBitmask(SimpleTestCase):
+    def test_free_mask_round_trip(self):
+        day = "1" * 28 + "0" * 8 + "1" * 2 + "0" * 3 + "1" * 55
+        mask = free_mask(day)
+        self.assertEqual(mask_to_bitstring(mask), day.translate(str.maketrans("01", "10")))
+        self.assertEqual(free_mask([1] * 28 + [0] * 8 + [1] * 2 + [0] * 3 + [1] * 55), mask)
+
+    def test_islands_skip_runs_shorter_than_an_hour(self):
+        day = "1" * 28 + "0" * 8 + "1" * 2 + "0" * 3 + "1" * 50 + "0" * 5
+        self.assertEqual(mask_islands(free_mask(day)), [(28, 35), (91, 95)])
+
+    def test_count_in_range(self):
+        mask = interval_mask(10, 19)
+        self.assertEqual(count_in_range(mask, 0, 95), 10)
+        self.assertEqual(count_in_range(mask, 15, 30), 5)
+        self.assertEqual(count_in_range(mask, 20, 30), 0)
+
+
+class TestZeroDensityIndex(SimpleTestCase):
+    def setUp(self):
+        busy = "1" * 96
+        self.masks = {
+            "a": [free_mask("1" * 28 + "0" * 8 + "1" * 60)] + [free_mask(busy)] * 6,
+            "b": [free_mask("1" * 32 + "0" * 8 + "1" * 56)] + [free_mask(busy)] * 6,
+        }
+        self.islands = {emp_id: [mask_islands(mask) for mask in masks] for emp_id, masks in self.masks.items()}
+        self.index = ZeroDensityIndex(self.masks, self.islands)
+
+    def test_density_matches_direct_count(self):
+        for x, y in [(0, 95), (28, 35), (30, 37), (36, 39), (50, 60)]:
+            expected = sum(count_in_range(masks[0], x, y) for masks in self.masks.values()) / ((y - x + 1) * 2)
+            self.assertEqual(self.index.density(x, y, 0), expected)
+
+    def test_min_island_density(self):
+        self.assertEqual(self.index.lowest_density_island["a"][0], (28, 35))
+        self.assertEqual(self.index.min_island_density["a"][0], 12 / 16)
+        self.assertIsNone(self.index.min_island_density["b"][1])
+
+
+class TestBatchScheduleSampler(SimpleTestCase):
+    def test_candidates_respect_availability_and_max_hours(self):
+        availability = ["1" * 28 + "0" * 16 + "1" * 4 + "0" * 24 + "1" * 24] * 5 + ["1" * 96] * 2
+        employees = [
+            Employee(employee_id="a", availability_bits=availability_to_masks(availability), params={"max_hours": 6}),
+            Employee(employee_id="b", availability_bits=availability_to_masks(availability), params={"max_hours": 10}),
+        ]
+        sampler = BatchScheduleSampler(employees, seed=0)
+        candidates = sampler.sample(200)
+        self.assertEqual(candidates.shape, (200, 2, 7, 96))
+
+        free = [[bit == "0" for bit in day] for day in availability]
+        self.assertFalse((candidates & ~np.array(free)).any())
+        hours = candidates.sum(axis=(2, 3)) / 4
+        self.assertTrue((hours[:, 0] <= 6).all() and (hours[:, 1] <= 10).all())
+        self.assertEqual(sampler.score(candidates).shape, (200,))
+
+
+class TestProblemInstance(SimpleTestCase):
+    def setUp(self):
+        availability = ["1" * 28 + "0" * 16 + "1" * 52] * 7
+        self.employees = [
+            Employee(employee_id="a", availability_bits=availability_to_masks(availability), params={"max_hours": 6}),
+            Employee(employee_id="b", availability_bits=availability_to_masks(availability), params={}),
+        ]
+
+    def test_compile(self):
+        problem = ProblemInstance.compile(self.employees, valid_work_days=["Monday", "Friday"])
+        self.assertEqual(problem.index, {"a": 0, "b": 1})
+        self.assertEqual(problem.max_hours.tolist(), [6.0, 0.0])
+        self.assertEqual(problem.valid_days, (0, 4))
+        self.assertTrue(problem.is_valid_day(4) and not problem.is_valid_day(5))
+        self.assertEqual(problem.islands_by_id["a"][0], ((28, 43),))
+        self.assertEqual(problem.density_index.lowest_density_island["b"][0], (28, 43))
+
+    def test_immutable_and_picklable(self):
+        problem = ProblemInstance.compile(self.employees)
+        with self.assertRaises(AttributeError):
+            problem.valid_days = (0,)
+        with self.assertRaises(ValueError):
+            problem.max_hours[0] = 100
+        copy = pickle.loads(pickle.dumps(problem))
+        self.assertEqual(copy.index, problem.index)
+        self.assertEqual(copy.islands, problem.islands)
+        self.assertEqual(copy.max_hours.tolist(), problem.max_hours.tolist())
+
+
+class TestMultiResolution(SimpleTestCase):
+    def test_coarse_cells_are_free_only_if_every_slot_is(self):
+        mask = free_mask("1" * 29 + "0" * 19 + "1" * 48) ## free 29..47
+        self.assertEqual(coarsen_mask(mask, 4), interval_mask(8, 11)) ## hours 8-11 are fully free, hour 7 is not
+        self.assertEqual(expand_mask(interval_mask(8, 11), 4), interval_mask(32, 47))
+
+    def test_refine_grows_shift_edges_back_into_the_island(self):
+        employees = [Employee(employee_id="a", availability_bits=availability_to_masks(["1" * 29 + "0" * 19 + "1" * 48] * 7), params={"max_hours": 40})]
+        problem = ProblemInstance.compile(employees, valid_work_hours=(28, 47))
+        coarse = coarsen_problem(problem, 4)
+        self.assertEqual(coarse.valid_work_hours, (7, 11))
+        self.assertEqual(coarse.islands[0][0], ((8, 11),))
+        unfilled, schedule = refine_boundaries(problem, {"a": [expand_mask(interval_mask(8, 11), 4)] * 7})
+        self.assertEqual(schedule["a"][0], interval_mask(29, 47))
+        self.assertEqual(unfilled, 7) ## slot 28 is busy every day
+
+
+class TestWarmStartRepair(SimpleTestCase):
+    def test_keeps_feasible_shifts_and_refills_dropped_ones(self):
+        morning = "1" * 28 + "0" * 28 + "1" * 40
+        afternoon = "1" * 56 + "0" * 28 + "1" * 12
+        employees = [
+            Employee(employee_id="a", availability_bits=availability_to_masks([morning] * 7), params={"max_hours": 49}),
+            Employee(employee_id="b", availability_bits=availability_to_masks(["1" * 96] + [afternoon] * 6), params={"max_hours": 49}),
+            Employee(employee_id="c", availability_bits=availability_to_masks([afternoon] * 7), params={"max_hours": 7}),
+        ]
+        ## b used to work Monday afternoons too, but is now busy all Monday
+        base = {
+            "a": [interval_mask(28, 55)] * 7,
+            "b": [interval_mask(56, 83)] * 7,
+        }
+        problem = ProblemInstance.compile(employees)
+        unfilled, schedule, stats = WarmStartRepair(problem, rng=random.Random(0)).repair(base)
+        self.assertEqual(schedule["a"], base["a"])
+        self.assertEqual(schedule["b"][0], 0)
+        self.assertEqual(schedule["c"][0], interval_mask(56, 83))
+        self.assertEqual(unfilled, 0)
+        self.assertEqual((stats["kept_shifts"], stats["dropped_shifts"]), (13, 1))
+
+    def test_changed_employees_are_re_solved_even_where_their_shifts_fit(self):
+        morning = "1" * 28 + "0" * 28 + "1" * 40
+        employees = [Employee(employee_id="a", availability_bits=availability_to_masks([morning] * 7), params={"max_hours": 49})]
+        base = {"a": [interval_mask(28, 40)] * 7} ## Still fits, but covers only part of the free morning
+        problem = ProblemInstance.compile(employees)
+        _, kept, _ = WarmStartRepair(problem, rng=random.Random(0)).repair(base, polish_iterations=0)
+        self.assertEqual(kept["a"], base["a"])
+        _, schedule, stats = WarmStartRepair(problem, rng=random.Random(0)).repair(base, ["a"], polish_iterations=0)
+        self.assertEqual(schedule["a"], [interval_mask(28, 55)] * 7)
+        self.assertEqual((stats["kept_shifts"], stats["dropped_shifts"]), (0, 7))
+
+
+class TestCoverageCounters(SimpleTestCase):
+    def recount(self, schedule, first, last):
+        coverage = [[sum(week[d] >> i & 1 for week in schedule.values()) for i in range(96)] for d in range(7)]
+        unfilled = sum(count == 0 for day in coverage for count in day[first:last + 1])
+        overstaffed = sum(count >= OVERSTAFFED_HEADCOUNT for day in coverage for count in day[first:last + 1])
+        return unfilled, overstaffed, coverage
+
+    def test_overlapping_shifts_at_the_window_edges(self):
+        engine = ScheduleEngine([], valid_work_hours=(28, 83))
+        engine.reset_coverage()
+        schedule = {}
+        for n, (d, start, end) in enumerate([(0, 20, 40), (0, 30, 50), (0, 35, 90), (0, 36, 36), (3, 80, 95), (3, 0, 27)]):
+            engine.add_shift_coverage(d, start, end)
+            schedule[n] = [interval_mask(start, end) if day == d else 0 for day in range(7)]
+            self.assertEqual((engine.unfilled, engine.overstaffed, engine.coverage), self.recount(schedule, 28, 83))
+        self.assertEqual(engine.overstaffed, 6) ## Slots 35..40 have three or more people; 36 (four) still counts once
+
+    def test_counters_match_a_recount_of_sampled_schedules(self):
+        problem = ProblemInstance.compile(synthetic_roster(40, density=0.75, seed=8))
+        for seed in range(5):
+            engine = ScheduleEngine(None, problem=problem, rng=random.Random(seed))
+            schedule = engine.schedule_masks()
+            stats = engine.coverage_stats()
+            self.assertEqual((stats["unfilled"], stats["overstaffed"], stats["coverage"]), self.recount(schedule, 28, 83))
+            self.assertGreater(stats["overstaffed"], 0)
+
+
+class TestGreedyScheduleEngine(SimpleTestCase):
+    def eager_greedy(self, problem):
+        """Reference: rescore every candidate after each pick, with the engine's tie-breaking."""
+        first, last = problem.valid_work_hours
+        window = interval_mask(first, last)
+        max_hours = problem.max_hours.tolist()
+        schedule = {emp_id: [0] * 7 for emp_id in problem.employee_ids}
+        hours = [0.0] * len(problem)
+        covered = [0] * 7
+        while True:
+            best = None
+            for order, emp_id in enumerate(problem.employee_ids):
+                for d in problem.valid_days:
+                    for start, end in problem.islands_by_id[emp_id][d]:
+                        length = end - start + 1
+                        if schedule[emp_id][d] or hours[order] + length / 4 > max_hours[order]:
+                            continue
+                        gain = (window & ~covered[d] & interval_mask(start, end)).bit_count()
+                        key = (-gain, length, problem.density_index.density(start, end, d), order, d, start, end)
+                        if gain and (best is None or key < best):
+                            best = key
+            if best is None:
+                return schedule
+            _, length, _, order, d, start, end = best
+            schedule[problem.employee_ids[order]][d] = interval_mask(start, end)
+            covered[d] |= interval_mask(start, end)
+            hours[order] += length / 4
+
+    def test_lazy_picks_match_eager_greedy_and_counts_match_a_recount(self):
+        for size, density in [(5, 0.3), (8, 0.5), (12, 0.75)]:
+            problem = ProblemInstance.compile(synthetic_roster(size, density=density, seed=1))
+            engine = GreedyScheduleEngine(None, problem=problem)
+            schedule = engine.schedule_masks()
+            self.assertEqual(schedule, self.eager_greedy(problem))
+            first, last = problem.valid_work_hours
+            self.assertEqual(engine.unfilled, count_unfilled(schedule, first, last))
+            for e, emp_id in enumerate(problem.employee_ids):
+                self.assertLessEqual(sum(mask.bit_count() for mask in schedule[emp_id]) / 4, problem.max_hours[e])
+
+
+class RecordingBudget(SearchBudget):
+    """SearchBudget that keeps the best score of every block it is told about."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.block_scores = []
+
+    def record(self, iterations, best_score=None, best=None):
+        self.block_scores.append(best_score)
+        super().record(iterations, best_score, best)
+
+
+class CancelledBudget(SearchBudget):
+    """SearchBudget that is cancelled from outside after cancel_after seconds, like a job whose DELETE came in."""
+    interruptible = True
+
+    def __init__(self, *args, cancel_after: float = 0.2, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cancel_after = cancel_after
+        self.polls = 0
+
+    def should_stop(self):
+        self.polls += 1
+        if self.stop_reason is None and self.elapsed() >= self.cancel_after:
+            self.stop_reason = "cancelled"
+        return super().should_stop()
+
+
+class TestGeneticScheduleEngine(SimpleTestCase):
+    def setUp(self):
+        self.employees = synthetic_roster(20, density=0.5, seed=4)
+        self.problem = ProblemInstance.compile(self.employees)
+        self.free = np.array([[[bit == "0" for bit in day] for day in masks_to_availability(emp.get_availability_masks())] for emp in self.employees])
+        self.max_hours = np.array([emp.params["max_hours"] for emp in self.employees])
+
+    def assertFeasible(self, bits):
+        self.assertFalse((bits & ~self.free).any())
+        self.assertTrue((bits.sum(axis=(-2, -1)) / 4 <= self.max_hours).all())
+
+    def test_seeded_runs_are_identical(self):
+        runs = [
+            GeneticScheduleEngine(None, population_size=30, seed=11, problem=self.problem).run(SearchBudget(max_iterations=300))
+            for _ in range(2)
+        ]
+        self.assertEqual(runs[0], runs[1])
+
+    def test_children_stay_inside_availability_and_max_hours(self):
+        ga = GeneticScheduleEngine(None, population_size=40, mutation_rate=0.5, seed=2, problem=self.problem)
+        population = np.packbits(ga.sampler.sample(40), axis=-1, bitorder="little")
+        for _ in range(5):
+            take_b = ga.rng.random(population.shape[:3]) < 0.5
+            children = np.where(take_b[..., None], population[::-1], population)
+            ga._mutate(children)
+            ga._repair(children)
+            self.assertFeasible(np.unpackbits(children, axis=-1, count=ga.width, bitorder="little").astype(bool))
+            population = children
+
+    def test_best_fitness_never_gets_worse(self):
+        ga = GeneticScheduleEngine(None, population_size=30, elite=2, seed=5, problem=self.problem)
+        budget = RecordingBudget(max_iterations=30 * 40)
+        results = ga.run(budget)
+        self.assertEqual(ga.generations, 39)
+        self.assertEqual(budget.block_scores, sorted(budget.block_scores, reverse=True))
+        self.assertEqual(results[0][0], budget.best_score)
+        for unfilled, masks in results:
+            bits = np.array([[[mask >> i & 1 for i in range(96)] for mask in masks[emp.employee_id]] for emp in self.employees], dtype=bool)
+            self.assertFeasible(bits)
+            self.assertEqual(unfilled, count_unfilled(masks, 28, 83))
+
+
+class TestSampleTopSchedules(SimpleTestCase):
+    def test_fixed_seed_gives_the_same_top_k_for_any_worker_count(self):
+        problem = ProblemInstance.compile(synthetic_roster(12, density=0.5, seed=6))
+        results = {}
+        for workers in range(1, 5):
+            budget = SearchBudget(max_iterations=300)
+            results[workers] = sample_top_schedules(ScheduleEngine, None, budget, k=5, workers=workers, chunk_size=40, seed=21, problem=problem)
+            self.assertEqual((budget.iterations, budget.stop_reason), (300, "max_iterations"))
+        self.assertEqual(len(results[1]), 5)
+        for workers in range(2, 5):
+            self.assertEqual(results[workers], results[1])
+        self.assertNotEqual(results[1], sample_top_schedules(ScheduleEngine, None, SearchBudget(max_iterations=300), chunk_size=40, seed=22, problem=problem))
+
+    def test_stall_window_runs_on_the_overall_best_across_chunks(self):
+        problem = ProblemInstance.compile(synthetic_roster(12, density=0.5, seed=6))
+        for chunk_size in (7, 200): ## Stall window longer, then shorter, than a chunk
+            budget = SearchBudget(max_iterations=5000, stall_iterations=30)
+            results = sample_top_schedules(ScheduleEngine, None, budget, chunk_size=chunk_size, seed=3, problem=problem)
+            self.assertEqual(budget.stop_reason, "stalled")
+            self.assertEqual(budget.iterations - budget.last_improvement, 30)
+            self.assertEqual(results[0][0], budget.best_score)
+
+        budget = SearchBudget(max_iterations=5000, stall_iterations=30)
+        sample_top_schedules(ScheduleEngine, None, budget, workers=2, chunk_size=20, seed=3, problem=problem)
+        self.assertEqual(budget.stop_reason, "stalled")
+        self.assertGreaterEqual(budget.iterations - budget.last_improvement, 30)
+
+    def test_deadline_cuts_the_search(self):
+        problem = ProblemInstance.compile(synthetic_roster(12, density=0.5, seed=6))
+        for workers in (1, 2):
+            budget = SearchBudget(max_iterations=10 ** 7, time_budget=0.2)
+            results = sample_top_schedules(ScheduleEngine, None, budget, workers=workers, chunk_size=10 ** 6, seed=3, problem=problem)
+            self.assertEqual(budget.stop_reason, "time_budget")
+            self.assertLess(budget.elapsed(), 5)
+            self.assertTrue(0 < budget.iterations < 10 ** 7)
+            self.assertEqual(results[0][0], budget.best_score)
+
+    def test_expired_budget_still_returns_a_schedule_quickly(self):
+        problem = ProblemInstance.compile(synthetic_roster(12, density=0.5, seed=6))
+        for workers in (1, 2):
+            budget = SearchBudget(max_iterations=10 ** 9, time_budget=1e-6) ## Chunk setup must not scale with 10^9 / 5000
+            results = sample_top_schedules(ScheduleEngine, None, budget, workers=workers, chunk_size=5000, seed=3, problem=problem)
+            self.assertLess(budget.elapsed(), 2)
+            self.assertEqual(budget.stop_reason, "time_budget")
+            self.assertGreaterEqual(budget.iterations, 1)
+            self.assertEqual(results[0][0], budget.best_score)
+
+    def test_cancel_stops_a_chunk_partway(self):
+        problem = ProblemInstance.compile(synthetic_roster(12, density=0.5, seed=6))
+        for workers in (1, 2):
+            budget = CancelledBudget(max_iterations=10 ** 7)
+            results = sample_top_schedules(ScheduleEngine, None, budget, workers=workers, chunk_size=10 ** 7, seed=3, problem=problem)
+            self.assertEqual(budget.stop_reason, "cancelled", workers)
+            self.assertLess(budget.elapsed(), 5)
+            self.assertTrue(0 < budget.iterations < 10 ** 7)
+            self.assertGreater(budget.polls, 2) ## Asked while the one chunk was still running
+            self.assertEqual(results[0][0], budget.best_score)
+
+    def test_single_worker_records_progress_inside_a_chunk(self):
+        problem = ProblemInstance.compile(synthetic_roster(12, density=0.5, seed=6))
+        budget = RecordingBudget(max_iterations=1000)
+        chunked = sample_top_schedules(ScheduleEngine, None, budget, chunk_size=1000, seed=8, problem=problem)
+        self.assertGreaterEqual(len(budget.block_scores), 1000 // 100)
+        self.assertEqual(budget.iterations, 1000)
+        self.assertEqual(chunked, sample_top_schedules(ScheduleEngine, None, SearchBudget(max_iterations=1000), workers=2, chunk_size=1000, seed=8, problem=problem))
+
+
+class TestLocalSearchPolisher(SimpleTestCase):
+    def test_gapped_shift_is_kept_as_its_runs(self):
+        split = "1" * 28 + "0" * 16 + "1" * 12 + "0" * 28 + "1" * 12 ## free 28..43 and 56..83
+        employees = [Employee(employee_id="a", availability_bits=availability_to_masks([split] * 7), params={"max_hours": 40})]
+        gapped = interval_mask(30, 35) | interval_mask(60, 70)
+        base = {"a": [gapped] + [0] * 6}
+        polisher = LocalSearchPolisher(employees, rng=random.Random(0))
+
+        unfilled, overstaffed, polished = polisher.polish(base, iterations=0)
+        self.assertEqual(polished["a"][0], gapped) ## not interval_mask(30, 70), which spans the busy gap
+        self.assertEqual(unfilled, 56 * 7 - 17)
+        self.assertEqual(polisher.hours["a"], 17 / 4)
+
+        free = availability_to_masks([split] * 7)
+        unfilled, _, polished = polisher.polish(base, iterations=500)
+        self.assertLess(unfilled, 56 * 7 - 17)
+        for d, mask in enumerate(polished["a"]):
+            self.assertEqual(mask & ~free[d], 0)
+
+    def test_never_worse_and_stays_feasible(self):
+        employees = synthetic_roster(30, density=0.5, seed=3)
+        problem = ProblemInstance.compile(employees)
+        free = {emp.employee_id: emp.get_availability_masks() for emp in employees}
+        max_hours = {emp.employee_id: emp.params["max_hours"] for emp in employees}
+        first, last = problem.valid_work_hours
+        for seed in range(3):
+            base = ScheduleEngine(None, problem=problem, rng=random.Random(seed)).schedule_masks()
+            polisher = LocalSearchPolisher(None, problem=problem, rng=random.Random(seed))
+            unfilled, overstaffed, polished = polisher.polish(base, iterations=1000, temperature=2.0)
+            self.assertLessEqual(unfilled, count_unfilled(base, first, last))
+            self.assertEqual(unfilled, count_unfilled(polished, first, last))
+            for emp_id, week in polished.items():
+                self.assertTrue(all(mask & ~free[emp_id][d] == 0 for d, mask in enumerate(week)))
+                self.assertLessEqual(sum(mask.bit_count() for mask in week) / 4, max_hours[emp_id])
+
+    def test_only_valid_days_are_moved(self):
+        employees = synthetic_roster(20, density=0.5, seed=5)
+        problem = ProblemInstance.compile(employees, valid_work_days=["Monday", "Wednesday"])
+        base = {emp.employee_id: [0] * 7 for emp in employees}
+        polisher = LocalSearchPolisher(None, problem=problem, rng=random.Random(0))
+        unfilled, _, polished = polisher.polish(base, iterations=2000)
+        self.assertLess(unfilled, count_unfilled(base, *problem.valid_work_hours))
+        for week in polished.values():
+            self.assertTrue(all(mask == 0 for d, mask in enumerate(week) if d not in (0, 2)))
+
+
+class TestScoring(SimpleTestCase):
+    def test_objectives(self):
+        schedules = [
+            {"a": [interval_mask(28, 83)] * 7, "b": [0] * 7},
+            {"a": [interval_mask(28, 55)] * 7, "b": [interval_mask(56, 83)] * 7},
+        ]
+        scores = score_candidates(masks_to_array(schedules, ["a", "b"], 96), (28, 83), max_man_hours=90)
+        self.assertEqual(scores[0].tolist(), [0, 0, 8, 49])
+        self.assertEqual(scores[1].tolist(), [0, 0, 8, 0])
+
+    def test_front_keeps_only_non_dominated_points(self):
+        points = np.array([[1, 5], [2, 2], [5, 1], [3, 3], [1, 5]], dtype=float)
+        self.assertEqual(pareto_mask(points).tolist(), [True, True, True, False, True])
+        front = ParetoFront(capacity=2)
+        for i, point in enumerate(points):
+            front.offer(point, i)
+        ## [3, 3] is dominated, the duplicate [1, 5] loses to the earlier one, and the crowded middle point goes first
+        self.assertEqual([payload for _, payload in front.results()], [0, 2])
+
+
+class TestResultCache(SimpleTestCase):
+    def test_fingerprint_ignores_roster_order_but_not_availability(self):
+        a = Employee(employee_id="a", availability_bits=availability_to_masks(["0" * 96] * 7), params={"max_hours": 10})
+        b = Employee(employee_id="b", availability_bits=availability_to_masks(["1" * 96] * 7), params={"max_hours": 10})
+        settings = {"engine": "batch", "seed": 1}
+        self.assertEqual(problem_fingerprint([a, b], settings), problem_fingerprint([b, a], settings))
+        b.availability_bits = availability_to_masks(["0" * 96] * 7)
+        self.assertNotEqual(problem_fingerprint([a, b], settings), problem_fingerprint([a], settings))
+        self.assertNotEqual(problem_fingerprint([a], settings), problem_fingerprint([a], {"engine": "greedy", "seed": 1}))
+
+    def test_lru_eviction_and_invalidation(self):
+        cache = ResultCache(max_entries=2)
+        cache.put("x", ["a", "b"], {"rank": 1})
+        cache.put("y", ["b"], {"rank": 2})
+        cache.get("x")
+        cache.put("z", ["c"], {"rank": 3})
+        self.assertIsNone(cache.get("y")) ## least recently used
+        self.assertEqual(cache.invalidate_employee("a"), 1)
+        self.assertIsNone(cache.get("x"))
+        self.assertEqual(cache.get("z"), {"rank": 3})
+
+    def test_get_and_put_copy_the_value(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite3")
+            cache = ResultCache(path=path)
+            value = {"search": {"iterations": 5}}
+            cache.put("x", ["a"], value)
+            value["search"]["cache"] = "miss"
+            ## The second cache reads the entry from SQLite and then serves it from memory
+            for reader in (cache, ResultCache(path=path)):
+                reader.get("x")["search"]["cache"] = "hit"
+                self.assertEqual(reader.get("x"), {"search": {"iterations": 5}})
+
+
+class TestBenchmarkHelpers(SimpleTestCase):
+    def test_synthetic_roster_is_seeded_and_inside_the_window(self):
+        roster = synthetic_roster(20, density=0.5, seed=3)
+        self.assertEqual([emp.availability_bits for emp in roster], [emp.availability_bits for emp in synthetic_roster(20, density=0.5, seed=3)])
+        self.assertNotEqual([emp.availability_bits for emp in roster], [emp.availability_bits for emp in synthetic_roster(20, density=0.5, seed=4)])
+        for emp in roster:
+            for day in masks_to_availability(emp.availability_bits):
+                self.assertEqual(len(day), 96)
+                self.assertEqual(day[:28] + day[84:], "1" * 40)
+
+    def test_time_call_reports_per_call_timings(self):
+        result = time_call(lambda: None, repeat=3, calls=10)
+        self.assertEqual((result["repeat"], result["calls"]), (3, 10))
+        self.assertLessEqual(result["best_ms"], result["median_ms"])
+
+
+class TestPhaseProfiler(SimpleTestCase):
+    def test_laps_and_counters_accumulate(self):
+        profiler = PhaseProfiler()
+        for _ in range(2):
+            profiler.lap("load")
+            with profiler.phase("inner"):
+                pass
+            profiler.lap("search")
+        profiler.count("iterations", 10)
+        profiler.count("iterations", 5)
+        summary = profiler.summary()
+        self.assertEqual(list(summary["phases"]), ["load", "inner", "search"])
+        self.assertEqual([phase["calls"] for phase in summary["phases"].values()], [2, 2, 2])
+        self.assertEqual(summary["counters"], {"iterations": 15})
+        self.assertGreaterEqual(summary["total_ms"], summary["phases"]["load"]["ms"] + summary["phases"]["search"]["ms"])
+
+    def test_compile_times_islands_and_density(self):
+        profiler = PhaseProfiler()
+        problem = ProblemInstance.compile(synthetic_roster(5, seed=1), profiler=profiler)
+        self.assertEqual(set(profiler.summary()["phases"]), {"islands", "density"})
+        self.assertEqual(NULL_PROFILER.summary(), {})
+        calls = problem.density_index.calls
+        problem.density_index.density(28, 40, 0)
+        self.assertEqual(problem.density_index.calls, calls + 1)
+
+    def test_density_lookups_are_only_counted_when_profiling(self):
+        unprofiled = ProblemInstance.compile(synthetic_roster(5, seed=1))
+        unprofiled.density_index.density(28, 40, 0)
+        self.assertEqual(unprofiled.density_index.calls, 0)
+        self.assertNotIn("calls", vars(unprofiled.density_index))
+        profiled = ProblemInstance.compile(synthetic_roster(5, seed=1), profiler=PhaseProfiler())
+        self.assertGreater(coarsen_problem(profiled, 4).density_index.calls, 0)
+
+
+class TestSearchBudgetHooks(SimpleTestCase):
+    def test_best_is_only_built_on_improvement(self):
+        budget = SearchBudget(max_iterations=100)
+        seen = []
+        budget.on_improvement = lambda best_score, masks: seen.append((best_score, masks))
+        for score in (5, 7, 5, 3):
+            budget.record(1, score, best=lambda: {"e": [score] * 7})
+        self.assertEqual([best_score for best_score, _ in seen], [5, 3])
+        self.assertEqual(seen[-1][1], {"e": [3] * 7})
+
+    def test_stream_budget_reports_and_cancels(self):
+        events, cancelled = queue.Queue(), threading.Event()
+        budget = StreamBudget(events, cancelled, max_iterations=100, interval=0)
+        budget.record(10, 4, best=lambda: {"e": [0] * 7})
+        self.assertFalse(budget.should_stop())
+        self.assertEqual([event for event, _ in events.queue], ["best", "progress"])
+        cancelled.set()
+        self.assertTrue(budget.should_stop())
+        self.assertEqual(budget.stop_reason, "cancelled")
+        self.assertEqual(sse("progress", {"iterations": 10}), 'event: progress\ndata: {"iterations": 10}\n\n')
+
+    def test_disconnect_stops_the_search_partway_through_a_chunk(self):
+        problem = ProblemInstance.compile(synthetic_roster(12, density=0.5, seed=6))
+        for workers in (1, 2):
+            budgets, finished = [], threading.Event()
+
+            def run(body, budget_cls):
+                budget = budget_cls(max_iterations=10 ** 7)
+                budgets.append(budget)
+                sample_top_schedules(ScheduleEngine, None, budget, workers=workers, chunk_size=10 ** 7, seed=1, problem=problem)
+                finished.set()
+                return {"search": budget.summary()}
+
+            stream = stream_search(run, {}, describe_best=lambda masks, problem: {}, interval=0.05)
+            seen = set()
+            while "progress" not in seen or (workers == 1 and "best" not in seen):
+                seen.add(next(stream).split("\n")[0].removeprefix("event: "))
+            stream.close() ## What the server does when the client goes away
+            self.assertTrue(finished.wait(5), workers)
+            self.assertEqual(budgets[0].stop_reason, "cancelled")
+            self.assertLess(budgets[0].iterations, 10 ** 7)
+
+
+class TestJobQueue(TestCase):
+    def setUp(self):
+        self.queue = JobQueue(self.search, poll_interval=0)
+        self.addCleanup(self.queue.shutdown)
+
+    def search(self, params, budget_cls):
+        ## Stands in for _generate_schedule: searches until the budget says stop
+        budget = budget_cls(max_iterations=params["max_iterations"])
+        while not budget.should_stop():
+            budget.record(1, 10 - budget.iterations)
+            if params.get("cancel_at") == budget.iterations:
+                ScheduleJob.objects.filter(pk=budget.job_id).update(cancel_requested=True)
+        return {"schedules": [], "search": budget.summary()}
+
+    def test_run_job_stores_result_and_progress(self):
+        job = ScheduleJob.objects.create(params={"max_iterations": 5})
+        self.queue.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ScheduleJob.SUCCEEDED)
+        self.assertEqual((job.progress["iterations"], job.progress["best_unfilled"]), (5, 6))
+        self.assertEqual(job.result["search"]["stop_reason"], "max_iterations")
+
+    def test_cancel_stops_a_running_search(self):
+        job = ScheduleJob.objects.create(params={"max_iterations": 1000, "cancel_at": 3})
+        self.queue.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ScheduleJob.CANCELLED)
+        self.assertEqual(job.result["search"]["iterations"], 3)
+
+    def test_cancelled_queued_job_never_runs(self):
+        job = ScheduleJob.objects.create(params={"max_iterations": 5})
+        self.assertTrue(self.queue.cancel(job.pk))
+        self.queue.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (ScheduleJob.CANCELLED, None))
+        self.assertFalse(self.queue.cancel(job.pk))
+
+    def test_requeued_run_cannot_overwrite_the_new_claim(self):
+        def search(params, budget_cls):
+            ## While this run is busy, the job is requeued and claimed again by another worker
+            ScheduleJob.objects.filter(pk=job.pk).update(started_at=timezone.now())
+            return {"schedules": [], "search": {"stop_reason": "max_iterations"}}
+        self.queue.run = search
+        job = ScheduleJob.objects.create(params={})
+        self.queue.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (ScheduleJob.RUNNING, None))
+
+
+class TestJobHeartbeat(TransactionTestCase):
+    ## The heartbeat thread has its own database connection, so the job row has to be committed
+    def test_slow_job_outliving_stale_after_is_not_requeued(self):
+        runs = []
+
+        def search(params, budget_cls):
+            runs.append(1)
+            time.sleep(0.6) ## Never checks the budget, like greedy, polish or formatting
+            return {"schedules": [], "search": {"stop_reason": "max_iterations"}}
+
+        queue = JobQueue(search, stale_after=0.25, heartbeat_interval=0.05)
+        self.addCleanup(queue.shutdown)
+        job = queue.submit({})
+        time.sleep(0.4)
+        self.assertEqual(queue.recover(), 0)
+        queue.shutdown()
+        job.refresh_from_db()
+        self.assertEqual((job.status, len(runs)), (ScheduleJob.SUCCEEDED, 1))
+
+
+class TestEventsToBusyMatrices(SimpleTestCase):
+    def test_paints_new_york_blocks_per_student(self):
+        busy = events_to_busy_matrices([
+            [
+                {"start": "2025-04-28T09:00:00-04:00", "end": "2025-04-28T10:30:00-04:00"}, ## Monday 9:00-10:30 EDT
+                {"start": "2025-04-29T18:00:00+00:00", "end": "not a time"}, ## Tuesday 14:00 EDT, one block
+                {"start": "garbage", "end": "2025-04-29T18:00:00+00:00"},
+            ],
+            [{"start": "2025-03-09T06:30:00+00:00", "end": "2025-03-09T08:00:00+00:00"}], ## Sunday 1:30 EST - 4:00 EDT
+            [],
+        ])
+        self.assertEqual(busy.shape, (3, 7, 96))
+        self.assertEqual(np.flatnonzero(busy[0, 0]).tolist(), list(range(36, 42)))
+        self.assertEqual(np.flatnonzero(busy[0, 1]).tolist(), [56])
+        self.assertEqual(int(busy[0].sum()), 7)
+        self.assertEqual(np.flatnonzero(busy[1, 6]).tolist(), list(range(6, 16)))
+        self.assertFalse(busy[2].any())
+
+
+class TestPackedWeekField(TestCase):
+    def test_pack_round_trip(self):
+        week = [0, 1, (1 << 95) | 1, 2 ** 96 - 1, 5, 0, 1 << 40]
+        self.assertEqual(len(pack_week(week)), 84)
+        self.assertEqual(unpack_week(pack_week(week)), week)
+
+    def test_masks_round_trip_through_the_database(self):
+        emp = synthetic_roster(1, seed=2)[0]
+        emp.schedule_bits = [0xFF] * 7
+        emp.save()
+        loaded = Employee.objects.get(pk=emp.pk)
+        self.assertEqual(loaded.availability_bits, emp.availability_bits)
+        self.assertEqual(loaded.schedule_bits, [0xFF] * 7)
+        self.assertEqual(masks_to_availability(loaded.availability_bits), masks_to_availability(emp.availability_bits))
+        with self.assertNumQueries(0):
+            problem = ProblemInstance.compile([loaded])
+        self.assertEqual(problem.islands, ProblemInstance.compile([emp]).islands)
+
+    def test_islands_are_stored_and_read_back_by_compile(self):
+        week = [[], [(0, 3)], [(28, 43), (56, 95)], [], [(4, 90)], [], [(0, 95)]]
+        self.assertEqual(len(pack_islands(week)), 7 + 2 * 5)
+        self.assertEqual(unpack_islands(pack_islands(week)), week)
+
+        emp = synthetic_roster(1, seed=4)[0]
+        emp.save()
+        loaded = Employee.objects.get(pk=emp.pk)
+        self.assertEqual(loaded.availability_islands, [mask_islands(mask) for mask in emp.availability_bits])
+        loaded.availability_islands = week ## Not what the masks give: compile must read the stored islands, not re-extract them
+        self.assertEqual(ProblemInstance.compile([loaded]).islands_by_id[emp.pk], tuple(tuple(day) for day in week))
+
+
+class TestRosterIngest(TestCase):
+    def test_validate_normalizes_and_collects_errors(self):
+        fields, errors = validate_roster_row({"student_id": 42, "max_hours": "12", "f1_status": "true"})
+        self.assertEqual(errors, [])
+        self.assertEqual(fields, {"student_id": "42", "employee_id": "42", "params": {"max_hours": 12, "f1_status": True}})
+        _, errors = validate_roster_row({"student_id": "", "max_hours": -1, "availability": ["0"] * 7})
+        self.assertEqual(len(errors), 3)
+
+    def test_upserts_valid_rows_and_reports_the_rest(self):
+        first = ingest_roster(enumerate([{"student_id": "a", "max_hours": 10}, {"student_id": "b"}], start=1))
+        self.assertEqual((first["created"], first["updated"], first["errors"]), (2, 0, []))
+        lines = iter([b'{"student_id": "a", "availability": ["0"]}\n', b"oops\n"])
+        second = ingest_roster(iter_roster_rows(lines, "application/x-ndjson"))
+        self.assertEqual((second["created"], second["updated"]), (0, 0))
+        self.assertEqual([error["row"] for error in second["errors"]], [1, 2])
+        csv_rows = iter_roster_rows(iter([b"student_id,max_hours,priority\n", b"a,15,2\n", b"c,,\n"]), "text/csv")
+        third = ingest_roster(csv_rows)
+        self.assertEqual((third["created"], third["updated"], third["errors"]), (1, 1, []))
+        employee = Employee.objects.get(pk="a")
+        self.assertEqual(employee.params, {"max_hours": 15, "f1_status": False, "priority": 2})
+        self.assertEqual(employee.availability_bits, [0] * 7)
+        self.assertEqual(employee.availability_islands, [[]] * 7)
+
+    def test_islands_follow_ingested_availability(self):
+        day = "1" * 28 + "0" * 16 + "1" * 52 ## Free 28..43
+        ingest_roster(enumerate([{"student_id": "a", "availability": [day] * 7}], start=1))
+        self.assertEqual(Employee.objects.get(pk="a").availability_islands, [[(28, 43)]] * 7)
+        ingest_roster(enumerate([{"student_id": "a", "max_hours": 5}], start=1))
+        self.assertEqual(Employee.objects.get(pk="a").availability_islands, [[(28, 43)]] * 7)
+        ingest_roster(enumerate([{"student_id": "a", "availability": ["1" * 96] * 7}], start=1))
+        self.assertEqual(Employee.objects.get(pk="a").availability_islands, [[]] * 7)
+
+
+class TestTopK(SimpleTestCase):
+    def test_keeps_k_lowest_with_stable_ties(self):
+        scores = [5, 3, 8, 3, 1, 3, 9, 1]
+        best = TopK(3)
+        for i, score in enumerate(scores):
+            best.offer(score, i)
+        expected = sorted(enumerate(scores), key=lambda pair: pair[1])[:3]
+        self.assertEqual(best.results(), [(score, i) for i, score in expected])
+        self.assertEqual(len(best), 3)
+        self.assertFalse(best.would_accept(3))
+        self.assertTrue(best.would_accept(2))
+
+
+class TestAvailabilityIndex(SimpleTestCase):
+    def brute_force(self, masks, d, start, end):
+        return [emp_id for emp_id, week in masks.items() if all(week[d] >> s & 1 for s in range(start, end + 1))]
+
+    def test_queries_match_a_scan(self):
+        rng = random.Random(4)
+        masks = {f"e{i}": [rng.getrandbits(96) | interval_mask(32, 64) for _ in range(7)] for i in range(70)}
+        index = AvailabilityIndex.build(list(masks), list(masks.values()))
+        for d, start, end in [(0, 40, 47), (3, 30, 34), (6, 0, 95), (2, 50, 50)]:
+            self.assertEqual(index.employees(index.free_throughout(d, start, end)), self.brute_force(masks, d, start, end))
+            self.assertEqual(index.free_counts(d, start, end), [sum(week[d] >> s & 1 for week in masks.values()) for s in range(start, end + 1)])
+        self.assertEqual(index.employees(index.free_at_any(1, 0, 95)), list(masks))
+
+    def test_update_and_remove(self):
+        masks = {"a": [interval_mask(32, 40)] * 7, "b": [0] * 7}
+        index = AvailabilityIndex.build(list(masks), list(masks.values()))
+        index.update("b", [interval_mask(36, 48)] * 7)
+        index.update("c", [interval_mask(0, 95)] * 7)
+        self.assertEqual(index.employees(index.free_throughout(2, 36, 39)), ["a", "b", "c"])
+        index.update("a", [0] * 7)
+        index.remove("c")
+        self.assertEqual(index.employees(index.free_throughout(2, 36, 39)), ["b"])
+        self.assertEqual(len(index), 2)
+
+
+class TestFindSubstitutes(SimpleTestCase):
+    def test_eligibility_and_ranking(self):
+        week = lambda start, end: [interval_mask(start, end)] * 7
+        availability = AvailabilityIndex.build(["a", "b", "c", "d", "e"], [week(32, 80), week(32, 80), week(40, 60), week(32, 44), week(32, 80)])
+        ## a: 4 h assigned, b: scheduled during the shift, c: 8 h of 10, d: not free for all of it, e: nothing assigned
+        assigned = AssignedHoursIndex({"a": [interval_mask(64, 79)] + [0] * 6, "b": [interval_mask(44, 47)] + [0] * 6,
+                                       "c": [0, interval_mask(32, 63)] + [0] * 5}, availability)
+        self.assertEqual(assigned.hours("c"), 8)
+        limits = {"a": 20, "b": 20, "c": 10, "d": 20, "e": 20}
+        found = find_substitutes(assigned, 0, 40, 47, max_hours=lambda ids: {emp_id: limits[emp_id] for emp_id in ids})
+        self.assertEqual([(s["employee_id"], s["remaining_hours"]) for s in found], [("e", 18), ("a", 14), ("c", 0)])
+        found = find_substitutes(assigned, 0, 40, 47, max_hours=lambda ids: dict(limits, c=18, e=10), exclude=["a"])
+        self.assertEqual([s["employee_id"] for s in found], ["c", "e"]) ## Same hours left: less free time first
@@ -0,0 +1,43 @@
+# Bounded collector for the best k candidates of a search.
+## Candidates are offered one at a time and losers are dropped immediately, so memory stays at
+## k payloads no matter how many iterations run.
+import heapq
+
+
+class TopK:
+    def __init__(self, k: int):
+        """
+        Args:
+            k (int): Number of candidates to keep. Lower scores are better; on equal scores the
+                     candidate offered first wins, matching a stable sort of every candidate.
+        """
+        self.k = k
+        self.offered = 0
+        ## Max-heap through negation: the root is the worst kept candidate (highest score, latest offer)
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def would_accept(self, score) -> bool:
+        """True if a candidate with this score offered now would be kept. Lets callers skip building losing payloads."""
+        if len(self._heap) < self.k:
+            return self.k > 0
+        return score < -self._heap[0][0]
+
+    def offer(self, score, payload) -> bool:
+        """Offer a candidate; returns True if it was kept."""
+        seq = self.offered
+        self.offered += 1
+        if not self.would_accept(score):
+            return False
+        entry = (-score, -seq, payload)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        else:
+            heapq.heapreplace(self._heap, entry)
+        return True
+
+    def results(self) -> list:
+        """Kept candidates as (score, payload) pairs, best first."""
+        return [(-neg_score, payload) for neg_score, _, payload in sorted(self._heap, key=lambda entry: (-entry[0], -entry[1]))]
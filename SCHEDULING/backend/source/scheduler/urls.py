@@ -3,9 +3,16 @@ from . import views
 
 urlpatterns = [
     path('admin-form/', views.admin_form_submission, name='admin_form'),
+    path('roster/bulk/', views.bulk_roster_ingest, name='bulk_roster_ingest'),
     path('submit-schedule/', views.submit_availability, name='submit_schedule'),
+    path('submit-schedule/batch/', views.submit_availability_batch, name='submit_schedule_batch'),
     path('update-parameters/', views.update_parameters, name='update_parameters'),
+    path('availability/free/', views.who_is_free, name='who_is_free'),
     path('schedules/', views.get_schedules, name='get_schedules'),
     path('generate-schedule/', views.generate_schedule, name='generate_schedule'),
     path('save-schedule/', views.save_schedule, name='save_schedule'),
+    path('schedules/<int:schedule_id>/substitutes/', views.schedule_substitutes, name='schedule_substitutes'),
+    path('generate-schedule/stream/', views.generate_schedule_stream, name='generate_schedule_stream'),
+    path('schedule-jobs/', views.schedule_jobs, name='schedule_jobs'),
+    path('schedule-jobs/<int:job_id>/', views.schedule_job, name='schedule_job'),
 ]
@@ -1,61 +1,66 @@
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DatabaseError
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from datetime import datetime, timedelta
 import pytz
 import json
-from .models import AdminSubmission, Employee, SavedSchedules
-from source.scheduler.engine import ScheduleEngine
+import logging
+import os
+import random
+import time
+import numpy as np
+from .models import Employee, SavedSchedules, ScheduleJob
+from .bitmask import mask_to_bitstring
+from .constants import DAYS_OF_WEEK
+from .batch_sampler import BatchScheduleSampler
+from .parallel import sample_top_schedules
+from .topk import TopK
+from .budget import SearchBudget
+from .polish import LocalSearchPolisher
+from .genetic import GeneticScheduleEngine
+from .problem import ProblemInstance
+from .warm_start import WarmStartRepair, DEFAULT_POLISH_ITERATIONS
+from .multires import coarsen_problem, expand_mask, refine_boundaries
+from .scoring import OBJECTIVES, ParetoFront, masks_to_array, score_candidates
+from .result_cache import get_result_cache, problem_fingerprint
+from .profiling import NULL_PROFILER, PhaseProfiler, debug_dump
+from .jobs import get_job_queue, job_status
+from .streaming import stream_search
+from .ingest import ingest_roster, iter_roster_rows
+from .events import events_to_busy_matrices, grids_to_masks
+from .availability_index import get_availability_index, update_availability_index
+from .substitutes import find_substitutes, get_assigned_hours_index
+from .engine import ScheduleEngine, GreedyScheduleEngine
+
+logger = logging.getLogger(__name__)
 
 @csrf_exempt
 def admin_form_submission(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'Only POST allowed'}, status=405)
     body=json.loads(request.body)
-    students=body.get('listofstudents')
-    for key in students:
-        Employee.objects.create(
-            employee_id= key.get('student_id'),
-            student_id= key.get('student_id'),
-            email=key.get('student_email')
-        )
-    return JsonResponse({'status': 'admin form received'})
+    students=body.get('listofstudents') or []
+    ## Upserts, so submitting the form again updates the students instead of failing on the primary key
+    report = ingest_roster(enumerate(students, start=1))
+    return JsonResponse({'status': 'admin form received', **report})
 
 
-def convert_events_to_unavailability_matrix(events):
-    tz = pytz.timezone("America/New_York")
-    schedule = [[0] * 96 for _ in range(7)]  # 7 days × 96 blocks
-
-    def time_to_block(dt):
-        return dt.hour * 4 + dt.minute // 15
-
-    for e in events:
-        start_str = e.get("start")
-        end_str = e.get("end", "")
-
-        if not start_str:
-            continue
-
-        try:
-            start = datetime.fromisoformat(start_str).astimezone(tz)
-        except ValueError:
-            continue
-
-        if end_str:
-            try:
-                end = datetime.fromisoformat(end_str).astimezone(tz)
-            except ValueError:
-                end = start + timedelta(minutes=15)
-        else:
-            end = start + timedelta(minutes=15)
-
-        day = start.weekday()
-        start_block = max(0, min(time_to_block(start), 95))
-        end_block = max(0, min(time_to_block(end), 96))
-
-        for i in range(start_block, end_block):
-            schedule[day][i] = 1
+@csrf_exempt
+def bulk_roster_ingest(request):
+    """
+    POST a roster as JSON ({"listofstudents": [...]}), JSON Lines (application/x-ndjson) or CSV (text/csv).
+    Valid rows are upserted in one transaction; invalid ones are listed in "errors" with their row number.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST allowed'}, status=405)
+    try:
+        report = ingest_roster(iter_roster_rows(request, request.content_type or 'application/json'))
+    except ValueError: ## Includes JSONDecodeError and UnicodeDecodeError
+        return HttpResponseBadRequest("Body could not be parsed as JSON, JSON Lines or CSV.")
+    return JsonResponse(report, status=200)
 
-    return schedule
 
 @csrf_exempt
 def submit_availability(request):
@@ -75,12 +80,131 @@ def submit_availability(request):
     except Employee.DoesNotExist:
         return JsonResponse({'error': 'Student not found in database'}, status=404)
 
-    bit_matrix = convert_events_to_unavailability_matrix(events)
-    employee.schedule = bit_matrix  # assumes you have a JSONField or TextField
+    busy = events_to_busy_matrices([events])
+    employee.availability_bits = grids_to_masks(~busy)[0] # Free wherever no event is
+    employee.refresh_availability_islands()
     employee.save()
+    get_result_cache().invalidate_employee(employee.employee_id)
+    update_availability_index([employee])
 
     return JsonResponse({'status': 'availability updated', 'studentId': student_id}, status=200)
 
+@csrf_exempt
+def submit_availability_batch(request):
+    """
+    submit_availability for many students in one request:
+    {"submissions": [{"student": {"studentId": ...}, "events": [...]}, ...]}.
+    All events are converted in one vectorized pass and written with a single bulk_update;
+    submissions that fail do not stop the rest. Each one is listed in "errors", in submission order, as
+    {"index": ..., "studentId": ..., "error": ...}, with index its position in "submissions". A student
+    submitted more than once keeps the first submission; the later ones are reported as errors.
+    """
+    if request.method != 'PUT':
+        return JsonResponse({'error': 'Only PUT allowed'}, status=405)
+    try:
+        submissions = json.loads(request.body).get('submissions')
+    except (json.JSONDecodeError, AttributeError):
+        return HttpResponseBadRequest("Invalid JSON.")
+    if not isinstance(submissions, list):
+        return JsonResponse({'error': 'submissions must be a list'}, status=400)
+
+    errors = []
+    accepted = {} ## student_id -> (index, events); only the first submission for a student is applied
+    for index, submission in enumerate(submissions):
+        student = submission.get('student') if isinstance(submission, dict) else None
+        student_id = student.get('studentId') if isinstance(student, dict) else None
+        events = submission.get('events') if isinstance(submission, dict) else None
+        if not isinstance(student_id, str):
+            student_id = None ## Only string ids can match Employee.student_id (and be dict keys below)
+        if not student_id or not events or not isinstance(events, list):
+            errors.append({'index': index, 'studentId': student_id, 'error': 'Missing studentId or events'})
+            continue
+        if student_id in accepted:
+            errors.append({'index': index, 'studentId': student_id, 'error': f'Duplicate studentId; already submitted at index {accepted[student_id][0]}'})
+            continue
+        accepted[student_id] = (index, events)
+
+    employees = list(Employee.objects.filter(student_id__in=list(accepted)))
+    found = {employee.student_id for employee in employees}
+    errors += [
+        {'index': index, 'studentId': student_id, 'error': 'Student not found in database'}
+        for student_id, (index, _) in accepted.items() if student_id not in found
+    ]
+    errors.sort(key=lambda error: error['index'])
+
+    busy = events_to_busy_matrices([accepted[employee.student_id][1] for employee in employees])
+    for employee, free_masks in zip(employees, grids_to_masks(~busy)):
+        employee.availability_bits = free_masks # Same as submit_availability
+        employee.refresh_availability_islands()
+    Employee.objects.bulk_update(employees, ['availability_bits', 'availability_islands'], batch_size=500) ## One transaction for all batches
+    cache = get_result_cache()
+    for employee in employees:
+        cache.invalidate_employee(employee.employee_id)
+    update_availability_index(employees)
+
+    return JsonResponse({'status': 'availability updated', 'updated': len(employees), 'errors': errors}, status=200)
+
+
+def _parse_time_slot(value):
+    ## "HH:MM" on the 15 minute grid -> slot boundary (0-96)
+    hours, minutes = value.split(':')
+    hours, minutes = int(hours), int(minutes)
+    if minutes % 15 or not 0 <= minutes < 60 or not 0 <= hours * 60 + minutes <= 24 * 60:
+        raise ValueError(value)
+    return hours * 4 + minutes // 15
+
+def _parse_shift(query):
+    """
+    day (weekday name or 0-6, Monday = 0), start and end ("HH:MM", end exclusive) from a query dict.
+
+    Returns:
+        tuple: (day, first slot, last slot), the slots inclusive.
+
+    Raises:
+        ValueError: With a message fit for a 400 response.
+    """
+    day = query.get('day', '')
+    d = int(day) if day.isdigit() else next((i for i, name in enumerate(DAYS_OF_WEEK) if name.lower() == day.lower()), None)
+    if d is None or not 0 <= d < len(DAYS_OF_WEEK):
+        raise ValueError('day must be a weekday name or 0-6 (Monday = 0)')
+    try:
+        start, end = _parse_time_slot(query.get('start', '')), _parse_time_slot(query.get('end', ''))
+    except ValueError:
+        raise ValueError('start and end must be HH:MM on a 15 minute boundary')
+    if end <= start:
+        raise ValueError('end must be after start')
+    return d, start, end - 1
+
+def who_is_free(request):
+    """
+    GET ?day=Tuesday&start=14:00&end=16:00[&mode=all|any]
+    Employees free for the whole range (mode=all, the default) or for part of it (mode=any), plus
+    the number of free employees in each 15 minute slot of the range. Answered from the availability index.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Only GET allowed'}, status=405)
+    mode = request.GET.get('mode', 'all')
+    try:
+        d, start, end = _parse_shift(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if mode not in ('all', 'any'):
+        return JsonResponse({'error': 'mode must be all or any'}, status=400)
+
+    index = get_availability_index()
+    bits = index.free_throughout(d, start, end) if mode == 'all' else index.free_at_any(d, start, end)
+    employee_ids = index.employees(bits)
+    counts = index.free_counts(d, start, end)
+    return JsonResponse({
+        'day': DAYS_OF_WEEK[d],
+        'start': request.GET['start'],
+        'end': request.GET['end'],
+        'mode': mode,
+        'count': len(employee_ids),
+        'employee_ids': employee_ids,
+        'free_per_slot': [{'start': f'{slot // 4:02d}:{slot % 4 * 15:02d}', 'count': count} for slot, count in zip(range(start, end + 1), counts)],
+    }, status=200)
+
 @csrf_exempt
 def update_parameters(request):
     if request.method != 'PUT':
@@ -95,7 +219,8 @@ def update_parameters(request):
         return JsonResponse({'error': 'student_id is required'}, status=400)
     try:
         # get the existing parameters
-        exisitng_params = Employee.objects.get(student_id=student_id).params
+        employee = Employee.objects.get(student_id=student_id)
+        exisitng_params = employee.params
         # update mappings if provided in JSON request body
         if 'max_hours' in new_params:
             exisitng_params['max_hours'] = new_params['max_hours']
@@ -103,7 +228,8 @@ def update_parameters(request):
             exisitng_params['f1_status'] = new_params['f1_status']
         if 'priority' in new_params:
             exisitng_params['priority'] = new_params['priority']
-        exisitng_params.save()
+        employee.save()
+        get_result_cache().invalidate_employee(employee.employee_id)
         return JsonResponse({'status': 'Parameters updated'}, status=204)
     except Employee.DoesNotExist:
         return JsonResponse({'error': 'Unique identifier: student_id not found in database'}, status=404)
@@ -122,53 +248,398 @@ def generate_schedule(request):
 
     try:
         body = json.loads(request.body)
+    except json.JSONDecodeError:
+        return HttpResponseBadRequest("Invalid JSON.")
+    ## true or "response" attaches per-phase timings and counters to the response, "log" logs them instead,
+    ## "debug" also dumps a cProfile and tracemalloc snapshot of the request to SCHEDULE_PROFILE_DIR (DEBUG only)
+    profile = body.get("profile", False)
+    if profile not in (False, True, "response", "log", "debug"):
+        return HttpResponseBadRequest("profile must be true, false, \"response\", \"log\" or \"debug\".")
+    if profile == "debug" and not settings.DEBUG:
+        return HttpResponseBadRequest("profile \"debug\" is only available when DEBUG is on.")
+    ## The response is the list of formatted schedules. With include_metadata it is an object instead:
+    ## {"schedules": [...], "pareto": [...], "search": {...}}, plus "profile" when the profile is returned
+    ## in the response (which therefore implies include_metadata)
+    include_metadata = body.get("include_metadata", False)
+    if not isinstance(include_metadata, bool):
+        return HttpResponseBadRequest("include_metadata must be true or false.")
+    include_metadata = include_metadata or profile in (True, "response", "debug")
+    if not profile:
+        result = _generate_schedule(body, NULL_PROFILER)
+        return result if isinstance(result, HttpResponse) else _schedule_response(result, include_metadata)
+
+    profiler = PhaseProfiler()
+    dump = None
+    if profile == "debug":
+        label = f"generate_schedule-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        with debug_dump(getattr(settings, "SCHEDULE_PROFILE_DIR", "profiles"), label) as dump:
+            result = _generate_schedule(body, profiler)
+    else:
+        result = _generate_schedule(body, profiler)
+    summary = profiler.summary()
+    if dump is not None:
+        summary["dump"] = dump
+    if profile == "log":
+        logger.info("generate_schedule profile: %s", json.dumps(summary))
+    if isinstance(result, HttpResponse):
+        return result
+    if profile != "log":
+        result["profile"] = summary
+    return _schedule_response(result, include_metadata)
+
+
+def _schedule_response(result, include_metadata):
+    return JsonResponse(result if include_metadata else result["schedules"], safe=False, status=200)
+
+
+def _generate_schedule(body, profiler, budget_cls=SearchBudget):
+    """
+    The work behind generate_schedule and schedule jobs.
+
+    Args:
+        body (dict): The request body.
+        profiler (PhaseProfiler): NULL_PROFILER unless the request is profiled.
+        budget_cls: Builds the SearchBudget; the job queue passes one that reports progress and can be cancelled.
+
+    Returns:
+        The result dict on success, or an HttpResponse for a bad request or an error.
+    """
+    try:
         employee_ids = body.get("employee_ids")
         total_master_schedule_hours = body.get("total_master_schedule_hours", 120)
+        engine = body.get("engine", "sampler") ## "sampler" (one ScheduleEngine run per iteration), "batch" (vectorized), "greedy" (deterministic) or "genetic"
+        batch_size = body.get("batch_size", 500)
+        population_size = body.get("population_size", 200) ## Genetic engine only
+        workers = body.get("workers", 1) ## Worker processes for the sampler engine
+        chunk_size = body.get("chunk_size", 5000)
+        seed = body.get("seed") ## Master seed; same seed -> same top 5 regardless of workers
+        max_iterations = body.get("max_iterations", 100000)
+        time_budget = body.get("time_budget") ## Seconds; the search returns its best so far when it runs out
+        stall_iterations = body.get("stall_iterations") ## Stop early once the best unfilled count stops improving
+        polish_iterations = body.get("polish_iterations") ## Local-search moves tried on each top schedule (0 = off; default 0, or DEFAULT_POLISH_ITERATIONS on a warm start)
+        polish_temperature = body.get("polish_temperature", 0.0) ## 0 = hill climbing, > 0 = simulated annealing
+        base_schedule = body.get("base_schedule") ## Warm start from a schedule in the format this endpoint returns
+        base_schedule_id = body.get("base_schedule_id") ## ... or from a SavedSchedules entry
+        base_schedule_index = body.get("base_schedule_index", 0) ## Which schedule of that entry
+        changed_employee_ids = body.get("changed_employee_ids", []) ## Employees whose shifts are dropped and re-solved even if they still fit
+        grid_minutes = body.get("grid_minutes", 15) ## Search grid; > 15 searches coarse cells first, then refines shift edges at 15 minutes
+        pareto_size = body.get("pareto_size", 0) ## Also return up to this many Pareto-optimal trade-off schedules (0 = off)
+        use_cache = body.get("use_cache", True) ## Answer a repeat of an earlier request from the result cache
 
         if not employee_ids or not isinstance(employee_ids, list):
             return HttpResponseBadRequest("employee_ids must be provided as a list.")
+        if engine not in ("sampler", "batch", "greedy", "genetic"):
+            return HttpResponseBadRequest("engine must be one of: sampler, batch, greedy, genetic.")
+        for name, value in (("batch_size", batch_size), ("workers", workers), ("chunk_size", chunk_size), ("max_iterations", max_iterations), ("population_size", population_size)):
+            if not isinstance(value, int) or value <= 0:
+                return HttpResponseBadRequest(f"{name} must be a positive integer.")
+        if stall_iterations is not None and (not isinstance(stall_iterations, int) or stall_iterations <= 0):
+            return HttpResponseBadRequest("stall_iterations must be a positive integer.")
+        if time_budget is not None and (not isinstance(time_budget, (int, float)) or time_budget <= 0):
+            return HttpResponseBadRequest("time_budget must be a positive number of seconds.")
+        if not isinstance(pareto_size, int) or pareto_size < 0:
+            return HttpResponseBadRequest("pareto_size must be a non-negative integer.")
+        if polish_iterations is not None and (not isinstance(polish_iterations, int) or polish_iterations < 0):
+            return HttpResponseBadRequest("polish_iterations must be a non-negative integer.")
+        if not isinstance(polish_temperature, (int, float)) or polish_temperature < 0:
+            return HttpResponseBadRequest("polish_temperature must be a non-negative number.")
+        if seed is not None and not isinstance(seed, int):
+            return HttpResponseBadRequest("seed must be an integer.")
+        if not isinstance(use_cache, bool):
+            return HttpResponseBadRequest("use_cache must be true or false.")
+        if not isinstance(grid_minutes, int) or grid_minutes <= 0 or grid_minutes % 15 or 1440 % grid_minutes:
+            return HttpResponseBadRequest("grid_minutes must be a multiple of 15 that divides a day (15, 30, 60, 120, ...).")
+        if not isinstance(changed_employee_ids, list):
+            return HttpResponseBadRequest("changed_employee_ids must be a list.")
+        if base_schedule_id is not None:
+            saved = SavedSchedules.objects.filter(pk=base_schedule_id).first()
+            if saved is None:
+                return HttpResponseBadRequest("base_schedule_id not found.")
+            saved_schedules = saved.schedules if isinstance(saved.schedules, list) else [saved.schedules]
+            if not isinstance(base_schedule_index, int) or not 0 <= base_schedule_index < len(saved_schedules):
+                return HttpResponseBadRequest("base_schedule_index is out of range.")
+            base_schedule = saved_schedules[base_schedule_index]
+        if base_schedule is not None and not (isinstance(base_schedule, dict) and isinstance(base_schedule.get("entries"), list)):
+            return HttpResponseBadRequest("base_schedule must be a schedule with an entries list.")
+        base_masks = None
+        if base_schedule is not None:
+            try:
+                base_masks = parse_formatted_schedule(base_schedule)
+            except ValueError as e:
+                return HttpResponseBadRequest(f"base_schedule is malformed: {e}")
+        if polish_iterations is None:
+            polish_iterations = DEFAULT_POLISH_ITERATIONS if base_schedule is not None else 0
 
+        profiler.lap("parse")
         employees = list(Employee.objects.filter(employee_id__in=employee_ids))
         if not employees:
             return HttpResponseBadRequest("No matching employees found.")
+        profiler.lap("load_employees")
+        profiler.count("employees", len(employees))
+
+        ## Everything below that changes the result; workers is left out since it never does
+        search_settings = {
+            "total_master_schedule_hours": total_master_schedule_hours, "engine": engine, "batch_size": batch_size,
+            "population_size": population_size, "chunk_size": chunk_size, "seed": seed, "max_iterations": max_iterations,
+            "time_budget": time_budget, "stall_iterations": stall_iterations, "polish_iterations": polish_iterations,
+            "polish_temperature": polish_temperature, "base_schedule": base_schedule, "changed_employee_ids": changed_employee_ids,
+            "grid_minutes": grid_minutes, "pareto_size": pareto_size,
+        }
+        cache_key = problem_fingerprint(employees, search_settings)
+        cached = get_result_cache().get(cache_key) if use_cache else None ## A deep copy, so marking it below leaves the entry alone
+        profiler.lap("cache_lookup")
+        if cached is not None:
+            cached["search"]["cache"] = "hit"
+            return cached
+
+        budget = budget_cls(max_iterations=max_iterations, time_budget=time_budget, stall_iterations=stall_iterations)
+        problem = ProblemInstance.compile(employees, profiler=profiler) ## Availability is fixed for the request, so ids, hours, islands and density tables are compiled once
+        budget.problem = problem
+        grid_factor = grid_minutes // 15
+        search_problem = coarsen_problem(problem, grid_factor) if grid_factor > 1 else problem
+        profiler.lap("compile_problem")
+        profiler.count("islands", sum(len(day) for week in problem.islands for day in week))
+        front = ParetoFront(pareto_size) ## Fed during the search by the batch and genetic engines
+        if budget.on_improvement is not None and base_schedule is None and grid_factor > 1:
+            ## Whoever listens for new bests gets 15 minute masks, like the final result
+            report = budget.on_improvement
+            budget.on_improvement = lambda best_score, empIdToSched: report(best_score, {
+                emp_id: [expand_mask(day_mask, grid_factor) for day_mask in week] for emp_id, week in empIdToSched.items()
+            })
 
-        top_schedules = []
-        employeeHourLimitViolationWarning = False
+        if base_schedule is not None:
+            ## Keep what still fits, re-solve only what the change touched; replaces the full search
+            repairer = WarmStartRepair(problem, rng=random.Random(seed))
+            unfilled, empIdToSched, repair_stats = repairer.repair(
+                base_masks,
+                changed_employee_ids,
+                polish_iterations=polish_iterations,
+                temperature=polish_temperature,
+            )
+            top_schedules = [(unfilled, empIdToSched)]
+            budget.record(1, unfilled, best=lambda: empIdToSched)
+            budget.stop_reason = "warm_start"
+            polish_iterations = 0 ## Already polished around the change
+        elif engine == "greedy":
+            ## A single deterministic lazy-greedy pass; polishing below can still improve it
+            sE = GreedyScheduleEngine(employees=employees, max_man_hours=total_master_schedule_hours, problem=search_problem)
+            empIdToSched = sE.schedule_masks()
+            top_schedules = [(sE.unfilled, empIdToSched)]
+            budget.record(1, sE.unfilled, best=lambda: empIdToSched)
+            budget.stop_reason = "single_pass"
+        elif engine == "genetic":
+            ## Every individual evaluated counts as one iteration against max_iterations
+            ga = GeneticScheduleEngine(employees, population_size=population_size, seed=seed, problem=search_problem)
+            top_schedules = ga.run(budget, k=5, front=front, max_man_hours=total_master_schedule_hours, slots_per_hour=4 / grid_factor)
+        elif engine == "batch":
+            ## Same sampling rules as ScheduleEngine, but batch_size candidates are drawn and scored per NumPy call
+            sampler = BatchScheduleSampler(employees, seed=seed, problem=search_problem)
+            best = TopK(5)
+            first, last = search_problem.valid_work_hours
+            while True: ## The first batch is always drawn, so an expired budget still returns schedules
+                candidates = sampler.sample(min(batch_size, budget.remaining_iterations()))
+                scores = score_candidates(candidates, search_problem.valid_work_hours, total_master_schedule_hours, 4 / grid_factor)
+                unfilled = scores[:, 0].astype(int)
+                keys = unfilled * ((last - first + 2) * 7) + scores[:, 1].astype(int) ## Unfilled first, overstaffed breaks ties
+                for i in np.argsort(keys, kind="stable")[:5]: ## Only a batch's own top 5 can make the overall top 5
+                    if best.would_accept(keys[i]):
+                        best.offer(int(keys[i]), (int(unfilled[i]), sampler.to_masks(candidates[i])))
+                if pareto_size:
+                    front.offer_batch(scores, lambda i: sampler.to_masks(candidates[i]))
+                budget.record(len(candidates), int(unfilled.min()), best=lambda: sampler.to_masks(candidates[int(np.argmin(unfilled))]))
+                if budget.should_stop():
+                    break
+            top_schedules = [payload for _, payload in best.results()]
+        else:
+            ## Up to max_iterations runs of the scheduling algorithm (each run produces a single schedule), split across `workers` processes
+            top_schedules = sample_top_schedules(
+                ScheduleEngine,
+                employees,
+                budget,
+                workers=workers,
+                chunk_size=chunk_size,
+                seed=seed,
+                engine_kwargs={"max_man_hours": total_master_schedule_hours},
+                problem=search_problem,
+            )
+        profiler.lap("search")
+        profiler.count("iterations", budget.iterations)
+
+        front_schedules = [empIdToSched for _, empIdToSched in front.results()]
+        if base_schedule is None and grid_factor > 1:
+            ## Back to 15 minute slots: expand the coarse cells, then adjust only the shift edges and re-rank
+            def refine(empIdToSched):
+                return refine_boundaries(problem, {
+                    emp_id: [expand_mask(day_mask, grid_factor) for day_mask in week] for emp_id, week in empIdToSched.items()
+                })
+            refined = TopK(5)
+            for _, empIdToSched in top_schedules:
+                refined.offer(*refine(empIdToSched))
+            top_schedules = refined.results()
+            front_schedules = [refine(empIdToSched)[1] for empIdToSched in front_schedules]
+            profiler.lap("refine")
+
+        search_summary = budget.summary()
+        search_summary["grid_minutes"] = grid_minutes
+        if base_schedule is None and grid_factor > 1:
+            search_summary["best_unfilled"] = top_schedules[0][0] if top_schedules else None ## In 15 minute slots, not coarse cells
+        if base_schedule is not None:
+            search_summary.update(repair_stats)
+        if engine == "genetic":
+            search_summary["generations"] = ga.generations
+            search_summary["generations_per_second"] = round(ga.generations_per_second, 2)
+            profiler.count("generations", ga.generations)
+        if polish_iterations > 0:
+            ## Hill-climb / anneal each sampled schedule, then re-rank; polishing never makes a schedule worse
+            polisher = LocalSearchPolisher(employees, rng=random.Random(seed), problem=problem)
+            polished = TopK(5)
+            for _, empIdToSched in top_schedules:
+                unfilled, _, polished_sched = polisher.polish(empIdToSched, iterations=polish_iterations, temperature=polish_temperature)
+                polished.offer(unfilled, polished_sched)
+            top_schedules = polished.results()
+            search_summary["polish_evaluations"] = polish_iterations * len(top_schedules)
+            search_summary["best_unfilled"] = top_schedules[0][0] if top_schedules else None
+            profiler.lap("polish")
+            profiler.count("polish_evaluations", search_summary["polish_evaluations"])
+
+        ## Score the final schedules on every objective at 15 minute resolution in one pass;
+        ## ties on unfilled are broken by overstaffed slots (3+ people), as the README describes
+        def score(schedules):
+            if not schedules:
+                return np.zeros((0, len(OBJECTIVES)))
+            return score_candidates(masks_to_array(schedules, problem.employee_ids, problem.width), problem.valid_work_hours, total_master_schedule_hours)
+        top_scores = score([empIdToSched for _, empIdToSched in top_schedules])
+        profiler.lap("scoring")
+        order = np.lexsort((top_scores[:, 1], top_scores[:, 0])) if len(top_scores) else []
+        top_schedules = [top_schedules[i] for i in order]
+        top_objectives = [dict(zip(OBJECTIVES, top_scores[i].tolist())) for i in order]
+        profiler.lap("sorting")
+
+        ## The final front also considers the top schedules, so engines that do not feed it during the search still get one
+        final_front = ParetoFront(pareto_size)
+        front_schedules += [empIdToSched for _, empIdToSched in top_schedules]
+        final_front.offer_batch(score(front_schedules), lambda i: front_schedules[i])
+        profiler.lap("pareto")
+        profiler.count("candidates_scored", len(top_scores) + len(front_schedules))
+
+        def unpack(empIdToSched):
+            return {emp_id: [mask_to_bitstring(day_mask) for day_mask in week] for emp_id, week in empIdToSched.items()}
+        top_schedules = [(unfilled, unpack(empIdToSched)) for unfilled, empIdToSched in top_schedules] ## Unpack only the kept top 5 back into bitstrings for the formatter
 
-        for _ in range(100000): ## 100,000 iterations of scheduling algorithm (each run produces a single schedule)
-            sE = ScheduleEngine(employees=employees, max_man_hours=total_master_schedule_hours)
-            empIdToSched = sE.schedule()
+        ## In progress: Pass to converter to convert the schedules from the format used by algorithm (bit strings) to the format expected by front-end
+        employees_by_id = {emp.employee_id: emp for emp in employees} 
+        formatted_result = format_all_schedules(top_schedules, employees_by_id)
+        for formatted, objectives in zip(formatted_result, top_objectives):
+            formatted["objectives"] = objectives
+        pareto = format_all_schedules([(objectives["unfilled"], unpack(empIdToSched)) for objectives, empIdToSched in final_front.results()], employees_by_id)
+        for formatted, (objectives, _) in zip(pareto, final_front.results()):
+            formatted["objectives"] = objectives
+        result = {"schedules": formatted_result, "pareto": pareto, "search": search_summary}
+        profiler.lap("format")
+        profiler.count("density_calls", problem.density_index.calls + (search_problem.density_index.calls if search_problem is not problem else 0))
+        search_summary["cache"] = "miss"
+        if budget.stop_reason != "cancelled" and formatted_result: ## A cancelled or empty search is not what the same request would return next time
+            ## put stores a deep copy; a profile is per request and never cached, even if a caller added one already
+            get_result_cache().put(cache_key, problem.employee_ids, {key: value for key, value in result.items() if key != "profile"})
+        profiler.lap("cache_store")
+        return result
 
-            employeeHourLimitViolationWarning |= sE.total_emp_hour_limit_violations > 0
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
 
-            unfilled = 0
-            overstaffed = 0
 
-            for i in range(28, 84):
-                for day in range(7):
-                    count = sum(1 for sched in empIdToSched.values() if sched[day][i] == '1')
-                    if count == 0:
-                        unfilled += 1
-            
-            if(sE.total_emp_hour_limit_violations > 0):
-                ## Note that this warning should never be trigerred, the algorithm only assigns
-                ## workers when they are available. This warn has been left to trigger
-                ## should future developers change/tamper with the algorithm
-                print("WARN: Employee Hour Limit Violated")
-            else:
-                top_schedules.append((unfilled, empIdToSched, sE)) ## Each of the 100,000 schedules appended to a list
+@csrf_exempt
+def schedule_jobs(request):
+    """POST: queue a generate_schedule request (same body) as a background job and return its id."""
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST allowed"}, status=405)
+    try:
+        body = json.loads(request.body)
+    except json.JSONDecodeError:
+        return HttpResponseBadRequest("Invalid JSON.")
+    if not isinstance(body, dict) or not isinstance(body.get("employee_ids"), list) or not body["employee_ids"]:
+        return HttpResponseBadRequest("employee_ids must be provided as a list.")
+    body.pop("profile", None) ## Profiles are per request; jobs report progress instead
+    job = get_job_queue(_run_job).submit(body)
+    return JsonResponse({"job_id": job.pk, "status": job.status}, status=202)
 
-        top_schedules = sorted(top_schedules, key=lambda x: x[0])[:5] ## Sort the list, retrieve top 5 schedules
 
-        ## In progress: Pass to converter to convert the schedules from the format used by algorithm (bit strings) to the format expected by front-end
-        employees_by_id = {emp.employee_id: emp for emp in employees} 
-        formatted_result = format_all_schedules(top_schedules, employees_by_id)
-        return JsonResponse(formatted_result, safe=False, status=200)
+@csrf_exempt
+def schedule_job(request, job_id):
+    """GET: status, progress and (once finished) the result of a job. DELETE: cancel it."""
+    job = ScheduleJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return JsonResponse({"error": "Job not found"}, status=404)
+    if request.method == "GET":
+        return JsonResponse(job_status(job), status=200)
+    if request.method == "DELETE":
+        if not get_job_queue(_run_job).cancel(job_id):
+            return JsonResponse({"error": f"Job already {job.status}"}, status=409)
+        job.refresh_from_db()
+        return JsonResponse(job_status(job), status=202)
+    return JsonResponse({"error": "Only GET and DELETE allowed"}, status=405)
+
+
+def _run_job(params, budget_cls):
+    return _generate_schedule(params, NULL_PROFILER, budget_cls)
+
+
+def start_job_queue(**kwargs):
+    """
+    request_started receiver, connected in SchedulerConfig.ready(): starts the job queue on the first request
+    the process serves (a status poll included), which requeues and runs the jobs left over from before a
+    restart. Disconnects itself once the queue is up; a database error leaves it for the next request.
+    """
+    try:
+        get_job_queue(_run_job)
+    except DatabaseError:
+        logger.exception("Could not start the schedule job queue; retrying on the next request")
+        return
+    request_started.disconnect(dispatch_uid=START_JOB_QUEUE_UID)
+
 
+START_JOB_QUEUE_UID = "scheduler.start_job_queue"
+
+
+@csrf_exempt
+def generate_schedule_stream(request):
+    """
+    generate_schedule as a server-sent event stream. POST the same body, or GET with the body as JSON in
+    the `params` query parameter (for EventSource). Events:
+    progress (iterations, best_unfilled, best_overstaffed, elapsed_seconds), best (the new top schedule,
+    formatted like one entry of generate_schedule's schedule list), and finally result (generate_schedule's
+    response with include_metadata) or error.
+    Closing the connection cancels the search.
+    """
+    try:
+        if request.method == "POST":
+            body = json.loads(request.body)
+        elif request.method == "GET":
+            body = json.loads(request.GET.get("params", "{}"))
+        else:
+            return JsonResponse({"error": "Only GET and POST allowed"}, status=405)
     except json.JSONDecodeError:
         return HttpResponseBadRequest("Invalid JSON.")
-    except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+    if not isinstance(body, dict) or not isinstance(body.get("employee_ids"), list) or not body["employee_ids"]:
+        return HttpResponseBadRequest("employee_ids must be provided as a list.")
+    body.pop("profile", None)
+
+    employees_by_id = {emp.employee_id: emp for emp in Employee.objects.filter(employee_id__in=body["employee_ids"])}
+    total_master_schedule_hours = body.get("total_master_schedule_hours", 120)
+
+    def describe_best(empIdToSched, problem):
+        ## Scored on the compiled problem, like the final result
+        scores = score_candidates(masks_to_array([empIdToSched], problem.employee_ids, problem.width), problem.valid_work_hours, total_master_schedule_hours)
+        objectives = dict(zip(OBJECTIVES, scores[0].tolist()))
+        week_bits = {emp_id: [mask_to_bitstring(day_mask) for day_mask in week] for emp_id, week in empIdToSched.items()}
+        formatted = format_all_schedules([(objectives["unfilled"], week_bits)], employees_by_id)[0]
+        formatted["objectives"] = objectives
+        return formatted
+
+    response = StreamingHttpResponse(stream_search(_run_job, body, describe_best), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no" ## Keep nginx from buffering the stream
+    return response
 
 
 def format_all_schedules(top_schedules, employees_by_id, start_date="2025-04-28"):
@@ -180,7 +651,7 @@ def format_all_schedules(top_schedules, employees_by_id, start_date="2025-04-28"
     base_date = datetime.fromisoformat(start_date).replace(tzinfo=tz)
     formatted = []
 
-    for rank, (unfilled, empIdToSched, _) in enumerate(top_schedules, start=1):
+    for rank, (unfilled, empIdToSched) in enumerate(top_schedules, start=1):
         entries = []
 
         for emp_id, week in empIdToSched.items():
@@ -225,7 +696,84 @@ def format_all_schedules(top_schedules, employees_by_id, start_date="2025-04-28"
     return formatted
 
 
+def parse_formatted_schedule(schedule, start_date="2025-04-28"):
+    """
+    Inverse of format_all_schedules for a single schedule: turn its entries back into
+    employee_id -> 7 day masks. Events outside the week starting at start_date are ignored.
+
+    Raises:
+        ValueError: An entry or event is malformed (not an object, a missing "start"/"end", or a time
+                    that is not an ISO 8601 timestamp with a UTC offset).
+    """
+    tz = pytz.timezone("America/New_York")
+    base_date = datetime.fromisoformat(start_date).replace(tzinfo=tz) ## Built exactly like format_all_schedules, so the offsets match
+    empIdToSched = {}
+
+    try:
+        for entry in schedule.get("entries", []):
+            emp_id = entry.get("employee", {}).get("employeeId")
+            if emp_id is None:
+                continue
+            week = empIdToSched.setdefault(emp_id, [0] * 7)
+            for event in entry.get("events", []):
+                ## Absolute 15 minute block since the start of the week; the end is exclusive
+                start_block = int((datetime.fromisoformat(event["start"]) - base_date).total_seconds() // 900)
+                end_block = int((datetime.fromisoformat(event["end"]) - base_date).total_seconds() // 900)
+                for block in range(max(start_block, 0), min(end_block, 7 * 96)):
+                    week[block // 96] |= 1 << (block % 96)
+    except (KeyError, TypeError, AttributeError) as e: ## ValueError from fromisoformat passes through as it is
+        raise ValueError(f"entries must hold employee objects and events with ISO start and end times ({e!r})") from e
+    return empIdToSched
+
+
     
+def schedule_substitutes(request, schedule_id):
+    """
+    GET ?day=Tuesday&start=14:00&end=16:00[&schedule_index=0][&employee_id=...][&limit=20]
+    Ranked substitutes for a shift of saved schedule schedule_id (entry schedule_index of that row):
+    free for the whole shift, not already scheduled during it, and within max_hours after taking it.
+    employee_id (whoever dropped the shift) is left out. See substitutes.py for the ranking.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Only GET allowed'}, status=405)
+    try:
+        d, start, end = _parse_shift(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    try:
+        schedule_index = int(request.GET.get('schedule_index', 0))
+        limit = int(request.GET.get('limit', 20))
+        if limit <= 0:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'error': 'schedule_index and limit must be integers, limit positive'}, status=400)
+
+    saved = SavedSchedules.objects.filter(pk=schedule_id).first()
+    if saved is None:
+        return JsonResponse({'error': 'schedule not found'}, status=404)
+    saved_schedules = saved.schedules if isinstance(saved.schedules, list) else [saved.schedules]
+    if not 0 <= schedule_index < len(saved_schedules):
+        return JsonResponse({'error': 'schedule_index is out of range'}, status=400)
+    schedule = saved_schedules[schedule_index]
+    if not (isinstance(schedule, dict) and isinstance(schedule.get('entries'), list)):
+        return JsonResponse({'error': 'saved schedule has no entries list'}, status=400)
+
+    try:
+        assigned = get_assigned_hours_index(schedule, parse_formatted_schedule, get_availability_index())
+    except ValueError as e:
+        return JsonResponse({'error': f'saved schedule is malformed: {e}'}, status=400)
+    dropped_by = request.GET.get('employee_id')
+    substitutes = find_substitutes(assigned, d, start, end, exclude=[dropped_by] if dropped_by else ())
+    return JsonResponse({
+        'day': DAYS_OF_WEEK[d],
+        'start': request.GET['start'],
+        'end': request.GET['end'],
+        'shift_hours': (end - start + 1) / 4,
+        'count': len(substitutes),
+        'substitutes': substitutes[:limit],
+    }, status=200)
+
+
 @csrf_exempt
 def save_schedule(request):
     if request.method != 'PUT':
@@ -0,0 +1,158 @@
+# Warm-start repair of an existing schedule after a small roster change.
+## After one employee changes their availability or params, most of a saved schedule is still
+## feasible. Rather than searching from scratch, every shift that still fits is kept (unless its
+## employee is named as changed), only the employees and days the change touched are re-solved (greedy max coverage, as in
+## GreedyScheduleEngine), and local search is then limited to those employees and days.
+import heapq
+import random
+
+from .bitmask import interval_mask, count_unfilled
+from .constants import DAYS_OF_WEEK
+from .polish import LocalSearchPolisher
+from .problem import ProblemInstance
+
+DEFAULT_POLISH_ITERATIONS = 1000
+
+
+class WarmStartRepair:
+    def __init__(self, problem: ProblemInstance, rng=None):
+        """
+        Args:
+            problem (ProblemInstance): The roster as it is now (after the change).
+            rng (random.Random): Random stream for the local search (defaults to the global random module).
+        """
+        self.problem = problem
+        self.rng = rng or random
+        self.polisher = LocalSearchPolisher(None, rng=self.rng, problem=problem)
+
+    def _keep_feasible(self, base_masks: dict, changed: set) -> tuple:
+        """
+        Copy every base shift that still fits the current availability, valid days and max_hours.
+        Changed employees keep none of their shifts, so that every one of their days is re-solved.
+
+        Returns:
+            tuple: (schedule masks, affected (employee_id, day) pairs, affected days, number of shifts kept,
+                    number dropped, which includes the changed employees' shifts)
+        """
+        problem = self.problem
+        schedule = {}
+        affected = set()
+        affected_days = set()
+        kept = dropped = 0
+
+        for emp_id, week in base_masks.items():
+            if emp_id not in problem.index:
+                ## No longer on the roster: whatever they covered has to be picked up by someone else
+                affected_days.update(d for d, mask in enumerate(week) if mask)
+                dropped += sum(1 for mask in week if mask)
+
+        for e, emp_id in enumerate(problem.employee_ids):
+            week = list(base_masks.get(emp_id, [0] * len(DAYS_OF_WEEK)))
+            if emp_id not in base_masks or emp_id in changed:
+                affected.update((emp_id, d) for d in range(len(DAYS_OF_WEEK)))
+            if emp_id in changed:
+                ## Released whether or not they still fit; whoever can cover those days best is picked below
+                affected_days.update(d for d, mask in enumerate(week) if mask)
+                dropped += sum(1 for mask in week if mask)
+                week = [0] * len(DAYS_OF_WEEK)
+            for d, mask in enumerate(week):
+                if not mask:
+                    continue
+                low, high = (mask & -mask).bit_length() - 1, mask.bit_length() - 1
+                ## One contiguous shift per day, on a valid day, inside what the employee is free for now
+                if mask != interval_mask(low, high) or not problem.is_valid_day(d) or mask & ~problem.availability_masks[e][d]:
+                    week[d] = 0
+                    affected.add((emp_id, d))
+                    affected_days.add(d)
+                    dropped += 1
+            ## A lowered max_hours: drop shifts from the end of the week until the employee fits again
+            hours = sum(mask.bit_count() for mask in week) / 4
+            for d in reversed(range(len(DAYS_OF_WEEK))):
+                if hours <= problem.max_hours[e]:
+                    break
+                if week[d]:
+                    hours -= week[d].bit_count() / 4
+                    week[d] = 0
+                    affected.add((emp_id, d))
+                    affected_days.add(d)
+                    dropped += 1
+            kept += sum(1 for mask in week if mask)
+            schedule[emp_id] = week
+        return schedule, affected, affected_days, kept, dropped
+
+    def _resolve(self, schedule: dict, affected: set):
+        """Lazy-greedy max coverage over the empty affected (employee, day) pairs, in place."""
+        problem = self.problem
+        first, last = problem.valid_work_hours
+        window = interval_mask(first, last)
+        covered = [0] * len(DAYS_OF_WEEK)
+        for week in schedule.values():
+            for d, mask in enumerate(week):
+                covered[d] |= mask
+        hours = {emp_id: sum(mask.bit_count() for mask in week) / 4 for emp_id, week in schedule.items()}
+
+        ## Same ordering as GreedyScheduleEngine: most new coverage, then the shorter shift, then the lower density
+        heap = []
+        for emp_id, d in sorted(affected, key=lambda pair: (problem.index[pair[0]], pair[1])):
+            if schedule[emp_id][d] or not problem.is_valid_day(d):
+                continue
+            e = problem.index[emp_id]
+            for start, end in problem.islands[e][d]:
+                length = end - start + 1
+                gain = (window & ~covered[d] & interval_mask(start, end)).bit_count()
+                if gain and hours[emp_id] + length / 4 <= problem.max_hours[e]:
+                    heap.append((-gain, length, problem.density_index.density(start, end, d), e, d, start, end))
+        heapq.heapify(heap)
+
+        while heap:
+            neg_gain, length, density, e, d, start, end = heapq.heappop(heap)
+            emp_id = problem.employee_ids[e]
+            if schedule[emp_id][d] or hours[emp_id] + length / 4 > problem.max_hours[e]:
+                continue
+            gain = (window & ~covered[d] & interval_mask(start, end)).bit_count()
+            if gain == 0:
+                continue
+            if gain < -neg_gain: ## Stale gain: re-queue with the real value
+                heapq.heappush(heap, (-gain, length, density, e, d, start, end))
+                continue
+            schedule[emp_id][d] = interval_mask(start, end)
+            covered[d] |= schedule[emp_id][d]
+            hours[emp_id] += length / 4
+
+    def repair(self,
+               base_masks: dict,
+               changed_employee_ids=(),
+               polish_iterations: int = DEFAULT_POLISH_ITERATIONS,
+               temperature: float = 0.0) -> tuple:
+        """
+        Turn a base schedule into a feasible, locally improved schedule for the current roster.
+
+        Args:
+            base_masks (dict): employee_id -> 7 day masks of the schedule to start from.
+            changed_employee_ids (iterable): Employees known to have changed (e.g. after update_parameters);
+                                             their shifts are dropped and all of their days re-solved, even
+                                             where the shifts still fit.
+            polish_iterations (int): Local-search moves, restricted to the affected employees and days.
+            temperature (float): Annealing temperature for the local search (0 = hill climbing).
+
+        Returns:
+            tuple: (unfilled, schedule_masks, stats) where stats counts kept / dropped shifts and affected pairs.
+        """
+        schedule, affected, affected_days, kept, dropped = self._keep_feasible(base_masks, set(changed_employee_ids))
+        self._resolve(schedule, affected)
+
+        ## Local search around the change: the affected employees, plus anyone working an affected day
+        focus = affected | {(emp_id, d) for emp_id in schedule for d in affected_days}
+        first, last = self.problem.valid_work_hours
+        if focus and polish_iterations > 0:
+            unfilled, _, schedule = self.polisher.polish(schedule, iterations=polish_iterations, temperature=temperature, focus=focus)
+        else:
+            unfilled = count_unfilled(schedule, first, last)
+
+        stats = {
+            "kept_shifts": kept,
+            "dropped_shifts": dropped,
+            "affected_pairs": len(affected),
+            "polish_evaluations": polish_iterations if focus else 0,
+        }
+        return unfilled, schedule, stats
@@ -66,3 +66,29 @@ USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = '/static/'
+
+# generate_schedule result cache (see scheduler/result_cache.py); set 'path' to also keep results in a SQLite file
+SCHEDULE_RESULT_CACHE = {
+    'max_entries': 64,
+    'max_age': 60 * 60,
+    'path': None,
+}
+
+# Background schedule jobs (see scheduler/jobs.py): jobs run at once per server process, seconds between
+# progress writes / cancel checks, seconds between heartbeats of a running job, and seconds without a
+# heartbeat after which a running job is requeued
+SCHEDULE_JOB_QUEUE = {
+    'workers': 1,
+    'poll_interval': 1.0,
+    'heartbeat_interval': 15,
+    'stale_after': 60,
+}
+
+# "Who is free" availability index (see scheduler/availability_index.py): rebuilt from the database after
+# this many seconds, so writes made by other server processes show up
+SCHEDULE_AVAILABILITY_INDEX = {
+    'max_age': 5 * 60,
+}
+
+# Where generate_schedule writes cProfile and tracemalloc dumps for requests made with "profile": "debug"
+SCHEDULE_PROFILE_DIR = BASE_DIR / 'profiles'